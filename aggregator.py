@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Build M1 bars from ticks or M1 closes and roll them up into M5 and above.
+
+Bars are bucketed on ``time - time % seconds`` (epoch seconds; millisecond
+times are scaled down first) so a tick exactly on a boundary opens the new bar. Minutes without ticks produce no bar (as on the chart)
+unless ``fill_gaps`` is set, in which case flat bars at the previous close are
+inserted. The first bucket of every series is dropped from the output when it
+did not start on its boundary, since its real open is unknown.
+
+``frame`` returns the same columns as ``main.get_candles`` (time, open, high,
+low, close; color on demand), last bar still forming.
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from candle_ring import CandleRing, CandleWindow, epoch_seconds
+
+DEFAULT_TIMEFRAMES = ("1m", "5m")
+
+
+def tf_seconds(tf_label: str) -> int:
+    """'1m' -> 60, '5m' -> 300, '1h' -> 3600."""
+    label = tf_label.strip().lower()
+    unit = {"s": 1, "m": 60, "h": 3600, "d": 86400}.get(label[-1:], 60)
+    try:
+        return int(label[:-1] or 1) * unit
+    except ValueError:
+        return 60
+
+
+class BarSeries:
+    """Rolling bars of one timeframe, held in a fixed-capacity ``CandleRing``."""
+
+    __slots__ = ("seconds", "ring", "fill_gaps", "partial_start")
+
+    def __init__(self, seconds: int, maxlen: int = 500, fill_gaps: bool = False) -> None:
+        self.seconds = seconds
+        self.ring = CandleRing(maxlen)
+        self.fill_gaps = fill_gaps
+        self.partial_start: Optional[int] = None
+
+    def update(self, t: float, o: float, h: float, l: float, c: float) -> None:
+        """Merge a tick (o=h=l=c) or a lower-timeframe bar opened at ``t`` (epoch s or ms)."""
+        # Buckets are in seconds: a millisecond time would make a 5m bucket 300 ms wide
+        t = int(epoch_seconds(t))
+        bucket = t - t % self.seconds
+        ring = self.ring
+        if not len(ring):
+            if t != bucket:
+                self.partial_start = bucket
+            ring.append(bucket, o, h, l, c)
+            return
+        last = ring.window(1)
+        last_time = int(last.time[0])
+        if bucket == last_time:
+            ring.set(-1, max(last.high[0], h), min(last.low[0], l), c)
+            return
+        if bucket > last_time:
+            if self.fill_gaps:
+                prev_close = float(last.close[0])
+                for missing in range(last_time + self.seconds, bucket, self.seconds):
+                    ring.append(missing, prev_close, prev_close, prev_close, prev_close)
+            ring.append(bucket, o, h, l, c)
+            return
+        # Late data for an older bar still held: widen its range, keep its open/close
+        i = ring.find(bucket)
+        if i is not None:
+            held = ring.window()
+            ring.set(i, max(held.high[i], h), min(held.low[i], l))
+
+    def complete_bars(self) -> CandleWindow:
+        """Held bars without the leading partial one, as a view on the ring."""
+        bars = self.ring.window()
+        if len(bars) and self.partial_start is not None and bars.time[0] == self.partial_start:
+            bars = bars.tail(len(bars) - 1)
+        return bars
+
+    def last_time(self) -> Optional[float]:
+        return self.ring.last_time()
+
+    def __len__(self) -> int:
+        return len(self.complete_bars())
+
+
+class CandleAggregator:
+    """Every timeframe of one pair, fed from a single tick or M1 stream."""
+
+    def __init__(self, timeframes: Sequence[str] = DEFAULT_TIMEFRAMES, maxlen: int = 500,
+                 fill_gaps: bool = False) -> None:
+        self.series: Dict[str, BarSeries] = {
+            tf: BarSeries(tf_seconds(tf), maxlen=maxlen, fill_gaps=fill_gaps) for tf in timeframes
+        }
+        self.ticked_at = 0.0
+        self._lock = threading.Lock()
+
+    def add_tick(self, t: float, price: float) -> None:
+        with self._lock:
+            for series in self.series.values():
+                series.update(t, price, price, price, price)
+            self.ticked_at = time.time()
+
+    def add_ticks(self, ticks: Iterable[Any]) -> None:
+        """Ticks with ``.time`` and ``.price`` (e.g. ``cdp_feed.Tick``)."""
+        with self._lock:
+            seen = False
+            for tick in ticks:
+                seen = True
+                for series in self.series.values():
+                    series.update(tick.time, tick.price, tick.price, tick.price, tick.price)
+            if seen:
+                self.ticked_at = time.time()
+
+    def add_m1(self, t: float, o: float, h: float, l: float, c: float) -> None:
+        """Merge one M1 bar (closed or still forming) into every timeframe of at least 1m."""
+        with self._lock:
+            for series in self.series.values():
+                if series.seconds >= 60:
+                    series.update(t, o, h, l, c)
+
+    def add_m1_frame(self, df: Optional[CandleWindow]) -> int:
+        """Merge the M1 bars of a ``get_candles`` DataFrame not older than what is held."""
+        if df is None or len(df) == 0:
+            return 0
+        m1 = self.series.get("1m")
+        last = m1.last_time() if m1 is not None else None
+        added = 0
+        for t, o, h, l, c in zip(df["time"].tolist(), df["open"].tolist(), df["high"].tolist(),
+                                 df["low"].tolist(), df["close"].tolist()):
+            if t is None or (last is not None and t < last):
+                continue
+            self.add_m1(t, o, h, l, c)
+            added += 1
+        return added
+
+    def bar_count(self, tf_label: str) -> int:
+        series = self.series.get(tf_label)
+        return len(series) if series is not None else 0
+
+    def ready(self, counts: Dict[str, int], max_age: float = 60.0) -> bool:
+        """Enough complete bars per timeframe and live ticks within the last ``max_age`` seconds."""
+        if time.time() - self.ticked_at > max_age:
+            return False
+        return all(self.bar_count(tf) >= n for tf, n in counts.items())
+
+    def frame(self, tf_label: str, count: int) -> Optional[CandleWindow]:
+        """Last ``count`` bars of ``tf_label`` shaped like ``get_candles`` output (a view, no copy)."""
+        with self._lock:
+            series = self.series.get(tf_label)
+            bars = series.complete_bars().tail(count) if series is not None else None
+        if bars is None or not len(bars):
+            return None
+        return bars
+
+
+class AggregatorBank:
+    """One ``CandleAggregator`` per pair, created on first use."""
+
+    def __init__(self, timeframes: Sequence[str] = DEFAULT_TIMEFRAMES, maxlen: int = 500,
+                 fill_gaps: bool = False) -> None:
+        self.timeframes = tuple(timeframes)
+        self.maxlen = maxlen
+        self.fill_gaps = fill_gaps
+        self._aggs: Dict[str, CandleAggregator] = {}
+        self._lock = threading.Lock()
+
+    def get(self, pair: str) -> CandleAggregator:
+        with self._lock:
+            agg = self._aggs.get(pair)
+            if agg is None:
+                agg = CandleAggregator(self.timeframes, self.maxlen, self.fill_gaps)
+                self._aggs[pair] = agg
+            return agg
+
+    def add_ticks(self, ticks: Iterable[Any]) -> int:
+        """Route ticks (with ``.pair``) to their pair's aggregator; return how many were used."""
+        by_pair: Dict[str, List[Any]] = {}
+        for tick in ticks:
+            by_pair.setdefault(tick.pair, []).append(tick)
+        for pair, pair_ticks in by_pair.items():
+            self.get(pair).add_ticks(pair_ticks)
+        return sum(len(v) for v in by_pair.values())
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Offline replay of the ICT strategy over stored candles.
+
+Each pair is replayed in its own process. Candles are streamed bar by bar
+through the same streaming detectors and ``build_signal`` scoring used live,
+with a simulated Tehran clock instead of ``datetime.now``.
+
+Input files live in one directory, named ``<PAIR>_1m.csv`` (required) and
+``<PAIR>_5m.csv`` (optional), or ``.parquet``; columns: time, open, high, low,
+close. ``time`` is the bar open time as epoch seconds/milliseconds or an ISO
+timestamp in UTC.
+
+Alternatively ``--store`` replays the bars the live bot recorded in the
+candle store (``candle_store.py``); ``--pairs`` takes the bot's pair names
+("EUR/USD OTC"). Per-pair kill zones come from ``PAIR_KILL_ZONES`` (``.env``).
+
+Usage:
+    python backtest.py --data data/ --workers 4 --min-score 85
+    python backtest.py --store data/candles
+"""
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore, pair_slug
+from ict_stream import Bar, StreamingDetector
+
+M1_SECONDS = 60
+M5_SECONDS = 300
+EXPIRIES = (1, 2)
+
+
+# -----------------------------
+# Candle files
+# -----------------------------
+
+def load_candles(path: str) -> pd.DataFrame:
+    """Read a candle file and normalize ``time`` to epoch seconds, sorted and de-duplicated."""
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    df = df[["time", "open", "high", "low", "close"]]
+    if pd.api.types.is_numeric_dtype(df["time"]):
+        t = df["time"].to_numpy(dtype=np.int64)
+        if len(t) and t.max() > 10**11:
+            t = t // 1000
+    else:
+        t = pd.to_datetime(df["time"], utc=True).astype("int64").to_numpy() // 10**9
+    df = df.assign(time=t).astype({"open": "float64", "high": "float64", "low": "float64", "close": "float64"})
+    return df.drop_duplicates("time", keep="last").sort_values("time").reset_index(drop=True)
+
+
+def load_stored_candles(store_root: str, pair: str, tf_label: str) -> Optional[pd.DataFrame]:
+    """Read one pair/timeframe from the candle store, or None if nothing is stored."""
+    store = CandleStore(store_root)
+    if tf_label not in store.timeframes(pair):
+        return None
+    rec = store.read(pair, tf_label)
+    return pd.DataFrame({name: np.array(rec[name]) for name in ("time", "open", "high", "low", "close")})
+
+
+def discover_stored_pairs(store_root: str) -> List[str]:
+    """Display names ("EUR/USD OTC") of the stored pairs that have M1 bars."""
+    store = CandleStore(store_root)
+    return [store.name(slug) for slug in store.pairs() if "1m" in store.timeframes(slug)]
+
+
+def discover_pairs(data_dir: str) -> Dict[str, Tuple[str, Optional[str]]]:
+    """Map pair name -> (M1 file, M5 file or None) for every ``*_1m`` file in ``data_dir``."""
+    pairs: Dict[str, Tuple[str, Optional[str]]] = {}
+    for ext in ("csv", "parquet"):
+        for m1_path in sorted(glob.glob(os.path.join(data_dir, f"*_1m.{ext}"))):
+            pair = os.path.basename(m1_path)[: -len(f"_1m.{ext}")]
+            m5_path = os.path.join(data_dir, f"{pair}_5m.{ext}")
+            pairs.setdefault(pair, (m1_path, m5_path if os.path.exists(m5_path) else None))
+    return pairs
+
+
+# -----------------------------
+# Simulated clock
+# -----------------------------
+
+class SimulatedClock:
+    """Stands in for ``datetime.now(Asia/Tehran)`` during a replay."""
+
+    def __init__(self, tz) -> None:
+        self.tz = tz
+        self.ts = 0
+
+    def set(self, ts: int) -> None:
+        self.ts = ts
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.ts, self.tz)
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+
+def _empty_stats() -> Dict[str, Dict[str, int]]:
+    return {str(e): {"signals": 0, "wins": 0, "losses": 0, "draws": 0, "unresolved": 0} for e in EXPIRIES}
+
+
+def replay_pair(pair: str, m1_path: Optional[str], m5_path: Optional[str], min_score: int,
+                store_root: Optional[str] = None) -> Dict[str, Any]:
+    """Replay one pair and return its signals, per-expiry outcomes and candle count.
+
+    A scan is simulated at the close of every M1 bar inside a kill zone, with
+    that bar as the latest M1 bar and the M5 bar it belongs to as the forming
+    M5 bar, built only from M1 bars seen so far (no look-ahead). Closed M5 bars
+    come from the M5 file when given, otherwise from aggregated M1 bars.
+    With ``store_root`` both timeframes are read from the candle store instead.
+    """
+    # Imported here so worker processes pay for it once and the module stays cheap to import
+    from detection import TEHRAN_TZ, build_signal, in_kill_zone
+
+    started = time.perf_counter()
+    if store_root:
+        m1 = load_stored_candles(store_root, pair, "1m")
+        m5 = load_stored_candles(store_root, pair, "5m")
+    else:
+        m1 = load_candles(m1_path)
+        m5 = load_candles(m5_path) if m5_path else None
+    stored_m5: Dict[int, Tuple[float, float, float, float]] = {}
+    if m5 is not None:
+        stored_m5 = {
+            int(t): (o, h, l, c)
+            for t, o, h, l, c in zip(m5["time"], m5["open"], m5["high"], m5["low"], m5["close"])
+        }
+
+    times = m1["time"].to_numpy()
+    opens = m1["open"].to_numpy()
+    highs = m1["high"].to_numpy()
+    lows = m1["low"].to_numpy()
+    closes = m1["close"].to_numpy()
+    index_of = {int(t): i for i, t in enumerate(times)}
+
+    clock = SimulatedClock(TEHRAN_TZ)
+    m1_det = StreamingDetector()
+    m5_det = StreamingDetector()
+    stats = _empty_stats()
+    signals: List[Dict[str, Any]] = []
+
+    bucket: Optional[int] = None
+    forming: Optional[List[float]] = None
+    for i in range(len(times)):
+        t = int(times[i])
+        o, h, l, c = float(opens[i]), float(highs[i]), float(lows[i]), float(closes[i])
+
+        b = t - t % M5_SECONDS
+        if b != bucket:
+            if forming is not None:
+                closed = stored_m5.get(bucket, tuple(forming))
+                m5_det.update(Bar(bucket, *closed))
+            bucket = b
+            forming = [o, h, l, c]
+        else:
+            forming[1] = max(forming[1], h)
+            forming[2] = min(forming[2], l)
+            forming[3] = c
+
+        m1_state = m1_det.update(Bar(t, o, h, l, c))
+        clock.set(t + M1_SECONDS)
+        now = clock.now()
+        if not m1_state.engulf or not in_kill_zone(now, pair):
+            continue
+        m5_state = m5_det.peek(Bar(bucket, *forming))
+        sig = build_signal(pair, m5_state.ob, m5_state.fvg, m5_state.sweep, m5_state.bos, m1_state.engulf_dir, now)
+        if not sig or sig["score"] < min_score:
+            continue
+
+        expiry = sig["expiry"]
+        bucket_stats = stats[str(expiry)]
+        bucket_stats["signals"] += 1
+        exit_i = index_of.get(t + expiry * M1_SECONDS)
+        if exit_i is None:
+            result = "unresolved"
+        else:
+            move = closes[exit_i] - c
+            if move == 0:
+                result = "draw"
+            elif (move > 0) == (sig["direction"] == "CALL"):
+                result = "win"
+            else:
+                result = "loss"
+        bucket_stats[{"win": "wins", "loss": "losses", "draw": "draws", "unresolved": "unresolved"}[result]] += 1
+        signals.append({
+            "pair": pair,
+            "time": now.isoformat(),
+            "direction": sig["direction"],
+            "score": sig["score"],
+            "expiry": expiry,
+            "reason": sig["reason"],
+            "entry": c,
+            "result": result,
+        })
+
+    return {
+        "pair": pair,
+        "candles": int(len(times)),
+        "seconds": time.perf_counter() - started,
+        "stats": stats,
+        "signals": signals,
+    }
+
+
+def _init_worker(pair_zones: str) -> None:
+    # Per-pair kill zones, keyed by display name as in the live bot
+    from detection import KILL_ZONE_SCHEDULE
+    from zones import parse_pair_zones
+
+    KILL_ZONE_SCHEDULE.set_pair_zones(parse_pair_zones(pair_zones))
+
+
+def run_backtest(data_dir: Optional[str], pairs: Optional[List[str]] = None, workers: Optional[int] = None,
+                 min_score: int = 85, store_root: Optional[str] = None,
+                 pair_zones: Optional[str] = None) -> Dict[str, Any]:
+    """Replay every pair in ``data_dir`` or ``store_root`` (or just ``pairs``) across a process pool.
+
+    Requested pairs match by ``pair_slug``, so "EUR/USD OTC" finds the stored
+    ``EUR_USD_OTC``. ``pair_zones`` is a ``PAIR_KILL_ZONES`` value (default:
+    the environment's).
+    """
+    if store_root:
+        available = {p: (None, None) for p in discover_stored_pairs(store_root)}
+    else:
+        available = discover_pairs(data_dir)
+    by_slug = {pair_slug(p): p for p in available}
+    requested = pairs or sorted(available)
+    missing = [p for p in requested if pair_slug(p) not in by_slug]
+    if missing:
+        print(f"No M1 candles for: {', '.join(missing)}")
+    selected = [by_slug[pair_slug(p)] for p in requested if pair_slug(p) in by_slug]
+    if pair_zones is None:
+        pair_zones = os.getenv("PAIR_KILL_ZONES", "")
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    if selected:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pair_zones,)) as pool:
+            futures = [
+                pool.submit(replay_pair, p, available[p][0], available[p][1], min_score, store_root)
+                for p in selected
+            ]
+            results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+
+    totals = _empty_stats()
+    for res in results:
+        for expiry, st in res["stats"].items():
+            for k, v in st.items():
+                totals[expiry][k] += v
+    candles = sum(r["candles"] for r in results)
+    return {
+        "pairs": results,
+        "totals": totals,
+        "candles": candles,
+        "seconds": elapsed,
+        "candles_per_sec": candles / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def win_rate(st: Dict[str, int]) -> Optional[float]:
+    decided = st["wins"] + st["losses"]
+    return st["wins"] / decided if decided else None
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for res in report["pairs"]:
+        n = sum(st["signals"] for st in res["stats"].values())
+        print(f"{res['pair']}: {res['candles']} candles, {n} signals, {res['candles'] / max(res['seconds'], 1e-9):,.0f} candles/sec")
+    print("-" * 40)
+    for expiry, st in report["totals"].items():
+        wr = win_rate(st)
+        wr_text = f"{wr * 100:.1f}%" if wr is not None else "n/a"
+        print(f"Expiry {expiry}m: {st['signals']} signals, {st['wins']}W/{st['losses']}L/{st['draws']}D, win rate {wr_text}")
+    print(f"Total: {report['candles']} candles in {report['seconds']:.2f}s ({report['candles_per_sec']:,.0f} candles/sec)")
+
+
+def write_signals(report: Dict[str, Any], path: str) -> None:
+    fields = ["pair", "time", "direction", "score", "expiry", "reason", "entry", "result"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for res in report["pairs"]:
+            writer.writerows(res["signals"])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay the ICT strategy over stored M1/M5 candles.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="directory with <PAIR>_1m / <PAIR>_5m candle files")
+    source.add_argument("--store", help="candle store directory recorded by the live bot")
+    parser.add_argument("--pairs", nargs="*", help="pair names to replay (default: all found)")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--min-score", type=int, default=85, help="minimum confluence score to count a signal")
+    parser.add_argument("--signals-out", help="optional CSV file for every replayed signal")
+    args = parser.parse_args(argv)
+    try:
+        from dotenv import load_dotenv
+
+        # PAIR_KILL_ZONES of the bot's .env
+        load_dotenv()
+    except ImportError:
+        pass
+
+    report = run_backtest(args.data, args.pairs, args.workers, args.min_score, args.store)
+    if not report["pairs"]:
+        print(f"No M1 candles found in {args.store or args.data}")
+        return
+    print_report(report)
+    if args.signals_out:
+        write_signals(report, args.signals_out)
+
+
+if __name__ == "__main__":
+    main()
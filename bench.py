@@ -0,0 +1,604 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the scan path against a scriptable fake WebDriver.
+
+``FakeDriver`` answers the scripts and element lookups used by ``main.py``
+(chart state, both candle extraction scripts, asset and timeframe selectors,
+the asset index and the chart bridge) from synthetic candles, and counts every
+WebDriver round trip. Candles come from three generators: a trending walk, a
+mean-reverting range and a gap-heavy series with missing minutes and opening
+gaps.
+
+Each benchmark reports ops/sec, p50/p99 latency and WebDriver calls per
+operation. Results are compared with ``fixtures/bench_baseline.json``; the run
+fails (exit code 1) when ops/sec drops or p99 grows past the tolerance, or
+when an operation needs more WebDriver calls than before. Timings depend on
+the machine, so refresh the baseline with ``--save-baseline`` on the machine
+that runs the comparison.
+
+The payload benchmarks decode one extraction result of 50, 500 and 5,000
+bars from the JSON text Selenium receives, for each encoding the page can
+send: bar objects, column arrays and the packed base64 ``Float64Array``.
+
+The scan-cycle benchmark runs the body of the ``main()`` loop (priority order,
+pooled scan, strongest signal, message text) for one cycle per operation; the
+login, Telegram delivery and candle-close sleep around it are left out.
+
+Usage:
+    python bench.py                    # run everything and compare with the baseline
+    python bench.py -k get_candles     # only benchmarks whose name contains the filter
+    python bench.py --save-baseline    # store this run as the new baseline
+"""
+import argparse
+import base64
+import bisect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BASE_DIR, "fixtures", "bench_baseline.json")
+
+SCENARIOS = ("trending", "ranging", "gappy")
+BENCH_PAIRS = ["EUR/USD OTC", "GBP/USD OTC", "AUD/USD OTC", "USD/JPY OTC", "NZD/CAD OTC", "EUR/GBP OTC"]
+PAYLOAD_BARS = (50, 500, 5000)
+START_TIME = 1_700_000_100 - 1_700_000_100 % 300
+
+
+# -----------------------------
+# Synthetic candles
+# -----------------------------
+
+def _bars(times: Sequence[int], opens: np.ndarray, closes: np.ndarray, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    wick = np.abs(rng.normal(0.0, 2e-4, size=(2, len(opens))))
+    highs = np.maximum(opens, closes) + wick[0]
+    lows = np.minimum(opens, closes) - wick[1]
+    return [
+        {"time": int(t), "open": float(o), "high": float(h), "low": float(l), "close": float(c)}
+        for t, o, h, l, c in zip(times, opens, highs, lows, closes)
+    ]
+
+
+def trending(n: int, seed: int = 1, drift: float = 1.5e-4) -> List[Dict[str, Any]]:
+    """Random walk with drift whose sign flips every few hundred bars."""
+    rng = np.random.default_rng(seed)
+    sign = np.where((np.arange(n) // 300) % 2 == 0, 1.0, -1.0)
+    steps = sign * drift + rng.normal(0.0, 5e-4, n)
+    closes = 1.1 + np.cumsum(steps)
+    opens = np.concatenate([[1.1], closes[:-1]])
+    return _bars(START_TIME + 60 * np.arange(n), opens, closes, rng)
+
+
+def ranging(n: int, seed: int = 2, level: float = 1.1, pull: float = 0.05) -> List[Dict[str, Any]]:
+    """Mean-reverting walk around ``level``."""
+    rng = np.random.default_rng(seed)
+    closes = np.empty(n)
+    price = level
+    noise = rng.normal(0.0, 5e-4, n)
+    for i in range(n):
+        price += pull * (level - price) + noise[i]
+        closes[i] = price
+    opens = np.concatenate([[level], closes[:-1]])
+    return _bars(START_TIME + 60 * np.arange(n), opens, closes, rng)
+
+
+def gappy(n: int, seed: int = 3, missing: float = 0.1, gap: float = 0.05) -> List[Dict[str, Any]]:
+    """Walk with ~``missing`` of the minutes absent and opening gaps on ~``gap`` of the bars."""
+    rng = np.random.default_rng(seed)
+    minutes = np.cumsum(1 + (rng.random(n) < missing) * rng.integers(1, 4, n))
+    closes = 1.1 + np.cumsum(rng.normal(0.0, 5e-4, n))
+    jumps = (rng.random(n) < gap) * rng.normal(0.0, 3e-3, n)
+    opens = np.concatenate([[1.1], closes[:-1]]) + jumps
+    return _bars(START_TIME + 60 * minutes, opens, closes, rng)
+
+
+GENERATORS: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+    "trending": trending,
+    "ranging": ranging,
+    "gappy": gappy,
+}
+
+
+def roll_up(m1: List[Dict[str, Any]], seconds: int = 300) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for bar in m1:
+        bucket = bar["time"] - bar["time"] % seconds
+        if out and out[-1]["time"] == bucket:
+            last = out[-1]
+            last["high"] = max(last["high"], bar["high"])
+            last["low"] = min(last["low"], bar["low"])
+            last["close"] = bar["close"]
+        else:
+            out.append(dict(bar, time=bucket))
+    return out
+
+
+# -----------------------------
+# Fake WebDriver
+# -----------------------------
+
+class FakeElement:
+    def __init__(self, driver: "FakeDriver", text: str, on_click: Callable[[], None]) -> None:
+        self.driver = driver
+        self.text = text
+        self._on_click = on_click
+
+    def click(self) -> None:
+        self.driver.calls += 1
+        self._on_click()
+
+    def is_displayed(self) -> bool:
+        self.driver.calls += 1
+        return True
+
+    def is_enabled(self) -> bool:
+        self.driver.calls += 1
+        return True
+
+
+class FakeDriver:
+    """Scriptable stand-in for ``webdriver.Chrome`` serving synthetic candles.
+
+    ``series[pair]`` is a full M1 history; the chart shows the bars up to the
+    time of the first pair's bar ``cursor`` (at most ``visible`` of them), the
+    same moment for every pair, and ``advance`` moves it forward like the
+    clock would. ``bridge=False`` behaves like a page where the chart
+    bridge could not be installed; ``source="tv_widget"`` serves bars only
+    through the second extraction script.
+    """
+
+    def __init__(self, series: Dict[str, List[Dict[str, Any]]], cursor: int = 600, visible: int = 500,
+                 bridge: bool = True, source: str = "lc_series") -> None:
+        import main
+        import chart_bridge
+
+        self._main = main
+        self._bridge_mod = chart_bridge
+        self.m1 = series
+        self.m5 = {pair: roll_up(bars) for pair, bars in series.items()}
+        self._m1_times = {pair: [b["time"] for b in bars] for pair, bars in series.items()}
+        self._m5_times = {pair: [b["time"] for b in bars] for pair, bars in self.m5.items()}
+        self.cursor = cursor
+        self.visible = visible
+        self.bridge = bridge
+        self.source = source
+        self.pair = next(iter(series))
+        self.tf = "1m"
+        self.calls = 0
+        self.current_url = "https://qxbroker.com/en/trade"
+
+    # -- chart model ---------------------------------------------------
+
+    def advance(self, bars: int = 1) -> None:
+        self.cursor += bars
+
+    def last_time(self) -> int:
+        """Open time of the last closed M1 bar on the chart."""
+        first = next(iter(self.m1.values()))
+        return first[self.cursor - 1]["time"]
+
+    def clock(self) -> float:
+        """Wall time matching the chart: just after the close of the last visible bar."""
+        return float(self.last_time() + 62)
+
+    def bars(self, pair: Optional[str] = None, tf: Optional[str] = None) -> List[Dict[str, Any]]:
+        pair = pair or self.pair
+        m1 = self.m1[pair][: bisect.bisect_right(self._m1_times[pair], self.last_time())]
+        if (tf or self.tf) == "1m":
+            return m1[-self.visible:]
+        last = m1[-1]["time"] if m1 else 0
+        m5 = self.m5[pair]
+        end = bisect.bisect_right(self._m5_times[pair], last)
+        return m5[max(0, end - self.visible):end]
+
+    def _state(self) -> Optional[List[Any]]:
+        data = self.bars()
+        if len(data) < 2:
+            return None
+        steps = [y["time"] - x["time"] for x, y in zip(data[-6:], data[-5:])]
+        return [len(data), data[-1]["time"], min(s for s in steps if s > 0)]
+
+    def _slice(self, count: int, since: Any) -> List[Dict[str, Any]]:
+        data = self.bars()
+        start = max(0, len(data) - count)
+        if since is not None:
+            i = len(data)
+            while i > start and data[i - 1]["time"] >= since:
+                i -= 1
+            start = i
+        return data[start:]
+
+    def _switch(self, name: str) -> bool:
+        target = name.strip().lower()
+        for pair in self.m1:
+            if target in pair.lower():
+                self.pair = pair
+                return True
+        return False
+
+    def _set_tf(self, tf: str) -> None:
+        self.tf = tf.lower()
+
+    # -- WebDriver surface ---------------------------------------------
+
+    def execute_cdp_cmd(self, cmd: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls += 1
+        return {}
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        self.calls += 1
+        m = self._main
+        if script is m.CHART_STATE_JS:
+            return self._state()
+        if script is m.ASSET_LABEL_JS:
+            return self.pair
+        if script is m.TIMEFRAME_OPTION_JS:
+            return True
+        if script is self._bridge_mod.BRIDGE_JS:
+            return None
+        if "readyState" in script:
+            return "complete"
+        if len(args) >= 2 and "__lc_series" in script:
+            rows = self._slice(args[0], args[1]) if self.source == "lc_series" else []
+            return script_payload(rows, args[2] if len(args) > 2 else "plain")
+        if len(args) >= 2 and "tvWidget" in script:
+            return script_payload(self._slice(args[0], args[1]), args[2] if len(args) > 2 else "plain")
+        return None
+
+    def execute_async_script(self, script: str, *args: Any) -> Any:
+        self.calls += 1
+        m = self._main
+        if script is m.ASSET_INDEX_JS:
+            return [{"name": pair, "pos": i, "qa": "asset-item", "id": ""} for i, pair in enumerate(self.m1)]
+        if script is m.SWITCH_ASSET_JS:
+            ok = self._switch(args[0])
+            return {"ok": ok, "found": ok, "ms": 0}
+        if script is self._bridge_mod.CALL_JS:
+            if not self.bridge:
+                return {"error": "missing"}
+            req = args[0]
+            if not self._switch(req["pair"]):
+                return {"ok": False, "switched": False, "frames": {}, "ms": 0}
+            frames = {}
+            for r in req["reads"]:
+                self._set_tf(r["tf"])
+                rows = self._slice(r["count"], r["since"])
+                if len(rows) < r["minRows"]:
+                    frames[r["tf"]] = {"path": None, "tf_ok": True}
+                    continue
+                frames[r["tf"]] = dict(bridge_payload(rows, req.get("encoding", "plain")),
+                                       path=self.source, tf_ok=True)
+            return {"ok": True, "switched": True, "frames": frames, "ms": 0}
+        return None
+
+    def find_element(self, by: str, selector: str) -> FakeElement:
+        self.calls += 1
+        if "timeframe-selector" in selector or "asset-selector" in selector:
+            return FakeElement(self, "", lambda: None)
+        raise self._main.NoSuchElementException(selector)
+
+    def find_elements(self, by: str, selector: str) -> List[FakeElement]:
+        self.calls += 1
+        if selector == self._main.ASSET_ITEMS_SELECTOR:
+            return [FakeElement(self, pair, lambda p=pair: self._switch(p)) for pair in self.m1]
+        if "timeframe-option" in selector:
+            return [FakeElement(self, tf.upper(), lambda t=tf: self._set_tf(t)) for tf in ("1m", "5m")]
+        if "asset-selector" in selector or "balance" in selector:
+            return [FakeElement(self, "", lambda: None)]
+        return []
+
+    def get_cookies(self) -> List[Dict[str, Any]]:
+        self.calls += 1
+        return []
+
+    def quit(self) -> None:
+        pass
+
+
+def pack_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """What ``packBars`` returns for these bars."""
+    cols = np.array([[b[k] for b in rows] for k in ("time", "open", "high", "low", "close")], dtype="<f8")
+    return {"n": len(rows), "b64": base64.b64encode(cols.tobytes()).decode("ascii")}
+
+
+def script_payload(rows: List[Dict[str, Any]], encoding: str) -> Any:
+    """Result of a ``get_candles`` extraction script: packed, or a list of bar objects."""
+    if encoding == "packed":
+        return pack_rows(rows)
+    return [{"t": b["time"], "o": b["open"], "h": b["high"], "l": b["low"], "c": b["close"]} for b in rows]
+
+
+def bridge_payload(rows: List[Dict[str, Any]], encoding: str) -> Dict[str, Any]:
+    """Frame of a bridge ``readBars``: packed, or column arrays."""
+    if encoding == "packed":
+        return pack_rows(rows)
+    return {k: [b[name] for b in rows]
+            for k, name in (("t", "time"), ("o", "open"), ("h", "high"), ("l", "low"), ("c", "close"))}
+
+
+def make_series(n: int = 2000, pairs: Sequence[str] = BENCH_PAIRS) -> Dict[str, List[Dict[str, Any]]]:
+    """One synthetic M1 history per pair, cycling through the scenarios."""
+    return {pair: GENERATORS[SCENARIOS[i % len(SCENARIOS)]](n, seed=i + 1) for i, pair in enumerate(pairs)}
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+
+class Result(NamedTuple):
+    name: str
+    ops: int
+    ops_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    calls_per_op: float
+
+
+def measure(name: str, op: Callable[[int], Any], iterations: int, warmup: int = 5,
+            driver: Optional[FakeDriver] = None) -> Result:
+    """Time ``op(i)`` ``iterations`` times after ``warmup`` untimed calls."""
+    for i in range(warmup):
+        op(i)
+    calls = driver.calls if driver is not None else 0
+    latencies = np.empty(iterations)
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        op(warmup + i)
+        latencies[i] = time.perf_counter() - t0
+    total = time.perf_counter() - started
+    calls = (driver.calls - calls) / iterations if driver is not None else 0.0
+    return Result(
+        name,
+        iterations,
+        iterations / total if total > 0 else 0.0,
+        float(np.percentile(latencies, 50) * 1000),
+        float(np.percentile(latencies, 99) * 1000),
+        calls,
+    )
+
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+
+def bench_get_candles(iterations: int) -> List[Result]:
+    import main
+
+    results = []
+    for scenario in SCENARIOS:
+        driver = FakeDriver({"EUR/USD OTC": GENERATORS[scenario](2000)})
+        results.append(measure(f"get_candles/full/{scenario}",
+                               lambda i: main.get_candles(driver, "1m", main.M1_HISTORY), iterations, driver=driver))
+        since = driver.bars()[-1]["time"]
+        results.append(measure(f"get_candles/delta/{scenario}",
+                               lambda i: main.get_candles(driver, "1m", main.M1_HISTORY, since=since),
+                               iterations, driver=driver))
+    driver = FakeDriver({"EUR/USD OTC": trending(2000)}, source="tv_widget")
+    results.append(measure("get_candles/full/tv_widget",
+                           lambda i: main.get_candles(driver, "1m", main.M1_HISTORY), iterations, driver=driver))
+    return results
+
+
+def bench_payload(iterations: int) -> List[Result]:
+    """Decoding one extraction result as Selenium receives it (JSON text) into a candle window.
+
+    ``objects`` is the old list of ``{t,o,h,l,c}`` bars, ``columns`` the bridge's
+    JSON arrays and ``packed`` the base64 ``Float64Array``; page-side work is
+    not included.
+    """
+    import chart_bridge
+    import main
+
+    results = []
+    bars = trending(5000)
+    for n in PAYLOAD_BARS:
+        rows = bars[-n:]
+        wire = {
+            "objects": json.dumps(script_payload(rows, "plain")),
+            "columns": json.dumps(dict(bridge_payload(rows, "plain"), path="lc_series")),
+            "packed": json.dumps(dict(bridge_payload(rows, "packed"), path="lc_series")),
+        }
+        results.append(measure(f"payload/objects/{n}",
+                               lambda i: main.candles_from_result(json.loads(wire["objects"]), n, 1), iterations))
+        results.append(measure(f"payload/columns/{n}",
+                               lambda i: chart_bridge.frame_from_columns(json.loads(wire["columns"])), iterations))
+        results.append(measure(f"payload/packed/{n}",
+                               lambda i: chart_bridge.frame_from_columns(json.loads(wire["packed"])), iterations))
+    return results
+
+
+def bench_switch_to_pair(iterations: int) -> List[Result]:
+    import main
+
+    series = make_series(800)
+    driver = FakeDriver(series)
+    index = main.AssetIndex()
+    return [
+        measure("switch_to_pair/index",
+                lambda i: main.switch_to_pair(driver, BENCH_PAIRS[i % len(BENCH_PAIRS)], index),
+                iterations, driver=driver),
+        measure("switch_to_pair/dom",
+                lambda i: main.switch_to_pair(driver, BENCH_PAIRS[i % len(BENCH_PAIRS)]),
+                iterations, driver=driver),
+    ]
+
+
+def bench_detect(iterations: int) -> List[Result]:
+    import pandas as pd
+
+    import main
+    from candle_ring import CandleWindow
+    from ict_stream import DetectorBank
+
+    # Inside the New York kill zone so scoring runs in full
+    now = main.TEHRAN_TZ.localize(datetime(2024, 1, 2, 17, 0))
+    results = []
+    for scenario in SCENARIOS:
+        # Ring-buffer windows, as the scan path hands them to the detectors
+        m1_all = CandleWindow.from_frame(pd.DataFrame(GENERATORS[scenario](4000)))
+        m5_all = CandleWindow.from_frame(pd.DataFrame(roll_up(GENERATORS[scenario](4000))))
+
+        def windows(i: int):
+            end5 = main.M5_BARS + i % (len(m5_all) - main.M5_BARS)
+            end1 = end5 * 5
+            return m5_all.slice(end5 - main.M5_BARS, end5), m1_all.slice(end1 - main.M1_BARS, end1)
+
+        results.append(measure(f"detect_ict_signal/batch/{scenario}",
+                               lambda i: main.detect_ict_signal(*windows(i), "EUR/USD OTC", None, now), iterations))
+        bank = DetectorBank()
+        results.append(measure(f"detect_ict_signal/stream/{scenario}",
+                               lambda i: main.detect_ict_signal(*windows(i), "EUR/USD OTC", bank, now), iterations))
+    return results
+
+
+def bench_scan_cycle(iterations: int) -> List[Result]:
+    import main
+    from candle_store import CandleStore
+    from signal_cache import EvalCache
+
+    results = []
+    env = {"QUOTEX_EMAIL": "", "QUOTEX_PASSWORD": "", "HEADLESS": True}
+    # "unchanged" sweeps again before the next close: the evaluation cache answers without the chart
+    for label, bridge, local_m5, step in (("bridge+local_m5", True, True, 1), ("legacy+chart_m5", False, False, 1),
+                                          ("unchanged", True, True, 0)):
+        store_dir = tempfile.mkdtemp(prefix="bench-store-")
+        try:
+            driver = FakeDriver(make_series(600 + iterations + 20), cursor=300, bridge=bridge)
+            assets = main.AssetIndex()
+            aggregators = main.AggregatorBank() if local_m5 else None
+            pool = main.ScannerPool(driver, env, 1, aggregators, assets)
+            for worker in pool.workers:
+                worker.store = CandleStore(store_dir)
+                worker.cache = EvalCache(time_fn=driver.clock)
+                worker.time_fn = driver.clock
+            priority = main.PairPriority()
+            pairs = main.get_otc_pairs(driver, assets)
+
+            def cycle(i: int) -> None:
+                driver.advance(step)
+                result = pool.scan(priority.order(pairs), priority=priority)
+                strongest = result.strongest()
+                if strongest:
+                    main.format_signal_text(strongest)
+
+            results.append(measure(f"scan_cycle/{label}", cycle, iterations, driver=driver))
+            pool.close()
+            for worker in pool.workers:
+                worker.store.close()
+        finally:
+            shutil.rmtree(store_dir, ignore_errors=True)
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[int], List[Result]]] = {
+    "get_candles": bench_get_candles,
+    "payload": bench_payload,
+    "switch_to_pair": bench_switch_to_pair,
+    "detect_ict_signal": bench_detect,
+    "scan_cycle": bench_scan_cycle,
+}
+
+# Iterations per benchmark family (scaled by --scale)
+ITERATIONS = {"get_candles": 300, "payload": 200, "switch_to_pair": 300, "detect_ict_signal": 300, "scan_cycle": 60}
+
+
+# -----------------------------
+# Baselines
+# -----------------------------
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(path: str, results: List[Result]) -> None:
+    data = {
+        "python": sys.version.split()[0],
+        "saved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "results": {r.name: r._asdict() for r in results},
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+
+def compare(results: List[Result], baseline: Dict[str, Dict[str, float]], tolerance: float,
+            p99_tolerance: float) -> List[str]:
+    """Regressions against ``baseline`` as human-readable lines (empty when all pass)."""
+    problems = []
+    for r in results:
+        base = baseline.get(r.name)
+        if not base:
+            continue
+        if r.ops_per_sec < base["ops_per_sec"] * (1 - tolerance):
+            problems.append(f"{r.name}: {r.ops_per_sec:,.0f} ops/s vs baseline {base['ops_per_sec']:,.0f}")
+        if r.p99_ms > base["p99_ms"] * (1 + p99_tolerance):
+            problems.append(f"{r.name}: p99 {r.p99_ms:.3f}ms vs baseline {base['p99_ms']:.3f}ms")
+        if r.calls_per_op > base["calls_per_op"] + 1e-9:
+            problems.append(f"{r.name}: {r.calls_per_op:.2f} WebDriver calls/op vs baseline {base['calls_per_op']:.2f}")
+    return problems
+
+
+def print_results(results: List[Result], baseline: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'benchmark':<36} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'calls/op':>9} {'vs base':>8}")
+    for r in results:
+        base = baseline.get(r.name)
+        delta = f"{(r.ops_per_sec / base['ops_per_sec'] - 1) * 100:+.0f}%" if base and base["ops_per_sec"] else ""
+        print(f"{r.name:<36} {r.ops_per_sec:>10,.0f} {r.p50_ms:>9.3f} {r.p99_ms:>9.3f} {r.calls_per_op:>9.2f} {delta:>8}")
+
+
+def run(names: Sequence[str], scale: float = 1.0, name_filter: Optional[str] = None) -> List[Result]:
+    results: List[Result] = []
+    for name in names:
+        for r in BENCHMARKS[name](max(5, int(ITERATIONS[name] * scale))):
+            if not name_filter or name_filter in r.name:
+                results.append(r)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the scan path against a fake WebDriver.")
+    parser.add_argument("-k", dest="name_filter", help="only benchmarks whose name contains this text")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the iteration counts")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed ops/sec drop (fraction)")
+    parser.add_argument("--p99-tolerance", type=float, default=1.0, help="allowed p99 growth (fraction)")
+    parser.add_argument("--json", dest="json_out", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    f = args.name_filter
+    # A filter naming no family (e.g. a scenario) runs every family and filters the results
+    names = [n for n in BENCHMARKS if not f or n in f or f in n] or list(BENCHMARKS)
+    results = run(names, args.scale, args.name_filter)
+    baseline = load_baseline(args.baseline)
+    print_results(results, baseline)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump([r._asdict() for r in results], f, indent=1)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    problems = compare(results, baseline, args.tolerance, args.p99_tolerance)
+    if problems:
+        print("\nRegressions:")
+        for line in problems:
+            print(f"  {line}")
+        return 1
+    if baseline:
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""Fixed-capacity candle buffers backed by contiguous NumPy columns.
+
+``CandleRing`` holds the newest ``capacity`` bars of one pair and timeframe in
+five arrays (time int64, open/high/low/close float64) of twice the capacity.
+Bars are written at the end; when the arrays are full the newest bars are
+moved to the front, once per ``capacity`` appends. The newest bars are
+therefore always one contiguous slice, ``window`` returns views on it without
+copying, and memory use is fixed when the ring is created.
+
+``CandleWindow`` is such a view and reads like a candle DataFrame:
+``w["close"]`` is a float64 array, ``len(w)``, ``w.tail(n)``; the bar
+``color`` is computed only when asked for. A window on a ring is valid until
+the ring is written again; ``copy`` detaches it.
+
+Bar times are epoch seconds. Some charts time bars in milliseconds; windows
+built from page data (``from_columns``, ``from_buffer``) scale those down, so
+comparisons with candle closes and M5 bucketing see one unit.
+"""
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+COLUMNS = ("time", "open", "high", "low", "close")
+
+# Epoch times above this are milliseconds (1e11 seconds is beyond the year 5000)
+MS_EPOCH = 1e11
+
+
+def epoch_seconds(t: Any) -> Any:
+    """An epoch time, or array of them, in seconds; milliseconds are divided by 1000."""
+    if isinstance(t, np.ndarray):
+        return t / 1000.0 if t.size and np.nanmax(t) > MS_EPOCH else t
+    return t / 1000.0 if t is not None and t > MS_EPOCH else t
+
+
+def _floats(values: Sequence[Any]) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Missing prices come back as null from the page; count them as 0 like the old parser
+        out = np.empty(len(values), dtype=np.float64)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v or 0.0)
+            except (TypeError, ValueError):
+                out[i] = 0.0
+        return out
+
+
+class CandleWindow:
+    """Consecutive bars as five equal-length column arrays (views or owned)."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, time: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray) -> None:
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+
+    @classmethod
+    def from_columns(cls, times: Sequence[Any], opens: Sequence[Any], highs: Sequence[Any],
+                     lows: Sequence[Any], closes: Sequence[Any]) -> Optional["CandleWindow"]:
+        """Owned window from column sequences; bars without a time are dropped, None if none is left."""
+        if any(t is None for t in times):
+            keep = [i for i, t in enumerate(times) if t is not None]
+            times = [times[i] for i in keep]
+            opens, highs, lows, closes = ([col[i] for i in keep] for col in (opens, highs, lows, closes))
+        if not len(times):
+            return None
+        return cls(epoch_seconds(np.asarray(times, dtype=np.float64)).astype(np.int64), _floats(opens),
+                   _floats(highs), _floats(lows), _floats(closes))
+
+    @classmethod
+    def from_frame(cls, df) -> Optional["CandleWindow"]:
+        """Window from anything with the candle columns (DataFrame, store records, window)."""
+        if df is None or len(df) == 0:
+            return None
+        if isinstance(df, CandleWindow):
+            return df
+        return cls.from_columns(*(np.asarray(df[name]) for name in COLUMNS))
+
+    @classmethod
+    def from_buffer(cls, data: bytes, count: int) -> Optional["CandleWindow"]:
+        """Window on ``count`` bars packed as five little-endian float64 columns, one after another.
+
+        The price columns are read-only views on ``data``; bars whose time is
+        NaN (missing on the page) are dropped. None when the size does not match
+        or no bar is left.
+        """
+        cols = np.frombuffer(data, dtype="<f8")
+        if count <= 0 or cols.size != len(COLUMNS) * count:
+            return None
+        cols = cols.reshape(len(COLUMNS), count)
+        if np.isnan(cols[0]).any():
+            cols = cols[:, ~np.isnan(cols[0])]
+            if not cols.shape[1]:
+                return None
+        return cls(epoch_seconds(cols[0]).astype(np.int64), cols[1], cols[2], cols[3], cols[4])
+
+    @property
+    def color(self) -> np.ndarray:
+        return np.where(self.close >= self.open, "green", "red")
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name == "color":
+            return self.color
+        if name in COLUMNS:
+            return getattr(self, name)
+        raise KeyError(name)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def slice(self, start: int, stop: Optional[int] = None) -> "CandleWindow":
+        return CandleWindow(*(getattr(self, name)[start:stop] for name in COLUMNS))
+
+    def tail(self, count: int) -> "CandleWindow":
+        return self.slice(max(0, len(self.time) - count))
+
+    def since(self, t: Any) -> "CandleWindow":
+        """Bars with ``time >= t``."""
+        return self.slice(int(np.searchsorted(self.time, t, side="left")))
+
+    def before(self, t: Any) -> "CandleWindow":
+        """Bars with ``time < t``."""
+        return self.slice(0, int(np.searchsorted(self.time, t, side="left")))
+
+    def last_time(self) -> Optional[int]:
+        return int(self.time[-1]) if len(self.time) else None
+
+    def copy(self) -> "CandleWindow":
+        return CandleWindow(*(getattr(self, name).copy() for name in COLUMNS))
+
+    def to_frame(self):
+        """The ``get_candles`` DataFrame layout, for code that still wants pandas."""
+        import pandas as pd
+
+        df = pd.DataFrame({name: getattr(self, name) for name in COLUMNS})
+        df["color"] = self.color
+        return df
+
+
+class CandleRing:
+    """The newest ``capacity`` bars of one series, ascending by time."""
+
+    __slots__ = ("capacity", "_time", "_open", "_high", "_low", "_close", "_start", "_end")
+
+    def __init__(self, capacity: int = 500) -> None:
+        self.capacity = max(1, int(capacity))
+        self._allocate(self.capacity)
+        self._start = 0
+        self._end = 0
+
+    def _allocate(self, capacity: int) -> None:
+        size = 2 * capacity
+        self._time = np.zeros(size, dtype=np.int64)
+        self._open = np.zeros(size, dtype=np.float64)
+        self._high = np.zeros(size, dtype=np.float64)
+        self._low = np.zeros(size, dtype=np.float64)
+        self._close = np.zeros(size, dtype=np.float64)
+
+    def _columns(self):
+        return self._time, self._open, self._high, self._low, self._close
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def clear(self) -> None:
+        self._start = self._end = 0
+
+    def reserve(self, capacity: int) -> None:
+        """Grow to hold ``capacity`` bars (the only reallocation a ring makes)."""
+        if capacity <= self.capacity:
+            return
+        held = self.window()
+        self.capacity = int(capacity)
+        self._allocate(self.capacity)
+        n = len(held)
+        for dst, src in zip(self._columns(), (held.time, held.open, held.high, held.low, held.close)):
+            dst[:n] = src
+        self._start, self._end = 0, n
+
+    def window(self, count: Optional[int] = None) -> CandleWindow:
+        """The newest ``count`` bars (all held without it) as views on the ring."""
+        start = self._start if count is None else max(self._start, self._end - count)
+        return CandleWindow(*(col[start:self._end] for col in self._columns()))
+
+    def last_time(self) -> Optional[int]:
+        return int(self._time[self._end - 1]) if self._end > self._start else None
+
+    def find(self, t: Any) -> Optional[int]:
+        """Index (from the oldest held bar) of the bar opened at ``t``."""
+        times = self._time[self._start:self._end]
+        i = int(np.searchsorted(times, t, side="left"))
+        return i if i < len(times) and times[i] == t else None
+
+    def _room(self, n: int) -> None:
+        if self._end + n <= 2 * self.capacity:
+            return
+        keep = min(len(self), self.capacity - n)
+        src = self._end - keep
+        for col in self._columns():
+            col[:keep] = col[src:self._end]
+        self._start, self._end = 0, keep
+
+    def append(self, t: int, o: float, h: float, l: float, c: float) -> None:
+        self._room(1)
+        i = self._end
+        self._time[i], self._open[i], self._high[i], self._low[i], self._close[i] = t, o, h, l, c
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def set(self, index: int, high: float, low: float, close: Optional[float] = None) -> None:
+        """Overwrite high/low (and close) of a held bar; ``index`` as in ``find``, negative from the newest."""
+        i = (self._end + index) if index < 0 else (self._start + index)
+        self._high[i] = high
+        self._low[i] = low
+        if close is not None:
+            self._close[i] = close
+
+    def merge(self, bars: CandleWindow) -> None:
+        """Replace held bars from the first time in ``bars`` on with ``bars`` (its copy of a bar wins)."""
+        if bars is None or not len(bars):
+            return
+        times = self._time[self._start:self._end]
+        self._end = self._start + int(np.searchsorted(times, bars.time[0], side="left"))
+        if len(bars) >= self.capacity:
+            bars = bars.tail(self.capacity)
+            self._start = self._end = 0
+        n = len(bars)
+        self._room(n)
+        for dst, src in zip(self._columns(), (bars.time, bars.open, bars.high, bars.low, bars.close)):
+            dst[self._end:self._end + n] = src
+        self._end += n
+        if self._end - self._start > self.capacity:
+            self._start = self._end - self.capacity
+
+    def replace(self, bars: Optional[CandleWindow]) -> None:
+        self.clear()
+        if bars is not None:
+            self.merge(bars)
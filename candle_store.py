@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Append-only on-disk candle store, one memory-mapped file per pair and timeframe.
+
+Each file is a flat array of fixed-size records (time int64, open/high/low/close
+float64) sorted by bar time, so range reads are a binary search on a memory
+map with no parsing. Writing a bar whose time is already stored replaces it
+(the still-forming bar is rewritten until it closes); anything older than the
+tail is merged in with a one-off rewrite.
+
+Folders are named by ``pair_slug``; the pair's display name ("EUR/USD OTC")
+is kept next to its files in ``pair.txt`` so offline tools can report and
+score by the name the bot uses.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+NAME_FILE = "pair.txt"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CANDLES_DIR = os.getenv("CANDLE_STORE_DIR", "") or os.path.join(BASE_DIR, "data", "candles")
+
+CANDLE_DTYPE = np.dtype([
+    ("time", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+])
+
+
+def pair_slug(pair: str) -> str:
+    """File-system safe name for a pair, e.g. 'EUR/USD OTC' -> 'EUR_USD_OTC'."""
+    return re.sub(r"[^A-Za-z0-9]+", "_", pair.strip()).strip("_")
+
+
+def unslug(slug: str) -> str:
+    """Best guess of the display name behind a slug: 'EUR_USD_OTC' -> 'EUR/USD OTC'."""
+    parts = slug.split("_")
+    if len(parts) >= 2 and all(len(p) == 3 and p.isalpha() for p in parts[:2]):
+        parts = [f"{parts[0]}/{parts[1]}"] + parts[2:]
+    return " ".join(parts)
+
+
+def to_records(times: Sequence, opens: Sequence[float], highs: Sequence[float],
+               lows: Sequence[float], closes: Sequence[float]) -> np.ndarray:
+    """Pack candle columns into sorted, de-duplicated records; bars without a time are dropped."""
+    keep = [i for i, t in enumerate(times) if t is not None]
+    rec = np.empty(len(keep), dtype=CANDLE_DTYPE)
+    if not keep:
+        return rec
+    rec["time"] = [int(times[i]) for i in keep]
+    rec["open"] = [opens[i] for i in keep]
+    rec["high"] = [highs[i] for i in keep]
+    rec["low"] = [lows[i] for i in keep]
+    rec["close"] = [closes[i] for i in keep]
+    return _dedupe(rec)
+
+
+def _dedupe(rec: np.ndarray) -> np.ndarray:
+    """Sort by time keeping the last occurrence of each bar time."""
+    if len(rec) < 2:
+        return rec
+    order = np.argsort(rec["time"], kind="stable")
+    rec = rec[order]
+    last = np.ones(len(rec), dtype=bool)
+    last[:-1] = rec["time"][1:] != rec["time"][:-1]
+    return rec[last]
+
+
+class CandleStore:
+    """Candles keyed by (pair, timeframe, bar time) under ``root``."""
+
+    def __init__(self, root: str = CANDLES_DIR) -> None:
+        self.root = root
+        self._maps: Dict[str, Tuple[int, np.ndarray]] = {}
+        self._named: Set[str] = set()
+
+    def path(self, pair: str, tf_label: str) -> str:
+        return os.path.join(self.root, pair_slug(pair), f"{tf_label}.bin")
+
+    def _map(self, pair: str, tf_label: str) -> np.ndarray:
+        """Memory map of the file, reopened only when its size changed."""
+        path = self.path(pair, tf_label)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        cached = self._maps.get(path)
+        if cached and cached[0] == size:
+            return cached[1]
+        count = size // CANDLE_DTYPE.itemsize
+        if count == 0:
+            arr = np.empty(0, dtype=CANDLE_DTYPE)
+        else:
+            arr = np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(count,))
+        self._maps[path] = (size, arr)
+        return arr
+
+    def append(self, pair: str, tf_label: str, records: np.ndarray) -> int:
+        """Store ``records`` (``CANDLE_DTYPE``); return how many new bar times were added."""
+        records = _dedupe(np.asarray(records, dtype=CANDLE_DTYPE))
+        if len(records) == 0:
+            return 0
+        path = self.path(pair, tf_label)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write_name(pair)
+        stored = self._map(pair, tf_label)
+        if len(stored) == 0:
+            self._write(path, records)
+            return len(records)
+
+        last_time = int(stored["time"][-1])
+        older = records["time"][records["time"] < last_time]
+        if len(older) and not np.isin(older, stored["time"]).all():
+            # Back-fill of bars missing before the tail: merge and rewrite once
+            merged = _dedupe(np.concatenate([np.asarray(stored), records]))
+            added = len(merged) - len(stored)
+            self._write(path, merged)
+            return added
+        records = records[records["time"] >= last_time]
+
+        added = 0
+        if len(records) and int(records["time"][0]) == last_time:
+            # Rewrite the tail bar in place (it was still forming when stored)
+            self._maps.pop(path, None)
+            with open(path, "r+b") as f:
+                f.seek((len(stored) - 1) * CANDLE_DTYPE.itemsize)
+                f.write(records[:1].tobytes())
+            records = records[1:]
+        if len(records):
+            self._maps.pop(path, None)
+            with open(path, "ab") as f:
+                f.write(records.tobytes())
+            added = len(records)
+        return added
+
+    def append_columns(self, pair: str, tf_label: str, times: Sequence, opens: Sequence[float],
+                       highs: Sequence[float], lows: Sequence[float], closes: Sequence[float]) -> int:
+        return self.append(pair, tf_label, to_records(times, opens, highs, lows, closes))
+
+    def append_frame(self, pair: str, tf_label: str, df) -> int:
+        """Store a candle DataFrame as returned by ``get_candles``."""
+        if df is None or len(df) == 0:
+            return 0
+        return self.append_columns(
+            pair, tf_label, df["time"].tolist(), df["open"].tolist(), df["high"].tolist(),
+            df["low"].tolist(), df["close"].tolist(),
+        )
+
+    def _write_name(self, pair: str) -> None:
+        """Record the display name once per pair folder (stores from before ``pair.txt`` included)."""
+        slug = pair_slug(pair)
+        if slug in self._named:
+            return
+        name_path = os.path.join(self.root, slug, NAME_FILE)
+        if not os.path.exists(name_path):
+            with open(name_path, "w", encoding="utf-8") as f:
+                f.write(pair.strip())
+        self._named.add(slug)
+
+    def _write(self, path: str, records: np.ndarray) -> None:
+        self._maps.pop(path, None)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(np.ascontiguousarray(records).tobytes())
+        os.replace(tmp, path)
+
+    def read(self, pair: str, tf_label: str, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Bars with ``start <= time < end`` as a read-only view on the memory map."""
+        arr = self._map(pair, tf_label)
+        if len(arr) == 0:
+            return arr
+        times = arr["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = len(arr) if end is None else int(np.searchsorted(times, end, side="left"))
+        return arr[lo:hi]
+
+    def tail(self, pair: str, tf_label: str, count: int) -> np.ndarray:
+        arr = self._map(pair, tf_label)
+        return arr[max(0, len(arr) - count):]
+
+    def last_time(self, pair: str, tf_label: str) -> Optional[int]:
+        arr = self._map(pair, tf_label)
+        return int(arr["time"][-1]) if len(arr) else None
+
+    def read_frame(self, pair: str, tf_label: str, start: Optional[int] = None, end: Optional[int] = None):
+        """``read`` as a DataFrame with the ``get_candles`` columns."""
+        import pandas as pd
+
+        rec = self.read(pair, tf_label, start, end)
+        df = pd.DataFrame({name: np.array(rec[name]) for name in CANDLE_DTYPE.names})
+        df["color"] = np.where(df["close"] >= df["open"], "green", "red")
+        return df
+
+    def pairs(self) -> List[str]:
+        """Slugs of every pair with stored candles."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def name(self, slug: str) -> str:
+        """Display name of a stored pair (from ``pair.txt``, else ``unslug``)."""
+        try:
+            with open(os.path.join(self.root, slug, NAME_FILE), "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except OSError:
+            name = ""
+        return name or unslug(slug)
+
+    def timeframes(self, pair: str) -> List[str]:
+        folder = os.path.join(self.root, pair_slug(pair))
+        if not os.path.isdir(folder):
+            return []
+        return sorted(f[:-4] for f in os.listdir(folder) if f.endswith(".bin"))
+
+    def close(self) -> None:
+        self._maps.clear()
+
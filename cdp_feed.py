@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Quote ticks from the trading page's WebSocket, tapped through Chrome DevTools.
+
+Chrome reports every WebSocket frame as a ``Network.webSocketFrameReceived``
+DevTools event. With performance logging enabled on the driver (see
+``enable_performance_log``) those events can be drained with
+``driver.get_log("performance")``; ``WebSocketTap`` does that on a background
+thread and puts decoded ``Tick`` objects on a queue. Ticks arrive for every
+subscribed asset at once, so no chart switching is needed to follow them.
+
+The decoder only sees the CDP message dicts, so it can be run offline against
+frames recorded with ``record_path`` (one CDP message per JSONL line), e.g.
+``fixtures/ws_frames.jsonl``.
+"""
+import base64
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+FRAME_EVENT = "Network.webSocketFrameReceived"
+QUOTES_EVENT = "quotes/stream"
+
+# socket.io text packets: "<type digits>[-<ack id>]<json>" e.g. '42["quotes/stream",[...]]'
+_SIO_PREFIX = re.compile(r"^\d+(?:-)?")
+
+
+class Tick(NamedTuple):
+    pair: str
+    time: float
+    price: float
+
+
+def asset_to_pair(asset: str) -> str:
+    """Platform asset code to the selector name used by the bot: 'EURUSD_otc' -> 'EUR/USD OTC'."""
+    code = asset.strip()
+    otc = code.lower().endswith("_otc")
+    if otc:
+        code = code[:-4]
+    if len(code) == 6 and code.isalpha():
+        code = f"{code[:3]}/{code[3:]}"
+    return f"{code.upper()} OTC" if otc else code.upper()
+
+
+def _ticks_from_rows(rows: Any) -> List[Tick]:
+    """Rows look like [asset, unix time, price, ...]; anything else is ignored."""
+    ticks: List[Tick] = []
+    if not isinstance(rows, list):
+        return ticks
+    for row in rows:
+        if not isinstance(row, list) or len(row) < 3 or not isinstance(row[0], str):
+            continue
+        try:
+            ticks.append(Tick(asset_to_pair(row[0]), float(row[1]), float(row[2])))
+        except (TypeError, ValueError):
+            continue
+    return ticks
+
+
+def decode_payload(opcode: int, payload: str) -> List[Tick]:
+    """Decode one WebSocket frame payload as reported by CDP.
+
+    Binary frames (opcode 2) are base64 in CDP and carry a one-byte socket.io
+    marker (0x04) before the JSON rows. Text frames (opcode 1) may carry the
+    rows directly or as a '42["quotes/stream", rows]' event.
+    """
+    try:
+        if opcode == 2:
+            raw = base64.b64decode(payload)
+            if raw[:1] == b"\x04":
+                raw = raw[1:]
+            data = json.loads(raw.decode("utf-8"))
+        else:
+            text = _SIO_PREFIX.sub("", payload, count=1)
+            if not text or text[0] not in "[{":
+                return []
+            data = json.loads(text)
+    except (ValueError, UnicodeDecodeError):
+        return []
+    if isinstance(data, list) and len(data) == 2 and data[0] == QUOTES_EVENT:
+        data = data[1]
+    return _ticks_from_rows(data)
+
+
+def decode_message(message: Dict[str, Any]) -> List[Tick]:
+    """Decode a CDP message dict ({"method": ..., "params": {...}}); non-frame events give []."""
+    if message.get("method") != FRAME_EVENT:
+        return []
+    response = message.get("params", {}).get("response", {})
+    return decode_payload(int(response.get("opcode", 1)), response.get("payloadData", ""))
+
+
+def iter_recorded_messages(path: str) -> Iterator[Dict[str, Any]]:
+    """CDP messages from a JSONL recording."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def replay_recording(path: str, out: Optional["queue.Queue[Tick]"] = None) -> List[Tick]:
+    """Decode a recording offline; ticks are also put on ``out`` when given."""
+    ticks: List[Tick] = []
+    for message in iter_recorded_messages(path):
+        for tick in decode_message(message):
+            ticks.append(tick)
+            if out is not None:
+                out.put(tick)
+    return ticks
+
+
+def enable_performance_log(chrome_options) -> None:
+    """Ask chromedriver to buffer DevTools network events, including WebSocket frames."""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def _messages_from_log(entries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for entry in entries:
+        try:
+            yield json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+
+
+class WebSocketTap:
+    """Background reader turning the driver's performance log into ticks on ``ticks``."""
+
+    def __init__(self, driver, maxsize: int = 100_000, interval: float = 0.25,
+                 record_path: Optional[str] = None) -> None:
+        self.driver = driver
+        self.ticks: "queue.Queue[Tick]" = queue.Queue(maxsize=maxsize)
+        self.interval = interval
+        self.record_path = record_path
+        self.frames = 0
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> int:
+        """Drain the performance log once; return the number of ticks queued."""
+        entries = self.driver.get_log("performance")
+        queued = 0
+        record = open(self.record_path, "a", encoding="utf-8") if self.record_path else None
+        try:
+            for message in _messages_from_log(entries):
+                if message.get("method") != FRAME_EVENT:
+                    continue
+                self.frames += 1
+                if record is not None:
+                    record.write(json.dumps(message) + "\n")
+                for tick in decode_message(message):
+                    try:
+                        self.ticks.put_nowait(tick)
+                        queued += 1
+                    except queue.Full:
+                        self.dropped += 1
+        finally:
+            if record is not None:
+                record.close()
+        return queued
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logging.warning("WebSocket tap poll failed: %s", e)
+            self._stop.wait(self.interval)
+
+    def start(self) -> "WebSocketTap":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ws-tap", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def drain(self, limit: Optional[int] = None) -> List[Tick]:
+        """Take everything (or up to ``limit`` ticks) currently queued."""
+        out: List[Tick] = []
+        while limit is None or len(out) < limit:
+            try:
+                out.append(self.ticks.get_nowait())
+            except queue.Empty:
+                break
+        return out
+
+
+def wait_for_ticks(tap: WebSocketTap, timeout: float = 10.0) -> bool:
+    """True once the tap has seen at least one quote frame, False after ``timeout``."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not tap.ticks.empty():
+            return True
+        time.sleep(tap.interval)
+    return False
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""In-page helper that switches asset and reads chart bars in one WebDriver call.
+
+``BRIDGE_JS`` defines ``window.__qxBridge`` and is registered with
+``Page.addScriptToEvaluateOnNewDocument`` (see ``install``) so it exists on
+every page load. ``read_pair`` then costs a single ``execute_async_script``:
+the page switches to the asset, sets each requested timeframe, reads its bars
+and returns them together with the name of the series source that produced
+them (``lc_series`` or ``tv_widget``).
+
+Bars come back in one of two encodings (``CANDLE_PAYLOAD``): ``packed``, the
+default, is one ``Float64Array`` holding the time, open, high, low and close
+columns back to back, sent base64-encoded and decoded here with a single
+``np.frombuffer``; ``plain`` is five JSON arrays. A packed frame is one string
+for Selenium to decode instead of ``5 * n`` numbers, so deep history reads stay
+cheap on the Python side.
+
+Selectors and series sources are the same ones ``main.py`` uses on the
+step-by-step path, which stays as the fallback. When a page cannot run the
+bridge, ``BRIDGE_STATUS`` remembers it for that driver and ``usable`` says no
+until ``retry_after`` seconds have passed, so the fallback does not pay for a
+failing bridge call (and a warning) on every pair.
+"""
+import base64
+import binascii
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from aggregator import tf_seconds
+from candle_ring import CandleWindow
+
+BRIDGE_VERSION = 3
+
+# packBars(cols) -> {n, b64}: columns [t, o, h, l, c] as one float64 block, column after
+# column (little-endian, as every platform Chrome runs on). A missing time is NaN so the
+# bar can be dropped; a missing price is 0 like the plain parser. epochSeconds(t) turns bar
+# times of charts that count in milliseconds into seconds (candle_ring.MS_EPOCH).
+PACK_JS = """
+function epochSeconds(t) {
+  return t > 1e11 ? t / 1000 : t;
+}
+function packBars(cols) {
+  const n = cols[0].length, buf = new Float64Array(5 * n);
+  for (let k = 0; k < 5; k++) {
+    const col = cols[k];
+    for (let i = 0; i < n; i++) {
+      const v = col[i];
+      let x = (v === null || v === undefined) ? NaN : +v;
+      if (k && x !== x) x = 0;
+      buf[k * n + i] = x;
+    }
+  }
+  const bytes = new Uint8Array(buf.buffer);
+  let s = '';
+  for (let i = 0; i < bytes.length; i += 0x8000) {
+    s += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+  }
+  return {n: n, b64: btoa(s)};
+}
+"""
+
+BRIDGE_JS = """
+(function () {
+  if (window.__qxBridge && window.__qxBridge.version >= %(version)d) return;
+  const ITEMS = "[data-qa='asset-item'], li, div[role='option']";
+  const TF_OPTIONS = "[data-qa='timeframe-option'], button, li";
+  const sleep = ms => new Promise(r => setTimeout(r, ms));
+  const text = el => ((el && (el.innerText || el.textContent)) || '').trim();
+  async function until(cond, timeoutMs) {
+    const end = Date.now() + timeoutMs;
+    for (;;) {
+      let v = null;
+      try { v = cond(); } catch (e) {}
+      if (v) return v;
+      if (Date.now() > end) return null;
+      await sleep(50);
+    }
+  }
+  const SOURCES = [
+    ['lc_series', () => {
+      const s = window.__lc_series || window.series || null;
+      return (s && s.series && s.series[0] && s.series[0].data) || null;
+    }],
+    ['tv_widget', () => {
+      const w = window.tvWidget || window.widget || null;
+      if (!w || !w.activeChart) return null;
+      const c = w.activeChart();
+      return c._bars || c._data || null;
+    }],
+  ];
+  const barTime = b => epochSeconds(b.time || b.t);
+  %(pack)s
+  function series() {
+    for (const [name, get] of SOURCES) {
+      let data = null;
+      try { data = get(); } catch (e) {}
+      if (data && data.length) return [name, data];
+    }
+    return [null, null];
+  }
+  function state() {
+    const data = series()[1];
+    if (!data || data.length < 2 || !data[data.length - 1]) return null;
+    // Smallest recent spacing, so a bar missing from the feed does not look like another timeframe
+    let step = null;
+    for (let i = data.length - 1; i > 0 && i > data.length - 6; i--) {
+      if (!data[i - 1] || !data[i]) continue;
+      const d = barTime(data[i]) - barTime(data[i - 1]);
+      if (d > 0 && (step === null || d < step)) step = d;
+    }
+    return step === null ? null : [data.length, barTime(data[data.length - 1]), step];
+  }
+  const label = () => text(document.querySelector("[data-qa='asset-selector']")).toLowerCase();
+  function openSelector() {
+    const opener = document.querySelector("[data-qa='asset-selector']")
+      || document.querySelector("button[class*='asset'], [class*='asset']");
+    if (opener) opener.click();
+  }
+  async function switchAsset(name, pos, timeoutMs) {
+    const want = String(name).trim().toLowerCase();
+    if (label().includes(want)) return true;
+    const before = state();
+    const matches = el => !!el && text(el).toLowerCase().includes(want);
+    const find = () => {
+      const list = Array.from(document.querySelectorAll(ITEMS));
+      return matches(list[pos]) ? list[pos] : list.find(matches);
+    };
+    let el = find();
+    if (!el) { openSelector(); el = await until(find, timeoutMs); }
+    if (!el) return false;
+    el.scrollIntoView({block: 'center'});
+    el.click();
+    await until(() => {
+      if (label().includes(want)) return true;
+      const now = state();
+      return before && now && (now[0] !== before[0] || now[1] !== before[1]);
+    }, timeoutMs);
+    return true;
+  }
+  async function setTimeframe(tf, seconds, timeoutMs) {
+    const shows = () => { const s = state(); return !!s && (s[2] === seconds || s[2] === seconds * 1000); };
+    if (shows()) return true;
+    const selector = document.querySelector("[data-qa='timeframe-selector']");
+    if (!selector) return false;
+    selector.click();
+    const want = tf.toUpperCase();
+    const option = await until(() => Array.from(document.querySelectorAll(TF_OPTIONS))
+      .find(el => el.offsetParent !== null && text(el).toUpperCase().includes(want)), timeoutMs);
+    if (!option) return false;
+    option.click();
+    return !!(await until(shows, timeoutMs));
+  }
+  function readBars(count, since, minRows, encoding) {
+    for (const [name, get] of SOURCES) {
+      let data = null;
+      try { data = get(); } catch (e) {}
+      if (!data || !data.length) continue;
+      let start = Math.max(0, data.length - count);
+      if (since !== null && since !== undefined) {
+        let i = data.length;
+        while (i > start && data[i - 1] && barTime(data[i - 1]) >= since) i--;
+        start = i;
+      }
+      const t = [], o = [], h = [], l = [], c = [];
+      for (let i = start; i < data.length; i++) {
+        const b = data[i];
+        if (!b) continue;
+        t.push(barTime(b)); o.push(b.open || b.o); h.push(b.high || b.h);
+        l.push(b.low || b.l); c.push(b.close || b.cl);
+      }
+      if (t.length < minRows) continue;
+      if (encoding === 'packed') return Object.assign({path: name}, packBars([t, o, h, l, c]));
+      return {path: name, t: t, o: o, h: h, l: l, c: c};
+    }
+    return {path: null};
+  }
+  async function readPair(req) {
+    const started = Date.now();
+    const out = {ok: false, switched: false, frames: {}, ms: 0};
+    out.switched = await switchAsset(req.pair, req.pos, req.timeoutMs);
+    if (out.switched) {
+      // Read the timeframe already on screen first: one timeframe switch instead of two
+      const s = state();
+      const reads = req.reads.slice().sort((a, b) =>
+        (s && (s[2] === b.seconds || s[2] === b.seconds * 1000) ? 1 : 0)
+        - (s && (s[2] === a.seconds || s[2] === a.seconds * 1000) ? 1 : 0));
+      for (const r of reads) {
+        const tfOk = await setTimeframe(r.tf, r.seconds, req.timeoutMs);
+        const bars = tfOk ? readBars(r.count, r.since, r.minRows, req.encoding) : {path: null};
+        bars.tf_ok = tfOk;
+        out.frames[r.tf] = bars;
+      }
+      out.ok = true;
+    }
+    out.ms = Date.now() - started;
+    return out;
+  }
+  window.__qxBridge = {version: %(version)d, state, switchAsset, setTimeframe, readBars, readPair};
+})();
+""" % {"version": BRIDGE_VERSION, "pack": PACK_JS.strip().replace("\n", "\n  ")}
+
+CALL_JS = """
+const done = arguments[arguments.length - 1];
+const bridge = window.__qxBridge;
+if (!bridge) { done({error: 'missing'}); return; }
+bridge.readPair(arguments[0]).then(done, e => done({error: String(e)}));
+"""
+
+
+class BridgeRead(NamedTuple):
+    ok: bool
+    switched: bool
+    frames: Dict[str, Optional[CandleWindow]]
+    paths: Dict[str, Optional[str]]
+    ms: float
+    error: Optional[str] = None
+
+
+class PathStats:
+    """How often each extraction path (or none) served a timeframe read."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def record(self, path: Optional[str]) -> None:
+        key = path or "none"
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+PATH_STATS = PathStats()
+
+
+class BridgeStatus:
+    """Drivers whose page could not run the bridge, skipped until ``retry_after`` seconds pass."""
+
+    def __init__(self, retry_after: float = 300.0) -> None:
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        # driver -> monotonic time after which the bridge is tried again
+        self._down: "weakref.WeakKeyDictionary[Any, float]" = weakref.WeakKeyDictionary()
+
+    def usable(self, driver) -> bool:
+        with self._lock:
+            retry_at = self._down.get(driver)
+        return retry_at is None or time.monotonic() >= retry_at
+
+    def failed(self, driver, pair: str, error: str) -> None:
+        with self._lock:
+            repeated = driver in self._down
+            self._down[driver] = time.monotonic() + self.retry_after
+        # Once per outage as a warning; retries that fail again only at debug level
+        level = logging.DEBUG if repeated else logging.WARNING
+        logging.log(level, "Chart bridge unavailable (%s at %s); step-by-step reads for %.0fs",
+                    error, pair, self.retry_after)
+
+    def recovered(self, driver) -> None:
+        with self._lock:
+            if self._down.pop(driver, None) is not None:
+                logging.info("Chart bridge available again")
+
+
+BRIDGE_STATUS = BridgeStatus()
+
+
+def usable(driver) -> bool:
+    """False while ``driver``'s page is known not to run the bridge."""
+    return BRIDGE_STATUS.usable(driver)
+
+
+def install(driver) -> None:
+    """Register the bridge for every new document and define it on the current one."""
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": BRIDGE_JS})
+    try:
+        driver.execute_script(BRIDGE_JS)
+    except Exception:
+        pass
+
+
+def payload_encoding() -> str:
+    """``packed`` unless ``CANDLE_PAYLOAD=plain`` asks for JSON arrays."""
+    return "plain" if os.getenv("CANDLE_PAYLOAD", "packed").strip().lower() == "plain" else "packed"
+
+
+def decode_packed(payload: Dict[str, Any]) -> Optional[CandleWindow]:
+    """``{n, b64}`` from ``packBars`` as a ``CandleWindow``; None when empty or malformed."""
+    try:
+        count = int(payload.get("n") or 0)
+        data = base64.b64decode(payload.get("b64") or "")
+    except (TypeError, ValueError, binascii.Error):
+        return None
+    window = CandleWindow.from_buffer(data, count)
+    if window is None and count:
+        logging.debug("Packed candle payload of %s bytes does not hold %s bars", len(data), count)
+    return window
+
+
+def frame_from_columns(cols: Dict[str, Any]) -> Optional[CandleWindow]:
+    """A frame from ``readBars`` (packed or column arrays) as a ``CandleWindow`` (the ``get_candles`` layout)."""
+    if not cols or not cols.get("path"):
+        return None
+    if "b64" in cols:
+        return decode_packed(cols)
+    if not cols.get("t"):
+        return None
+    return CandleWindow.from_columns(cols["t"], cols["o"], cols["h"], cols["l"], cols["c"])
+
+
+def read_pair(
+    driver,
+    pair: str,
+    reads: Sequence[Tuple[str, int, Any]],
+    pos: int = -1,
+    timeout: float = 3.0,
+    encoding: Optional[str] = None,
+) -> BridgeRead:
+    """Switch to ``pair`` and read every ``(tf_label, count, since)`` in one script call.
+
+    ``since`` works as in ``main.get_candles``: with it only bars at or after
+    that time come back (at least one), without it at least half of ``count``.
+    ``encoding`` defaults to ``payload_encoding()``. A failed call (no bridge
+    on the page, script error) is recorded in ``BRIDGE_STATUS`` and returned
+    with ``error`` set; check ``usable`` before calling.
+    """
+    request = {
+        "pair": pair,
+        "encoding": encoding or payload_encoding(),
+        "pos": pos,
+        "timeoutMs": int(timeout * 1000),
+        "reads": [
+            {
+                "tf": tf,
+                "seconds": tf_seconds(tf),
+                "count": int(count),
+                "since": since,
+                "minRows": 1 if since is not None else max(5, int(count / 2)),
+            }
+            for tf, count, since in reads
+        ],
+    }
+    try:
+        res = driver.execute_async_script(CALL_JS, request)
+        if isinstance(res, dict) and res.get("error") == "missing":
+            # Page loaded before the bridge was registered (or by another driver); define it now
+            driver.execute_script(BRIDGE_JS)
+            res = driver.execute_async_script(CALL_JS, request)
+    except Exception as e:
+        res = {"error": str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__}
+    if not isinstance(res, dict) or res.get("error"):
+        error = res.get("error") if isinstance(res, dict) else "no result"
+        BRIDGE_STATUS.failed(driver, pair, error)
+        return BridgeRead(False, False, {}, {}, 0.0, error)
+    BRIDGE_STATUS.recovered(driver)
+
+    frames: Dict[str, Optional[CandleWindow]] = {}
+    paths: Dict[str, Optional[str]] = {}
+    for tf, count, _ in reads:
+        cols = (res.get("frames") or {}).get(tf) or {}
+        paths[tf] = cols.get("path")
+        PATH_STATS.record(paths[tf])
+        df = frame_from_columns(cols)
+        frames[tf] = df.tail(count) if df is not None else None
+    logging.debug("Chart bridge %s: %sms, paths %s", pair, res.get('ms', 0), paths)
+    return BridgeRead(bool(res.get("ok")), bool(res.get("switched")), frames, paths, float(res.get("ms", 0)))
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Command line entry point of the bot.
+
+Every subcommand imports only the modules it needs, when it runs: ``backtest``
+and ``bench`` work without the browser stack or Telegram, ``session convert``
+needs neither NumPy nor pandas, and signal scoring (``detection.py``) can be
+imported on its own. The time those imports took is printed on stderr for
+each subcommand.
+
+Usage:
+    python cli.py run                          # the bot (same as python main.py)
+    python cli.py scan-once [--pairs "EUR/USD OTC,GBP/USD OTC"] [--min-score 0]
+    python cli.py backtest --data data/        # arguments of backtest.py
+    python cli.py bench -k get_candles         # arguments of bench.py
+    python cli.py session convert [--input FILE] [--output FILE]
+    python cli.py session login [--output FILE]
+    python cli.py journal replay logs/journal/journal-2024-01-02-main.jsonl
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from types import ModuleType
+from typing import List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSION_FILE = os.path.join(BASE_DIR, "session", "quotex_session.json")
+CONSOLE_SESSION_FILE = os.path.join(BASE_DIR, "session_from_console.json")
+TRADE_URL = "https://qxbroker.com/en/trade"
+
+# Subcommands whose remaining arguments go to the module's own parser
+PASSTHROUGH = ("backtest", "bench")
+
+
+def timed_import(command: str, *names: str) -> List[ModuleType]:
+    """Import ``names`` and report on stderr how long it took for ``command``."""
+    started = time.perf_counter()
+    modules = [importlib.import_module(name) for name in names]
+    elapsed = time.perf_counter() - started
+    print(f"[{command}] imports {', '.join(names)}: {elapsed * 1000:.0f}ms", file=sys.stderr)
+    return modules
+
+
+# -----------------------------
+# Bot
+# -----------------------------
+
+def cmd_run(args: argparse.Namespace) -> int:
+    (bot,) = timed_import("run", "main")
+    bot.main()
+    return 0
+
+
+def cmd_scan_once(args: argparse.Namespace) -> int:
+    """Log in, scan the pairs once and print the strongest signal; nothing is sent to Telegram."""
+    (bot,) = timed_import("scan-once", "main")
+    env = bot.load_env()
+    if not env["QUOTEX_EMAIL"] or not env["QUOTEX_PASSWORD"]:
+        print("لطفاً فایل .env را با ایمیل و رمز عبور پر کن.")
+        return 1
+    bot.ensure_session_from_env(env.get("SESSION_B64", ""))
+    bot.KILL_ZONE_SCHEDULE.set_pair_zones(bot.parse_pair_zones(env["PAIR_KILL_ZONES"]))
+
+    log_writer = bot.start_logging(env)
+    assets = bot.AssetIndex(ttl=env["ASSET_INDEX_TTL"])
+    aggregators = bot.AggregatorBank() if env["LOCAL_M5"] else None
+    browser = bot.BrowserSession(dict(env, WS_TAP=False), assets, aggregators)
+    try:
+        if not browser.start():
+            print("ورود ناموفق بود. دوباره تلاش کن.")
+            return 1
+        pairs = [p.strip() for p in args.pairs.split(",") if p.strip()] if args.pairs else browser.otc_pairs()
+        started = time.perf_counter()
+        result = browser.scanner.scan(pairs, min_score=args.min_score)
+        print(f"{len(pairs)} جفت در {time.perf_counter() - started:.1f} ثانیه اسکن شد ({result.skipped} رد شده)")
+        strongest = result.strongest()
+        print(bot.format_signal_text(strongest) if strongest else "سیگنالی پیدا نشد.")
+    finally:
+        browser.stop()
+        bot.JOURNAL.stop()
+        log_writer.stop()
+    return 0
+
+
+# -----------------------------
+# Offline tools
+# -----------------------------
+
+def cmd_backtest(args: argparse.Namespace) -> int:
+    (backtest,) = timed_import("backtest", "backtest")
+    backtest.main(args.rest)
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    (bench,) = timed_import("bench", "bench")
+    return bench.main(args.rest)
+
+
+def cmd_journal_replay(args: argparse.Namespace) -> int:
+    """Score every journaled evaluation again and print the ones that come out different."""
+    journal, detection, zones, dotenv = timed_import("journal replay", "journal", "detection", "zones", "dotenv")
+    dotenv.load_dotenv()
+    # Per-pair kill zones change scores; use the ones the bot ran with
+    detection.KILL_ZONE_SCHEDULE.set_pair_zones(zones.parse_pair_zones(os.getenv("PAIR_KILL_ZONES", "")))
+    result = journal.replay(args.path)
+    for diff in result["diffs"][:args.limit]:
+        print(json.dumps(diff, ensure_ascii=False, default=str))
+    print(f"{result['evaluations']} evaluations replayed, {len(result['diffs'])} different", file=sys.stderr)
+    return 1 if result["diffs"] else 0
+
+
+# -----------------------------
+# Session files
+# -----------------------------
+
+def cmd_session_convert(args: argparse.Namespace) -> int:
+    """Build the session file from the JSON copied out of the browser console."""
+    (session_store,) = timed_import("session convert", "session_store")
+    if not os.path.exists(args.input):
+        print(f"❌ فایل {os.path.basename(args.input)} پیدا نشد. اول JSON را از کنسول مرورگر ذخیره کن.")
+        return 1
+    with open(args.input, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    cookies = data.get("cookies", [])
+    local_storage = data.get("localStorage", {})
+
+    try:
+        session_store.write_session(args.output, session_store.make_session(cookies, local_storage))
+    except session_store.SessionError as e:
+        print("❌ داده سشن معتبر نیست:", e)
+        return 1
+
+    print("✅ فایل سشن ساخته شد:", args.output)
+    return 0
+
+
+def login_driver(webdriver):
+    """Plain visible Chrome for a manual login (no profile, lean mode or tap)."""
+    from selenium.webdriver.chrome.service import Service
+
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1280,900")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        service = Service(ChromeDriverManager().install())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        # Fallback: use Chrome without webdriver-manager if offline
+        driver = webdriver.Chrome(options=chrome_options)
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    })
+    return driver
+
+
+def cmd_session_login(args: argparse.Namespace) -> int:
+    """Open Chrome, wait for a manual login and save the session."""
+    webdriver, session_store = timed_import("session login", "selenium.webdriver", "session_store")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    driver = login_driver(webdriver)
+    try:
+        driver.get(TRADE_URL)
+        print("مرورگر باز شد. لطفاً به کواتکس لاگین کن. بعد از ورود کامل به داشبورد، این پنجره ترمینال رو برگرد و Enter بزن.")
+        try:
+            input()
+        except KeyboardInterrupt:
+            pass
+        session_store.write_session(args.output, session_store.session_from_driver(driver))
+        print("✅ سشن ذخیره شد:", args.output)
+    finally:
+        driver.quit()
+    return 0
+
+
+# -----------------------------
+# Entry point
+# -----------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Quotex ICT signal bot.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    p = commands.add_parser("run", help="run the bot")
+    p.set_defaults(handler=cmd_run)
+
+    p = commands.add_parser("scan-once", help="log in, scan once and print the strongest signal")
+    p.add_argument("--pairs", help="comma-separated pairs (default: every OTC pair on the page)")
+    p.add_argument("--min-score", type=int, default=85, help="lowest score to report (default 85)")
+    p.set_defaults(handler=cmd_scan_once)
+
+    # -h/--help of these go to backtest.py / bench.py
+    p = commands.add_parser("backtest", help="replay stored candles (arguments of backtest.py)", add_help=False)
+    p.set_defaults(handler=cmd_backtest)
+    p = commands.add_parser("bench", help="run the benchmarks (arguments of bench.py)", add_help=False)
+    p.set_defaults(handler=cmd_bench)
+
+    session = commands.add_parser("session", help="create the Quotex session file")
+    session_commands = session.add_subparsers(dest="session_command", metavar="action")
+    session_commands.required = True
+    p = session_commands.add_parser("convert", help="build it from JSON copied out of the browser console")
+    p.add_argument("--input", default=CONSOLE_SESSION_FILE, help="console JSON (default session_from_console.json)")
+    p.add_argument("--output", default=SESSION_FILE, help="session file (default session/quotex_session.json)")
+    p.set_defaults(handler=cmd_session_convert)
+    p = session_commands.add_parser("login", help="open Chrome, log in by hand and save the session")
+    p.add_argument("--output", default=SESSION_FILE, help="session file (default session/quotex_session.json)")
+    p.set_defaults(handler=cmd_session_login)
+
+    journal = commands.add_parser("journal", help="work with the decision journal")
+    journal_commands = journal.add_subparsers(dest="journal_command", metavar="action")
+    journal_commands.required = True
+    p = journal_commands.add_parser("replay", help="score journaled evaluations again and print differences")
+    p.add_argument("path", help="journal .jsonl file")
+    p.add_argument("--limit", type=int, default=50, help="most differences to print (default 50)")
+    p.set_defaults(handler=cmd_journal_replay)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args, rest = parser.parse_known_args(argv)
+    if rest and args.command not in PASSTHROUGH:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    args.rest = rest
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
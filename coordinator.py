@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""Scan worker processes with sharded pairs, coordinated over local queues.
+
+Each worker process owns one logged-in Chrome and scans the pairs it is sent.
+The coordinator (the bot's main process) keeps no browser: it splits the pairs
+of a sweep over the live workers, sends every worker its shard on its own
+command queue and reads the results back from one shared event queue while
+they are produced.
+
+Messages to a worker::
+
+    ("scan", sweep, part, pairs, deadline)   scan pairs in order until deadline
+    ("stop",)
+
+Messages from a worker (first two fields: kind, worker index)::
+
+    ("ready", index, pairs)                  logged in; pairs = OTC pairs it sees
+    ("failed", index, reason)                could not start; the process exits
+    ("pairs", index, pairs)                  refreshed OTC pair list
+    ("pair", index, sweep, pair, signal, m1) one scanned pair (signal may be None)
+    ("skip", index, sweep, count)            pairs left out (deadline, logged out)
+    ("done", index, sweep, part, info)       shard finished; info = worker stats
+                                             (passed to ``on_done``, also when late)
+
+A pair stays on the worker it was first given to so its candle windows stay
+warm. When a worker dies mid-sweep its unreported pairs go to the others for
+the rest of the sweep, the slot is restarted (at most once per
+``respawn_delay`` seconds) and, once it reports ready again, the next sweeps
+move pairs back to it until the shards are even.
+"""
+import logging
+import multiprocessing
+import queue
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+PairCallback = Callable[[str, Optional[Dict[str, Any]], Any], None]
+
+
+class Coordinator:
+    """Start ``size`` processes running ``target(index, *args, commands, events)`` and shard sweeps over them."""
+
+    def __init__(
+        self,
+        target: Callable[..., None],
+        size: int,
+        args: Tuple[Any, ...] = (),
+        ready_timeout: float = 180.0,
+        grace: float = 5.0,
+        respawn_delay: float = 60.0,
+        on_done: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.target = target
+        self.size = size
+        self.args = args
+        self.ready_timeout = ready_timeout
+        # Seconds past the sweep deadline to wait for late results before giving up on them
+        self.grace = grace
+        self.respawn_delay = respawn_delay
+        self.on_done = on_done
+        self._ctx = multiprocessing.get_context("spawn")
+        self.events = self._ctx.Queue()
+        self._procs: Dict[int, Any] = {}
+        self._commands: Dict[int, Any] = {}
+        self._spawned_at: Dict[int, float] = {}
+        self.live: Set[int] = set()
+        self.pairs: List[str] = []
+        self.info: Dict[int, Dict[str, Any]] = {}
+        self.deaths = 0
+        self._assignment: Dict[str, int] = {}
+        self._sweep = 0
+        self._part = 0
+
+    # -- process management --
+
+    def _spawn(self, index: int) -> None:
+        commands = self._ctx.Queue()
+        proc = self._ctx.Process(
+            target=self.target,
+            args=(index,) + tuple(self.args) + (commands, self.events),
+            name=f"scan-worker-{index}",
+            daemon=True,
+        )
+        proc.start()
+        self._procs[index] = proc
+        self._commands[index] = commands
+        self._spawned_at[index] = time.time()
+        logging.info("Scan worker process %s started (pid %s)", index, proc.pid)
+
+    def _alive(self, index: int) -> bool:
+        proc = self._procs.get(index)
+        return proc is not None and proc.is_alive()
+
+    def _lost(self, index: int) -> None:
+        """Forget a dead worker: its pairs are handed out again by the next ``shard``."""
+        if index in self.live:
+            self.deaths += 1
+            logging.warning("Scan worker process %s died; rebalancing its pairs", index)
+        self.live.discard(index)
+        self.info.pop(index, None)
+
+    def _respawn_dead(self) -> None:
+        now = time.time()
+        for index in range(self.size):
+            if index in self.live or self._alive(index):
+                continue
+            self._lost(index)
+            if now - self._spawned_at.get(index, 0.0) >= self.respawn_delay:
+                self._spawn(index)
+
+    def start(self) -> bool:
+        """Start every worker and wait for them to log in; True when at least one is ready."""
+        for index in range(self.size):
+            self._spawn(index)
+        waiting = set(range(self.size))
+        end = time.time() + self.ready_timeout
+        while waiting and time.time() < end:
+            ev = self._next_event(1.0)
+            if ev is not None and ev[0] in ("ready", "failed"):
+                waiting.discard(ev[1])
+            waiting = {i for i in waiting if self._alive(i)}
+        if waiting:
+            logging.warning("Scan worker processes %s not ready after %.0fs", sorted(waiting), self.ready_timeout)
+        logging.info("Coordinator ready with %s/%s worker process(es)", len(self.live), self.size)
+        return bool(self.live)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        for index, commands in self._commands.items():
+            if self._alive(index):
+                try:
+                    commands.put(("stop",))
+                except Exception:
+                    pass
+        end = time.time() + timeout
+        for proc in self._procs.values():
+            proc.join(max(0.0, end - time.time()))
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(5.0)
+        self._procs.clear()
+        self._commands.clear()
+        self._spawned_at.clear()
+        self.live.clear()
+        self.info.clear()
+
+    # -- events --
+
+    def _next_event(self, timeout: float) -> Optional[Tuple[Any, ...]]:
+        try:
+            ev = self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        kind, index = ev[0], ev[1]
+        if kind == "ready":
+            self.live.add(index)
+            if ev[2]:
+                self.pairs = list(ev[2])
+            logging.info("Scan worker process %s ready", index)
+        elif kind == "failed":
+            self.live.discard(index)
+            logging.warning("Scan worker process %s failed to start: %s", index, ev[2])
+        elif kind == "pairs" and ev[2]:
+            self.pairs = list(ev[2])
+        elif kind == "done":
+            info = ev[4] or {}
+            if self.on_done is not None:
+                self.on_done(index, info)
+            self.info[index] = info
+        return ev
+
+    def drain(self) -> None:
+        """Absorb pending control events (workers coming back, new pair lists) without waiting."""
+        while self._next_event(0.0) is not None:
+            pass
+
+    # -- sharding --
+
+    def shard(self, pairs: List[str], workers: Optional[Iterable[int]] = None) -> Dict[int, List[str]]:
+        """Split ``pairs`` over the live workers, keeping assignments and evening out the load.
+
+        Pairs whose worker is gone go to the least loaded one; then pairs move
+        (lowest priority first) from the busiest worker to the idlest until
+        their shard sizes differ by at most one. Each shard keeps the order of
+        ``pairs``.
+        """
+        live = sorted(self.live if workers is None else workers)
+        if not live:
+            return {}
+        load = {i: 0 for i in live}
+        for pair in pairs:
+            idx = self._assignment.get(pair)
+            if idx in load:
+                load[idx] += 1
+        for pair in pairs:
+            if self._assignment.get(pair) not in load:
+                idx = min(live, key=lambda i: (load[i], i))
+                self._assignment[pair] = idx
+                load[idx] += 1
+        while True:
+            busiest = max(live, key=lambda i: (load[i], -i))
+            idlest = min(live, key=lambda i: (load[i], i))
+            if load[busiest] - load[idlest] <= 1:
+                break
+            pair = next(p for p in reversed(pairs) if self._assignment[p] == busiest)
+            self._assignment[pair] = idlest
+            load[busiest] -= 1
+            load[idlest] += 1
+        shards: Dict[int, List[str]] = {i: [] for i in live}
+        for pair in pairs:
+            shards[self._assignment[pair]].append(pair)
+        return shards
+
+    def _send(self, shards: Dict[int, List[str]], sweep: int, deadline: Optional[float],
+              pending: Dict[Tuple[int, int], Set[str]]) -> None:
+        for index, shard in shards.items():
+            if not shard:
+                continue
+            self._part += 1
+            self._commands[index].put(("scan", sweep, self._part, shard, deadline))
+            pending[(index, self._part)] = set(shard)
+
+    # -- sweeps --
+
+    def sweep(self, pairs: List[str], on_pair: PairCallback, deadline: Optional[float] = None) -> int:
+        """Scan every pair once over the workers; ``on_pair(pair, signal, m1)`` runs as results stream in.
+
+        Returns the number of pairs skipped (deadline, logged-out or dead workers).
+        """
+        self.drain()
+        self._respawn_dead()
+        if not self.live:
+            logging.warning("No scan worker process is ready; skipping %s pairs", len(pairs))
+            return len(pairs)
+        self._sweep += 1
+        sweep = self._sweep
+        pending: Dict[Tuple[int, int], Set[str]] = {}
+        reported: Set[str] = set()
+        skipped = 0
+        self._send(self.shard(pairs), sweep, deadline, pending)
+        give_up = deadline + self.grace if deadline is not None else None
+
+        while pending:
+            ev = self._next_event(0.5)
+            if ev is not None and len(ev) > 2 and ev[0] in ("pair", "skip", "done") and ev[2] == sweep:
+                kind, index = ev[0], ev[1]
+                if kind == "pair":
+                    pair = ev[3]
+                    for left in pending.values():
+                        left.discard(pair)
+                    if pair not in reported:
+                        # A pair handed over after a death may be reported twice; the first one counts
+                        reported.add(pair)
+                        on_pair(pair, ev[4], ev[5])
+                elif kind == "skip":
+                    skipped += ev[3]
+                else:
+                    pending.pop((index, ev[3]), None)
+
+            dead = {index for index, _ in pending if not self._alive(index)}
+            if dead:
+                orphans = set()
+                for key in [k for k in pending if k[0] in dead]:
+                    orphans |= pending.pop(key) - reported
+                for index in dead:
+                    self._lost(index)
+                orphaned = [p for p in pairs if p in orphans]
+                if orphaned and self.live and (deadline is None or time.time() < deadline):
+                    self._send(self.shard(orphaned), sweep, deadline, pending)
+                else:
+                    skipped += len(orphaned)
+
+            if give_up is not None and time.time() > give_up:
+                late = set().union(*pending.values()) - reported if pending else set()
+                if late:
+                    logging.warning("Coordinator gave up waiting for %s pairs after the deadline", len(late))
+                skipped += len(late)
+                break
+        return skipped
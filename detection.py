@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""ICT signal detection and scoring, without the browser stack.
+
+The detector flags of the latest bar (order block, FVG, liquidity sweep and
+BOS on M5, engulfing on M1), the confluence score with its kill-zone bonus,
+the expiry choice and the signal dict built from them. The live bot
+(``main.py``), the backtest and the benchmarks all score through here; this
+module needs only NumPy and pytz, not Selenium, Telegram or pandas.
+
+Frames are anything with the candle columns: a ``CandleWindow`` or a pandas
+DataFrame.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import pytz
+
+import ict_engine
+from ict_stream import DetectorBank
+from metrics import METRICS
+from zones import ZoneSchedule
+
+Frame = Any
+
+
+# -----------------------------
+# Kill Zones (Asia/Tehran)
+# -----------------------------
+
+TEHRAN_TZ = pytz.timezone("Asia/Tehran")
+
+KILL_ZONES: List[Tuple[str, str]] = [
+    ("04:30", "07:30"),  # Asia OTC
+    ("11:30", "14:30"),  # London OTC
+    ("16:30", "19:30"),  # New York OTC (BEST)
+]
+
+# Compiled once; per-pair zones from PAIR_KILL_ZONES are added by the bot (main.py)
+KILL_ZONE_SCHEDULE = ZoneSchedule(KILL_ZONES, TEHRAN_TZ)
+
+
+# -----------------------------
+# ICT Logic
+# -----------------------------
+
+def detect_order_block(df: Frame) -> bool:
+    if df is None or len(df) < ict_engine.OB_MIN_BARS:
+        return False
+    return bool(ict_engine.order_block(ict_engine.ohlc_from_frame(df))[-1])
+
+
+def detect_fvg(df: Frame) -> bool:
+    if df is None or len(df) < ict_engine.FVG_MIN_BARS:
+        return False
+    return bool(ict_engine.fair_value_gap(ict_engine.ohlc_from_frame(df))[-1])
+
+
+def detect_liquidity_sweep(df: Frame) -> bool:
+    if df is None or len(df) < ict_engine.SWEEP_WINDOW:
+        return False
+    return bool(ict_engine.liquidity_sweep(ict_engine.ohlc_from_frame(df))[-1])
+
+
+def detect_engulfing_m1(df: Frame) -> Optional[str]:
+    if df is None or len(df) < 2:
+        return None
+    return ict_engine.direction_label(int(ict_engine.engulfing(ict_engine.ohlc_from_frame(df))[-1]))
+
+
+def detect_bos(df: Frame) -> bool:
+    if df is None or len(df) < ict_engine.BOS_MIN_BARS:
+        return False
+    return bool(ict_engine.break_of_structure(ict_engine.ohlc_from_frame(df))[-1])
+
+
+def in_kill_zone(now_tehran: datetime, pair: Optional[str] = None) -> bool:
+    return KILL_ZONE_SCHEDULE.active(now_tehran, pair)
+
+
+def compute_confluence(
+    ob: bool,
+    sweep: bool,
+    engulf_dir: Optional[str],
+    fvg: bool,
+    bos: bool,
+    now_tehran: datetime,
+    pair: Optional[str] = None,
+) -> int:
+    score = 0
+    if ob and sweep and engulf_dir:
+        score = 70
+    if score and fvg:
+        score = 80
+    if score and bos and in_kill_zone(now_tehran, pair):
+        score = max(score, 85)
+    if score == 0 and (fvg or bos):
+        score = 50
+    return score
+
+
+def expiry_decision(score: int, engulf_dir: Optional[str], has_ob: bool, has_fvg: bool, has_bos: bool, now_tehran: datetime) -> int:
+    expiry = 1
+    hour = now_tehran.hour
+    minute = now_tehran.minute
+    if score >= 85 and has_ob and has_fvg and has_bos and engulf_dir and (hour == 17 or hour == 18 or (hour == 19 and minute == 0)):
+        expiry = 2
+    return expiry
+
+
+def build_signal(
+    pair: str,
+    ob: bool,
+    fvg: bool,
+    sweep: bool,
+    bos: bool,
+    engulf_dir: Optional[str],
+    now: datetime,
+    score: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Score detector flags at time ``now`` and build the signal dict (None if too weak)."""
+    if score is None:
+        score = compute_confluence(ob, sweep, engulf_dir, fvg, bos, now, pair)
+    if score < 70 or not engulf_dir:
+        return None
+    expiry = expiry_decision(score, engulf_dir, ob, fvg, bos, now)
+
+    return {
+        "pair": pair,
+        "direction": engulf_dir,
+        "expiry": expiry,
+        "score": score,
+        "reason": ("OB + " if ob else "") + ("FVG + " if fvg else "") + ("Sweep + " if sweep else "") + ("BOS + " if bos else "") + "Engulfing",
+        "time": now.strftime("%H:%M تهران"),
+    }
+
+
+class Decision(NamedTuple):
+    """Detector flags of the latest bar, their confluence score and the signal (None if too weak)."""
+
+    ob: bool
+    fvg: bool
+    sweep: bool
+    bos: bool
+    engulf_dir: Optional[str]
+    score: int
+    signal: Optional[Dict[str, Any]]
+
+
+@METRICS.stage("detection")
+def evaluate_ict(
+    m5: Optional[Frame],
+    m1: Optional[Frame],
+    pair: str,
+    bank: Optional[DetectorBank] = None,
+    now: Optional[datetime] = None,
+) -> Optional[Decision]:
+    """Evaluate the latest bar of both timeframes; None without both frames.
+
+    With a ``bank`` the per-pair streaming detectors only process bars they have
+    not seen yet; without one the vectorized engine runs over the whole window.
+    Both give the same result. ``now`` defaults to the current Tehran time and
+    can be injected to replay history.
+    """
+    if now is None:
+        now = datetime.now(TEHRAN_TZ)
+    if m5 is None or m1 is None:
+        return None
+
+    if bank is not None:
+        m5_state = bank.sync_frame(pair, "5m", m5)
+        ob, fvg, sweep, bos = m5_state.ob, m5_state.fvg, m5_state.sweep, m5_state.bos
+        engulf_dir = bank.sync_frame(pair, "1m", m1).engulf_dir
+    else:
+        # Live evaluation is the last element of the vectorized engine output
+        m5_sig = ict_engine.m5_signals(ict_engine.ohlc_from_frame(m5))
+        ob = bool(m5_sig.ob[-1]) if len(m5) else False
+        fvg = bool(m5_sig.fvg[-1]) if len(m5) else False
+        sweep = bool(m5_sig.sweep[-1]) if len(m5) else False
+        bos = bool(m5_sig.bos[-1]) if len(m5) else False
+        engulf_dir = detect_engulfing_m1(m1)
+
+    ob, fvg, sweep, bos = bool(ob), bool(fvg), bool(sweep), bool(bos)
+    score = compute_confluence(ob, sweep, engulf_dir, fvg, bos, now, pair)
+    return Decision(ob, fvg, sweep, bos, engulf_dir, score,
+                    build_signal(pair, ob, fvg, sweep, bos, engulf_dir, now, score))
+
+
+def detect_ict_signal(
+    m5: Optional[Frame],
+    m1: Optional[Frame],
+    pair: str,
+    bank: Optional[DetectorBank] = None,
+    now: Optional[datetime] = None,
+) -> Optional[Dict[str, Any]]:
+    """The signal of ``evaluate_ict`` for the latest bar (None when there is none)."""
+    decision = evaluate_ict(m5, m1, pair, bank, now)
+    return decision.signal if decision is not None else None
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Vectorized ICT detection engine.
+
+Every function here works on whole candle arrays and returns one value per bar.
+Element ``i`` is exactly what the single-bar detectors in ``main.py`` return when
+called on the series truncated to ``bars[: i + 1]``, so the live path only needs
+the last element while backtests can evaluate months of bars in one pass.
+"""
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# -----------------------------
+# Constants shared with the single-bar detectors
+# -----------------------------
+
+OB_MIN_BARS = 5
+OB_BODY_WINDOW = 10
+FVG_MIN_BARS = 3
+SWEEP_WINDOW = 10
+BOS_MIN_BARS = 5
+BOS_SWING_WINDOW = 3
+
+CALL = 1
+PUT = -1
+NO_DIRECTION = 0
+
+
+class Ohlc(NamedTuple):
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+
+class M5Signals(NamedTuple):
+    ob: np.ndarray
+    fvg: np.ndarray
+    sweep: np.ndarray
+    bos: np.ndarray
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+
+def as_ohlc(open_: Sequence[float], high: Sequence[float], low: Sequence[float], close: Sequence[float]) -> Ohlc:
+    """Convert four price sequences into contiguous float64 arrays."""
+    return Ohlc(
+        np.ascontiguousarray(open_, dtype=np.float64),
+        np.ascontiguousarray(high, dtype=np.float64),
+        np.ascontiguousarray(low, dtype=np.float64),
+        np.ascontiguousarray(close, dtype=np.float64),
+    )
+
+
+def ohlc_from_frame(df) -> Ohlc:
+    """Pull the OHLC columns of a candle DataFrame or ``CandleWindow`` as float64 arrays (no copy when possible)."""
+    return as_ohlc(*(_column(df, name) for name in ("open", "high", "low", "close")))
+
+
+def _column(df, name: str) -> np.ndarray:
+    col = df[name]
+    # pandas Series; a CandleWindow column already is an ndarray
+    return col.to_numpy() if hasattr(col, "to_numpy") else col
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of each trailing ``window`` values, added left to right.
+
+    Result ``k`` covers ``values[k : k + window]``. The fixed summation order is
+    what the streaming detectors reproduce, so both paths agree bit for bit.
+    """
+    n = len(values) - window + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.float64)
+    total = values[0:n].copy()
+    for k in range(1, window):
+        total += values[k:k + n]
+    return total
+
+
+def _window_reduce(values: np.ndarray, window: int, ufunc: np.ufunc) -> np.ndarray:
+    n = len(values) - window + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.float64)
+    out = values[0:n].copy()
+    for k in range(1, window):
+        ufunc(out, values[k:k + n], out=out)
+    return out
+
+
+# -----------------------------
+# Detectors (one value per bar)
+# -----------------------------
+
+def order_block(bars: Ohlc) -> np.ndarray:
+    """Bar ``i-1`` has a body bigger than its wicks and than the 10-bar mean body."""
+    o, h, l, c = bars
+    n = len(c)
+    out = np.zeros(n, dtype=bool)
+    if n < OB_MIN_BARS:
+        return out
+    body = np.abs(c - o)
+    wick = (h - l) - body
+    mean_body = np.full(n, np.nan)
+    mean_body[OB_BODY_WINDOW - 1:] = _window_sum(body, OB_BODY_WINDOW) / OB_BODY_WINDOW
+    prev = slice(0, n - 1)
+    out[1:] = (body[prev] > wick[prev]) & (body[prev] > mean_body[prev])
+    out[:OB_MIN_BARS - 1] = False
+    return out
+
+
+def fair_value_gap(bars: Ohlc) -> np.ndarray:
+    """Gap between the high/low of bar ``i-2`` and the low/high of bar ``i``."""
+    _, h, l, _ = bars
+    n = len(h)
+    out = np.zeros(n, dtype=bool)
+    if n < FVG_MIN_BARS:
+        return out
+    out[2:] = (h[:-2] < l[2:]) | (l[:-2] > h[2:])
+    return out
+
+
+def liquidity_sweep(bars: Ohlc) -> np.ndarray:
+    """Bar ``i`` wicks through the 9-bar extreme before it and closes back inside."""
+    _, h, l, c = bars
+    n = len(c)
+    out = np.zeros(n, dtype=bool)
+    lookback = SWEEP_WINDOW - 1
+    if n < SWEEP_WINDOW:
+        return out
+    prev_high = _window_reduce(h[:-1], lookback, np.maximum)
+    prev_low = _window_reduce(l[:-1], lookback, np.minimum)
+    hi, lo, cl = h[lookback:], l[lookback:], c[lookback:]
+    swept_high = (hi > prev_high) & (cl < prev_high)
+    swept_low = (lo < prev_low) & (cl > prev_low)
+    out[lookback:] = swept_high | swept_low
+    return out
+
+
+def break_of_structure(bars: Ohlc) -> np.ndarray:
+    """Bar ``i`` trades beyond the centered 3-bar swing around bar ``i-2``."""
+    _, h, l, _ = bars
+    n = len(h)
+    out = np.zeros(n, dtype=bool)
+    if n < BOS_MIN_BARS:
+        return out
+    swing_high = _window_reduce(h[:-1], BOS_SWING_WINDOW, np.maximum)
+    swing_low = _window_reduce(l[:-1], BOS_SWING_WINDOW, np.minimum)
+    start = BOS_SWING_WINDOW
+    out[start:] = (h[start:] > swing_high) | (l[start:] < swing_low)
+    out[:BOS_MIN_BARS - 1] = False
+    return out
+
+
+def engulfing(bars: Ohlc) -> np.ndarray:
+    """Direction of an engulfing bar: ``CALL`` (1), ``PUT`` (-1) or ``NO_DIRECTION`` (0)."""
+    o, h, l, c = bars
+    n = len(c)
+    out = np.zeros(n, dtype=np.int8)
+    if n < 2:
+        return out
+    covers = (l[1:] <= l[:-1]) & (h[1:] >= h[:-1])
+    out[1:][covers & (c[1:] < o[1:])] = PUT
+    out[1:][covers & (c[1:] > o[1:])] = CALL
+    return out
+
+
+def m5_signals(bars: Ohlc) -> M5Signals:
+    """All M5 structure signals for every bar in one pass."""
+    return M5Signals(
+        ob=order_block(bars),
+        fvg=fair_value_gap(bars),
+        sweep=liquidity_sweep(bars),
+        bos=break_of_structure(bars),
+    )
+
+
+# -----------------------------
+# Confluence scoring
+# -----------------------------
+
+def confluence(
+    ob: np.ndarray,
+    sweep: np.ndarray,
+    engulf_dir: np.ndarray,
+    fvg: np.ndarray,
+    bos: np.ndarray,
+    in_zone: np.ndarray,
+) -> np.ndarray:
+    """Vectorized ``compute_confluence``; ``in_zone`` is the kill-zone flag per bar."""
+    ob, sweep, fvg, bos, in_zone = np.broadcast_arrays(
+        np.asarray(ob, dtype=bool),
+        np.asarray(sweep, dtype=bool),
+        np.asarray(fvg, dtype=bool),
+        np.asarray(bos, dtype=bool),
+        np.asarray(in_zone, dtype=bool),
+    )
+    has_dir = np.asarray(engulf_dir) != NO_DIRECTION
+    score = np.where(ob & sweep & has_dir, 70, 0).astype(np.int16)
+    score[(score > 0) & fvg] = 80
+    boosted = (score > 0) & bos & in_zone
+    score[boosted] = np.maximum(score[boosted], 85)
+    score[(score == 0) & (fvg | bos)] = 50
+    return score
+
+
+def kill_zone_mask(minutes_of_day: np.ndarray, zones: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """Kill-zone flag for each minute-of-day; ``zones`` are inclusive (start, end) minute pairs."""
+    minutes = np.asarray(minutes_of_day)
+    out = np.zeros(minutes.shape, dtype=bool)
+    for start, end in zones:
+        out |= (minutes >= start) & (minutes <= end)
+    return out
+
+
+def align_to(base_times: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """Index of the last ``base_times`` bar opened at or before each of ``times`` (-1 if none)."""
+    return np.searchsorted(np.asarray(base_times), np.asarray(times), side="right") - 1
+
+
+def direction_label(direction: int) -> Optional[str]:
+    if direction == CALL:
+        return "CALL"
+    if direction == PUT:
+        return "PUT"
+    return None
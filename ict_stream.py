@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Incremental ICT detectors: constant work per new candle.
+
+A ``StreamingDetector`` keeps only the few bars the detectors look back on
+(11 at most) and evaluates the newest bar against them. Its output for each
+bar is identical to ``ict_engine`` (and therefore to the single-bar detectors
+in ``main.py``) evaluated on the full series up to that bar.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import ict_engine
+
+
+# Deepest look-back is the order block: the previous bar plus a 10-bar body mean
+HISTORY = ict_engine.OB_BODY_WINDOW + 1
+
+
+class Bar(NamedTuple):
+    time: Any
+    open: float
+    high: float
+    low: float
+    close: float
+
+
+class StreamSignals(NamedTuple):
+    ob: bool
+    fvg: bool
+    sweep: bool
+    bos: bool
+    engulf: int  # ict_engine.CALL / PUT / NO_DIRECTION
+
+    @property
+    def engulf_dir(self) -> Optional[str]:
+        return ict_engine.direction_label(self.engulf)
+
+
+NO_SIGNALS = StreamSignals(False, False, False, False, ict_engine.NO_DIRECTION)
+
+
+def _evaluate(bars: Sequence[Bar], bodies: Sequence[float], count: int) -> StreamSignals:
+    """Evaluate the last of ``bars`` given ``count`` bars seen in total (including it)."""
+    cur = bars[-1]
+
+    ob = False
+    if count > ict_engine.OB_BODY_WINDOW and count >= ict_engine.OB_MIN_BARS:
+        prev = bars[-2]
+        body = bodies[-2]
+        wick = (prev.high - prev.low) - body
+        # Same left-to-right order as ict_engine._window_sum
+        window = list(bodies)[-ict_engine.OB_BODY_WINDOW - 1:-1]
+        total = window[0]
+        for b in window[1:]:
+            total += b
+        ob = body > wick and body > total / ict_engine.OB_BODY_WINDOW
+
+    fvg = False
+    if count >= ict_engine.FVG_MIN_BARS:
+        first = bars[-3]
+        fvg = first.high < cur.low or first.low > cur.high
+
+    sweep = False
+    if count >= ict_engine.SWEEP_WINDOW:
+        lookback = list(bars)[-ict_engine.SWEEP_WINDOW:-1]
+        prev_high = max(b.high for b in lookback)
+        prev_low = min(b.low for b in lookback)
+        sweep = (cur.high > prev_high and cur.close < prev_high) or (cur.low < prev_low and cur.close > prev_low)
+
+    bos = False
+    if count >= ict_engine.BOS_MIN_BARS:
+        swing = list(bars)[-ict_engine.BOS_SWING_WINDOW - 1:-1]
+        bos = cur.high > max(b.high for b in swing) or cur.low < min(b.low for b in swing)
+
+    engulf = ict_engine.NO_DIRECTION
+    if count >= 2:
+        prev = bars[-2]
+        if cur.low <= prev.low and cur.high >= prev.high:
+            if cur.close > cur.open:
+                engulf = ict_engine.CALL
+            elif cur.close < cur.open:
+                engulf = ict_engine.PUT
+
+    return StreamSignals(bool(ob), bool(fvg), bool(sweep), bool(bos), engulf)
+
+
+class StreamingDetector:
+    """ICT state for one pair/timeframe, updated one closed candle at a time."""
+
+    __slots__ = ("bars", "bodies", "count", "last", "last_time")
+
+    def __init__(self) -> None:
+        self.bars: Deque[Bar] = deque(maxlen=HISTORY)
+        self.bodies: Deque[float] = deque(maxlen=HISTORY)
+        self.count = 0
+        self.last: StreamSignals = NO_SIGNALS
+        self.last_time: Any = None
+
+    def reset(self) -> None:
+        self.bars.clear()
+        self.bodies.clear()
+        self.count = 0
+        self.last = NO_SIGNALS
+        self.last_time = None
+
+    def update(self, bar: Bar) -> StreamSignals:
+        """Append a closed candle and return the signals evaluated on it."""
+        self.bars.append(bar)
+        self.bodies.append(abs(bar.close - bar.open))
+        self.count += 1
+        self.last_time = bar.time
+        self.last = _evaluate(self.bars, self.bodies, self.count)
+        return self.last
+
+    def peek(self, bar: Bar) -> StreamSignals:
+        """Signals for a still-forming candle, without committing it to the state."""
+        bars = list(self.bars)[1 - HISTORY:] + [bar]
+        bodies = list(self.bodies)[1 - HISTORY:] + [abs(bar.close - bar.open)]
+        return _evaluate(bars, bodies, self.count + 1)
+
+    def _resume_index(self, times: Sequence[Any], closed: int) -> Optional[int]:
+        """First closed bar of ``times`` not yet pushed, or None when the state must be rebuilt."""
+        if self.last_time is None:
+            return None
+        for i in range(closed - 1, -1, -1):
+            t = times[i]
+            if t is None:
+                return None
+            if t == self.last_time:
+                return i + 1
+        return None
+
+    def sync(self, times: Sequence[Any], opens: Sequence[float], highs: Sequence[float],
+             lows: Sequence[float], closes: Sequence[float]) -> StreamSignals:
+        """Catch up with a scraped window whose last bar is still forming.
+
+        Closed bars newer than ``last_time`` are pushed through ``update``; the
+        forming bar is evaluated with ``peek``. If the window does not overlap the
+        state (restart, missed bars, bars without a time) the state is rebuilt
+        from the window, which is still only ``len(window)`` constant-time steps.
+        """
+        n = len(closes)
+        if n == 0:
+            return NO_SIGNALS
+        closed = n - 1
+        start = self._resume_index(times, closed)
+        if start is None:
+            self.reset()
+            start = 0
+        for i in range(start, closed):
+            self.update(Bar(times[i], float(opens[i]), float(highs[i]), float(lows[i]), float(closes[i])))
+        return self.peek(Bar(times[closed], float(opens[closed]), float(highs[closed]), float(lows[closed]), float(closes[closed])))
+
+    def sync_frame(self, df) -> StreamSignals:
+        """``sync`` for a candle DataFrame as returned by ``get_candles``."""
+        if df is None or len(df) == 0:
+            return NO_SIGNALS
+        return self.sync(
+            df["time"].tolist(), df["open"].tolist(), df["high"].tolist(), df["low"].tolist(), df["close"].tolist()
+        )
+
+
+class DetectorBank:
+    """One ``StreamingDetector`` per (pair, timeframe), created on first use."""
+
+    def __init__(self) -> None:
+        self._detectors: Dict[Tuple[str, str], StreamingDetector] = {}
+
+    def get(self, pair: str, tf_label: str) -> StreamingDetector:
+        key = (pair, tf_label)
+        det = self._detectors.get(key)
+        if det is None:
+            det = StreamingDetector()
+            self._detectors[key] = det
+        return det
+
+    def sync_frame(self, pair: str, tf_label: str, df) -> StreamSignals:
+        return self.get(pair, tf_label).sync_frame(df)
+
+    def __len__(self) -> int:
+        return len(self._detectors)
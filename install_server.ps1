@@ -33,7 +33,7 @@ Write-Host "✅ نصب با موفقیت انجام شد!" -ForegroundColor Gree
 Write-Host ""
 Write-Host "📝 مراحل بعدی:" -ForegroundColor Cyan
 Write-Host "1. فایل .env را با مقادیر واقعی پر کن"
-Write-Host "2. فایل session/quotex_session.pkl را بذار"
+Write-Host "2. فایل session/quotex_session.json را بذار"
 Write-Host "3. برای اجرا: python main.py"
 Write-Host "4. یا با Task Scheduler اجرا کن (راهنما: SERVER_SETUP.md)"
 
@@ -39,7 +39,7 @@ echo "✅ نصب با موفقیت انجام شد!"
 echo ""
 echo "📝 مراحل بعدی:"
 echo "1. فایل .env را با مقادیر واقعی پر کن"
-echo "2. فایل session/quotex_session.pkl را بذار"
+echo "2. فایل session/quotex_session.json را بذار"
 echo "3. برای اجرا با systemd: sudo bash setup_systemd.sh"
 echo "4. یا برای اجرا با screen: screen -S quotex_bot && source venv/bin/activate && python main.py"
 
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Append-only JSON Lines journal of every pair evaluation and send decision.
+
+Each evaluation that runs the detectors is one line: the pair, the Tehran
+time it was scored at, the bars the detectors saw (M5 and M1 columns), the
+detector flags, the score and the resulting signal. Selection decisions are
+lines of their own: a signal ``sent`` to Telegram, or ``dropped`` because the
+same setup was already sent. Evaluations answered by the cache are not
+written again; the line for the same bars already holds them.
+
+``JOURNAL.record`` only copies the bars and queues the entry; a background
+thread serializes and appends it, so disk I/O never runs inside a sweep. When
+the queue is full the entry is dropped and counted instead of waiting.
+Files are ``<dir>/journal-<YYYY-MM-DD>-<tag>.jsonl`` (UTC date); each process
+writes its own tag (``main``, ``w0``, ``w1``, ...).
+
+``replay`` reads a journal back, scores every evaluation again from its bars
+and time, and returns the entries whose flags, score or signal differ.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+FLAGS = ("ob", "fvg", "sweep", "bos", "engulf_dir")
+BAR_COLUMNS = ("time", "open", "high", "low", "close")
+
+
+def _columns(frame: Any) -> Optional[Dict[str, List[Any]]]:
+    if frame is None:
+        return None
+    return {name: frame[name].tolist() for name in BAR_COLUMNS}
+
+
+class DecisionJournal:
+    """Background JSONL writer; ``record`` is a no-op until ``start``."""
+
+    def __init__(self, max_queue: int = 10000) -> None:
+        self.max_queue = max_queue
+        self.directory: Optional[str] = None
+        self.tag = "main"
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def start(self, directory: str, tag: str = "main") -> "DecisionJournal":
+        if self._thread is None:
+            os.makedirs(directory, exist_ok=True)
+            self.directory = directory
+            self.tag = tag
+            self._thread = threading.Thread(target=self._run, name="decision-journal", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write out what is queued and stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _put(self, entry: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def record(self, kind: str, pair: str, **fields: Any) -> None:
+        """Queue one line; window arguments (``m5``, ``m1``) are copied now and serialized later."""
+        if self._thread is None:
+            return
+        for name in ("m5", "m1"):
+            if fields.get(name) is not None:
+                fields[name] = fields[name].copy()
+        self._put(dict(fields, kind=kind, pair=pair, logged_at=time.time()))
+
+    def evaluation(self, pair: str, decision: Any, m5: Any, m1: Any, now: datetime,
+                   key: Any = None) -> None:
+        """One detector run: ``decision`` is a ``detection.Decision``."""
+        if self._thread is None:
+            return
+        self.record(
+            "eval", pair,
+            now=now.isoformat(),
+            key=list(key) if key is not None else None,
+            flags={name: getattr(decision, name) for name in FLAGS},
+            score=decision.score,
+            signal=dict(decision.signal) if decision.signal else None,
+            m5=m5,
+            m1=m1,
+        )
+
+    def _path(self, logged_at: float) -> str:
+        day = time.strftime("%Y-%m-%d", time.gmtime(logged_at))
+        return os.path.join(self.directory or ".", f"journal-{day}-{self.tag}.jsonl")
+
+    def _run(self) -> None:
+        path, f = None, None
+        try:
+            while True:
+                entry = self._queue.get()
+                if entry is None:
+                    break
+                try:
+                    for name in ("m5", "m1"):
+                        if name in entry:
+                            entry[name] = _columns(entry[name])
+                    line = json.dumps(entry, ensure_ascii=False, default=str)
+                    target = self._path(entry["logged_at"])
+                    if target != path:
+                        if f is not None:
+                            f.close()
+                        path, f = target, open(target, "a", encoding="utf-8")
+                    f.write(line + "\n")
+                    if self._queue.empty():
+                        f.flush()
+                    self.written += 1
+                except Exception as e:
+                    logging.warning("Decision journal write failed: %s", e)
+        finally:
+            if f is not None:
+                f.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.written, "dropped": self.dropped, "queued": self._queue.qsize()}
+
+
+JOURNAL = DecisionJournal()
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+
+def read(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def replay(path: str) -> Dict[str, Any]:
+    """Score every evaluation in ``path`` again; {"evaluations": n, "diffs": [...]}."""
+    from candle_ring import CandleWindow
+    from detection import evaluate_ict
+
+    diffs: List[Dict[str, Any]] = []
+    count = 0
+    for entry in read(path):
+        if entry.get("kind") != "eval":
+            continue
+        count += 1
+        m5, m1 = (CandleWindow.from_columns(*(cols[name] for name in BAR_COLUMNS)) if cols else None
+                  for cols in (entry.get("m5"), entry.get("m1")))
+        now = datetime.fromisoformat(entry["now"])
+        decision = evaluate_ict(m5, m1, entry["pair"], None, now)
+        signal = dict(decision.signal) if decision is not None and decision.signal else None
+        if signal is not None and entry.get("key"):
+            signal["bar"] = entry["key"][1]
+        got = {
+            "flags": {name: getattr(decision, name) for name in FLAGS},
+            "score": decision.score,
+            "signal": json.loads(json.dumps(signal, ensure_ascii=False, default=str)),
+        }
+        changed = {k: {"journal": entry.get(k), "replay": v} for k, v in got.items() if entry.get(k) != v}
+        if changed:
+            diffs.append({"pair": entry["pair"], "now": entry["now"], "changes": changed})
+    return {"evaluations": count, "diffs": diffs}
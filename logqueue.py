@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Logging through a queue, written to a rotating file by a background thread.
+
+``setup_logging`` replaces the root handlers with one ``DeferredQueueHandler``:
+a log call only puts the record on an in-memory queue, and ``LogWriter``'s
+listener thread formats it (the ``%``-style arguments are merged there, not
+in the scan thread) and writes it to ``logs/signals.log``. The file rolls
+over by size (``max_bytes``) or, with ``when`` (e.g. ``midnight``), by time,
+keeping ``backups`` old files.
+
+Worker processes log through ``worker_logging`` onto a multiprocessing queue
+(``LogWriter.process_queue``) that a second listener in the bot's process
+drains into the same file, so only one process ever writes or rotates it.
+
+Records are formatted after the call returns, so log arguments should be
+values that do not change afterwards (strings, numbers, copies).
+"""
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Any, Optional
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queue records as they are; the listener thread formats them."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def file_handler(path: str, max_bytes: int = 10 * 2**20, backups: int = 5,
+                 when: Optional[str] = None) -> logging.Handler:
+    """Rotating log file: by time when ``when`` is given, else by size (no rotation for 0 bytes)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if when:
+        handler: logging.Handler = TimedRotatingFileHandler(path, when=when, backupCount=backups,
+                                                            encoding="utf-8", delay=True)
+    else:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+class LogWriter:
+    """Background writer of the root logger's queue (and of worker processes' records)."""
+
+    def __init__(self, handler: logging.Handler) -> None:
+        self.handler = handler
+        self.queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._listener = QueueListener(self.queue, handler, respect_handler_level=True)
+        self._process_queue: Any = None
+        self._process_listener: Optional[QueueListener] = None
+        self._running = False
+
+    def start(self) -> "LogWriter":
+        if not self._running:
+            self._listener.start()
+            self._running = True
+        return self
+
+    def process_queue(self, ctx: Any = None) -> Any:
+        """Queue for ``worker_logging`` in child processes, drained into the same file."""
+        if self._process_queue is None:
+            if ctx is None:
+                import multiprocessing
+
+                ctx = multiprocessing.get_context("spawn")
+            self._process_queue = ctx.Queue()
+            self._process_listener = QueueListener(self._process_queue, self.handler, respect_handler_level=True)
+            self._process_listener.start()
+        return self._process_queue
+
+    def stop(self) -> None:
+        """Write out everything queued so far and close the file."""
+        if not self._running:
+            return
+        if self._process_listener is not None:
+            self._process_listener.stop()
+            self._process_listener = None
+            self._process_queue = None
+        self._listener.stop()
+        self._running = False
+        self.handler.close()
+
+
+def _install(handler: logging.Handler, level: str) -> None:
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+        old.close()
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+
+def setup_logging(path: str, level: str = "INFO", max_bytes: int = 10 * 2**20, backups: int = 5,
+                  when: Optional[str] = None) -> LogWriter:
+    """Route the root logger through a queue to a rotating file; stop the returned writer on exit."""
+    writer = LogWriter(file_handler(path, max_bytes, backups, when)).start()
+    _install(DeferredQueueHandler(writer.queue), level)
+    return writer
+
+
+def worker_logging(log_queue: Any, level: str = "INFO") -> None:
+    """In a worker process: send records to the bot's ``LogWriter.process_queue``.
+
+    Records cross a process boundary, so they are formatted here (the standard
+    ``QueueHandler.prepare``) instead of in the writer.
+    """
+    _install(QueueHandler(log_queue), level)
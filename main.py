@@ -1,26 +1,55 @@
 # -*- coding: utf-8 -*-
 import os
 import time
-import pickle
 import logging
-from datetime import datetime, time as dtime
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-import pytz
-import pandas as pd
 from dotenv import load_dotenv
 import base64
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 
-# Telegram (python-telegram-bot v13.x - synchronous API)
-from telegram import Bot
+import chart_bridge
+import ict_engine
+# Scoring lives in detection.py (no browser stack); its names stay importable from main
+from detection import (
+    KILL_ZONE_SCHEDULE,
+    KILL_ZONES,
+    TEHRAN_TZ,
+    build_signal,
+    compute_confluence,
+    detect_bos,
+    detect_engulfing_m1,
+    detect_fvg,
+    detect_ict_signal,
+    detect_liquidity_sweep,
+    evaluate_ict,
+    detect_order_block,
+    expiry_decision,
+    in_kill_zone,
+)
+from ict_stream import DetectorBank
+from candle_ring import CandleRing, CandleWindow
+from candle_store import CandleStore
+from aggregator import AggregatorBank, tf_seconds
+from scheduler import M1_SECONDS, PairPriority, ScanMetrics, ScanScheduler, last_close
+from cdp_feed import WebSocketTap, enable_performance_log, wait_for_ticks
+from coordinator import Coordinator
+from metrics import METRICS, MetricsServer, SnapshotWriter
+from signal_cache import CACHE_STATS, EvalCache, SentSignals, bar_key
+from journal import JOURNAL
+from logqueue import LogWriter, setup_logging, worker_logging
+from zones import parse_pair_zones
+import session_store
+from session_store import SessionError
 
 
 # -----------------------------
@@ -28,29 +57,31 @@ from telegram import Bot
 # -----------------------------
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SESSION_FILE = os.path.join(BASE_DIR, "session", "quotex_session.pkl")
+SESSION_FILE = os.path.join(BASE_DIR, "session", "quotex_session.json")
+# Pre-JSON session file, converted on first use
+LEGACY_SESSION_FILE = os.path.join(BASE_DIR, "session", "quotex_session.pkl")
+DRIVER_CACHE_FILE = os.path.join(BASE_DIR, "session", "chromedriver_path.txt")
 LOGS_DIR = os.path.join(BASE_DIR, "logs")
 LOG_FILE = os.path.join(LOGS_DIR, "signals.log")
+METRICS_FILE = os.path.join(LOGS_DIR, "metrics.json")
+JOURNAL_DIR = os.path.join(LOGS_DIR, "journal")
 
 os.makedirs(os.path.dirname(SESSION_FILE), exist_ok=True)
 os.makedirs(LOGS_DIR, exist_ok=True)
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
-
 
-# -----------------------------
-# Kill Zones (Asia/Tehran)
-# -----------------------------
-
-KILL_ZONES: List[Tuple[str, str]] = [
-    ("04:30", "07:30"),  # Asia OTC
-    ("11:30", "14:30"),  # London OTC
-    ("16:30", "19:30"),  # New York OTC (BEST)
-]
+def start_logging(env: Dict[str, Any]) -> LogWriter:
+    """Queue logging into the rotating ``LOG_FILE`` and start the decision journal (if enabled)."""
+    writer = setup_logging(
+        LOG_FILE,
+        level=env["LOG_LEVEL"],
+        max_bytes=int(env["LOG_MAX_MB"] * 2**20),
+        backups=env["LOG_BACKUPS"],
+        when=env["LOG_ROTATE_WHEN"] or None,
+    )
+    if env["JOURNAL"]:
+        JOURNAL.start(env["JOURNAL_DIR"])
+    return writer
 
 
 # -----------------------------
@@ -65,41 +96,81 @@ def load_env() -> Dict[str, str]:
         "QUOTEX_PASSWORD": os.getenv("QUOTEX_PASSWORD", ""),
         "TELEGRAM_TOKEN": os.getenv("TELEGRAM_TOKEN", ""),
         "TELEGRAM_CHAT_ID": os.getenv("TELEGRAM_CHAT_ID", ""),
+        "TELEGRAM_API_URL": os.getenv("TELEGRAM_API_URL", ""),
         "HEADLESS": os.getenv("HEADLESS", "false").lower() == "true",
         "SESSION_B64": os.getenv("SESSION_B64", ""),
+        "WS_TAP": os.getenv("WS_TAP", "false").lower() == "true",
+        "LOCAL_M5": os.getenv("LOCAL_M5", "true").lower() == "true",
+        "SCAN_SETTLE": float(os.getenv("SCAN_SETTLE", "1.5") or 1.5),
+        "SCAN_DEADLINE": float(os.getenv("SCAN_DEADLINE", "20") or 20),
+        "SENT_SIGNAL_TTL": float(os.getenv("SENT_SIGNAL_TTL", "900") or 900),
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "INFO") or "INFO",
+        "LOG_MAX_MB": float(os.getenv("LOG_MAX_MB", "10") or 0),
+        "LOG_BACKUPS": int(os.getenv("LOG_BACKUPS", "5") or 5),
+        "LOG_ROTATE_WHEN": os.getenv("LOG_ROTATE_WHEN", ""),
+        "JOURNAL": os.getenv("JOURNAL", "true").lower() == "true",
+        "JOURNAL_DIR": os.getenv("JOURNAL_DIR", "") or JOURNAL_DIR,
+        "SCAN_WORKERS": max(1, int(os.getenv("SCAN_WORKERS", "1") or 1)),
+        "SCAN_PROCESSES": max(0, int(os.getenv("SCAN_PROCESSES", "0") or 0)),
+        "ASSET_INDEX_TTL": float(os.getenv("ASSET_INDEX_TTL", "600") or 600),
+        "METRICS_PORT": int(os.getenv("METRICS_PORT", "9464") or 0),
+        "METRICS_SNAPSHOT": os.getenv("METRICS_SNAPSHOT", "") or METRICS_FILE,
+        "METRICS_INTERVAL": float(os.getenv("METRICS_INTERVAL", "60") or 60),
+        "PAIR_KILL_ZONES": os.getenv("PAIR_KILL_ZONES", ""),
+        "LEAN_MODE": os.getenv("LEAN_MODE", "false").lower() == "true",
+        "MEMORY_REPORT_INTERVAL": float(os.getenv("MEMORY_REPORT_INTERVAL", "300") or 300),
+        "HIBERNATE": os.getenv("HIBERNATE", "true").lower() == "true",
+        "HIBERNATE_MIN_IDLE": float(os.getenv("HIBERNATE_MIN_IDLE", "30") or 30),
+        "PREWARM_MINUTES": float(os.getenv("PREWARM_MINUTES", "5") or 5),
         "USER_AGENT": os.getenv("USER_AGENT", "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"),
     }
     return env
 
 
 def ensure_session_from_env(session_b64: str) -> None:
-    """If SESSION_B64 is provided (base64 of pickled session dict), write to SESSION_FILE."""
+    """If SESSION_B64 is provided (base64 of the session file), validate it and write SESSION_FILE.
+
+    A base64 legacy pickle session is accepted too and stored as JSON.
+    """
     if not session_b64:
         return
     try:
         if not os.path.exists(SESSION_FILE):
-            data = base64.b64decode(session_b64)
-            os.makedirs(os.path.dirname(SESSION_FILE), exist_ok=True)
-            with open(SESSION_FILE, "wb") as f:
-                f.write(data)
+            data = session_store.session_from_bytes(base64.b64decode(session_b64))
+            session_store.write_session(SESSION_FILE, data)
             logging.info("Session restored from SESSION_B64 env variable")
-    except Exception as e:
-        logging.error(f"Failed writing session from env: {e}")
+    except (SessionError, ValueError, OSError) as e:
+        logging.error("Failed writing session from env: %s", e)
 
 
-def init_driver(headless: bool = False) -> webdriver.Chrome:
+@METRICS.stage("driver_init")
+def init_driver(headless: bool = False, debug_port: int = 9222, ws_tap: bool = False,
+                lean: bool = False) -> webdriver.Chrome:
     """Initialize Chrome WebDriver for Docker/Railway environments.
     
     Strategy:
-      1) Try system Chrome/Chromium + ChromeDriver (from env vars or auto-detect)
-      2) Fallback to webdriver-manager with proper flags for Docker
+      1) Try system Chrome/Chromium + a ChromeDriver resolved offline
+         (CHROMEDRIVER_PATH, the path cached by the last download, system paths)
+      2) Fallback to webdriver-manager with proper flags for Docker (skipped
+         with DRIVER_OFFLINE=true); the downloaded path is cached for next time
+
+    With CHROME_PROFILE_DIR set, Chrome runs on that persistent profile so a
+    restart is usually still logged in.
     
     All required flags for headless Docker execution are included:
     - --no-sandbox: Required for Docker
     - --disable-dev-shm-usage: Prevents /dev/shm issues
     - --headless: Headless mode
     - --disable-gpu: GPU not available in Docker
-    - --remote-debugging-port: For debugging (optional but useful)
+    - --remote-debugging-port: For debugging (optional but useful); every
+      Chrome in a scanner pool needs its own port
+
+    ``ws_tap`` enables the DevTools performance log so ``cdp_feed.WebSocketTap``
+    can read the page's WebSocket quote frames.
+
+    ``lean`` blocks images, fonts, media and trackers (``LEAN_BLOCKLIST``) and
+    turns off browser features the bot never uses, for less memory and CPU
+    per tab.
     """
     import shutil
     
@@ -112,7 +183,7 @@ def init_driver(headless: bool = False) -> webdriver.Chrome:
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--window-size=1280,900")
-    chrome_options.add_argument("--remote-debugging-port=9222")
+    chrome_options.add_argument(f"--remote-debugging-port={debug_port}")
     # Locale & UA
     chrome_options.add_argument("--lang=fa-IR")
     chrome_options.add_argument("--accept-lang=fa-IR,fa;q=0.9,en-US;q=0.8,en;q=0.7")
@@ -129,6 +200,10 @@ def init_driver(headless: bool = False) -> webdriver.Chrome:
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    if ws_tap:
+        enable_performance_log(chrome_options)
+    if lean:
+        apply_lean_options(chrome_options)
     
     # Try system Chrome/Chromium first (preferred for Docker)
     chrome_bin = os.getenv("CHROME_BIN", "") or (
@@ -139,128 +214,292 @@ def init_driver(headless: bool = False) -> webdriver.Chrome:
         or "/usr/bin/google-chrome-stable"
         or "/usr/bin/chromium"
     )
-    chromedriver_path = os.getenv("CHROMEDRIVER_PATH", "") or (
-        shutil.which("chromedriver")
-        or "/usr/local/bin/chromedriver"
-        or "/usr/bin/chromedriver"
-    )
-    
-    # Try system Chrome/ChromeDriver first
-    try:
-        if chrome_bin and os.path.exists(chrome_bin):
-            chrome_options.binary_location = chrome_bin
-            logging.info(f"Using Chrome binary: {chrome_bin}")
-        
-        if chromedriver_path and os.path.exists(chromedriver_path):
+    if chrome_bin and os.path.exists(chrome_bin):
+        chrome_options.binary_location = chrome_bin
+        logging.info("Using Chrome binary: %s", chrome_bin)
+
+    # Persistent profile: cookies and site storage survive restarts, so login is usually already done
+    profile_dir = os.getenv("CHROME_PROFILE_DIR", "")
+    if profile_dir:
+        if debug_port != 9222:
+            # Chrome locks a profile to one process; pool browsers get their own
+            profile_dir = f"{profile_dir}-{debug_port}"
+        os.makedirs(profile_dir, exist_ok=True)
+        if not clear_profile_locks(profile_dir):
+            # A Chrome left over from a killed worker still runs on it; sharing would corrupt it
+            import tempfile
+
+            fresh = tempfile.mkdtemp(prefix=f"{os.path.basename(profile_dir)}-")
+            logging.warning("Chrome profile %s is still in use; starting on fresh profile %s", profile_dir, fresh)
+            profile_dir = fresh
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+
+    # Offline first: explicit/cached/system chromedriver, no network
+    chromedriver_path = resolve_chromedriver()
+    if chromedriver_path:
+        try:
             # Make sure chromedriver is executable
             os.chmod(chromedriver_path, 0o755)
             service = Service(chromedriver_path)
             driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-                "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            })
-            logging.info("ChromeDriver initialized from system path")
+            add_startup_scripts(driver, lean)
+            logging.info("ChromeDriver initialized from %s", chromedriver_path)
             return driver
-    except Exception as e:
-        logging.warning(f"Failed to use system Chrome/ChromeDriver: {e}. Falling back to webdriver-manager.")
-    
+        except Exception as e:
+            logging.warning("Failed to use ChromeDriver %s: %s. Falling back to webdriver-manager.", chromedriver_path, e)
+    if os.getenv("DRIVER_OFFLINE", "false").lower() == "true":
+        raise RuntimeError("No usable ChromeDriver found offline (DRIVER_OFFLINE=true)")
+
     # Fallback: webdriver-manager (downloads matching ChromeDriver version)
     try:
-        if chrome_bin and os.path.exists(chrome_bin):
-            chrome_options.binary_location = chrome_bin
-        
-        service = Service(ChromeDriverManager().install())
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        path = ChromeDriverManager().install()
+        service = Service(path)
         driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-            "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-        })
+        add_startup_scripts(driver, lean)
+        cache_chromedriver_path(path)
         logging.info("ChromeDriver initialized via webdriver-manager")
         return driver
     except Exception as e:
-        logging.error(f"Failed to initialize ChromeDriver: {e}")
+        logging.error("Failed to initialize ChromeDriver: %s", e)
         raise
 
 
+def add_startup_scripts(driver: webdriver.Chrome, lean: bool = False) -> None:
+    driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        "source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    })
+    chart_bridge.install(driver)
+    if lean:
+        block_heavy_resources(driver, lean_blocklist())
+
+
+# -----------------------------
+# Lean mode
+# -----------------------------
+
+# URL patterns ('*' wildcards) the chart does not need; LEAN_BLOCKLIST replaces them
+LEAN_BLOCKLIST: List[str] = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp3", "*.mp4", "*.webm", "*.ogg", "*.wav",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*connect.facebook.net*", "*mc.yandex.ru*", "*hotjar.com*", "*clarity.ms*",
+    "*intercom.io*", "*intercomcdn.com*", "*zendesk.com*", "*onesignal.com*",
+]
+
+LEAN_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-notifications",
+    "--disable-component-update",
+    "--disable-background-networking",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions",
+]
+
+
+def lean_blocklist() -> List[str]:
+    custom = os.getenv("LEAN_BLOCKLIST", "")
+    if custom:
+        return [p.strip() for p in custom.split(",") if p.strip()]
+    return list(LEAN_BLOCKLIST)
+
+
+def apply_lean_options(chrome_options) -> None:
+    for arg in LEAN_ARGS:
+        chrome_options.add_argument(arg)
+    chrome_options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+
+
+def block_heavy_resources(driver: webdriver.Chrome, patterns: List[str]) -> None:
+    """Fail matching requests inside Chrome before they hit the network."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        logging.info("Lean mode: blocking %s URL patterns", len(patterns))
+    except WebDriverException as e:
+        logging.warning("Lean mode: could not set blocked URLs: %s", e)
+
+
+# Performance.getMetrics names worth reporting, in bytes or counts
+MEMORY_METRICS = ("JSHeapUsedSize", "JSHeapTotalSize", "Nodes", "Documents", "Frames", "JSEventListeners")
+
+
+def renderer_memory(driver: webdriver.Chrome) -> Dict[str, float]:
+    """Renderer memory and DOM size of the driver's tab, via ``Performance.getMetrics``."""
+    try:
+        driver.execute_cdp_cmd("Performance.enable", {})
+        res = driver.execute_cdp_cmd("Performance.getMetrics", {})
+    except WebDriverException as e:
+        logging.debug("Performance.getMetrics failed: %s", e)
+        return {}
+    values = {m["name"]: m["value"] for m in res.get("metrics", [])}
+    return {name: float(values[name]) for name in MEMORY_METRICS if name in values}
+
+
+def resolve_chromedriver() -> Optional[str]:
+    """ChromeDriver path without touching the network: CHROMEDRIVER_PATH, the path
+    cached after the last webdriver-manager download, then the usual system locations."""
+    import shutil
+
+    candidates = [os.getenv("CHROMEDRIVER_PATH", "")]
+    try:
+        with open(DRIVER_CACHE_FILE, "r", encoding="utf-8") as f:
+            candidates.append(f.read().strip())
+    except OSError:
+        pass
+    candidates += [shutil.which("chromedriver") or "", "/usr/local/bin/chromedriver", "/usr/bin/chromedriver"]
+    for path in candidates:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+def cache_chromedriver_path(path: str) -> None:
+    try:
+        with open(DRIVER_CACHE_FILE, "w", encoding="utf-8") as f:
+            f.write(path)
+    except OSError as e:
+        logging.warning("Could not cache ChromeDriver path: %s", e)
+
+
+def profile_lock_owner(profile_dir: str) -> Optional[Tuple[str, int]]:
+    """(host, pid) from the profile's ``SingletonLock`` symlink ('host-pid'), or None."""
+    try:
+        target = os.readlink(os.path.join(profile_dir, "SingletonLock"))
+    except OSError:
+        return None
+    host, _, pid = target.rpartition("-")
+    if not host or not pid.isdigit():
+        return None
+    return host, int(pid)
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def clear_profile_locks(profile_dir: str) -> bool:
+    """Remove the singleton lock files a crashed Chrome leaves behind in its profile.
+
+    The locks are left alone while the Chrome that owns them (the ``SingletonLock``
+    target on this host) is still running; returns False in that case.
+    """
+    import socket
+
+    owner = profile_lock_owner(profile_dir)
+    if owner and owner[0] == socket.gethostname() and pid_alive(owner[1]):
+        logging.info("Chrome profile %s is locked by running pid %s", profile_dir, owner[1])
+        return False
+    for name in ("SingletonLock", "SingletonSocket", "SingletonCookie"):
+        path = os.path.join(profile_dir, name)
+        if os.path.lexists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.warning("Could not remove stale profile lock %s: %s", path, e)
+    return True
+
+
 def save_session(driver: webdriver.Chrome) -> None:
-    """Persist cookies and localStorage to a pickle file."""
+    """Persist cookies and localStorage to the JSON session file."""
     try:
-        cookies = driver.get_cookies()
-        local_storage = driver.execute_script(
-            "var ls = {}; for (var i = 0; i < localStorage.length; i++){var k = localStorage.key(i); ls[k] = localStorage.getItem(k);} return ls;"
-        )
-        with open(SESSION_FILE, "wb") as f:
-            pickle.dump({"cookies": cookies, "localStorage": local_storage}, f)
+        session_store.write_session(SESSION_FILE, session_store.session_from_driver(driver))
         logging.info("Session saved: cookies + localStorage")
     except Exception as e:
-        logging.error(f"Failed to save session: {e}")
+        logging.error("Failed to save session: %s", e)
 
 
+def read_session_file() -> Optional[Dict[str, Any]]:
+    """The validated session, converting a legacy pickle file once; None if unusable."""
+    try:
+        if not os.path.exists(SESSION_FILE) and os.path.exists(LEGACY_SESSION_FILE):
+            with open(LEGACY_SESSION_FILE, "rb") as f:
+                session_store.write_session(SESSION_FILE, session_store.load_legacy_pickle(f.read()))
+            logging.info("Converted legacy session %s to %s", LEGACY_SESSION_FILE, SESSION_FILE)
+        return session_store.read_session(SESSION_FILE)
+    except SessionError as e:
+        logging.warning("Session file unusable: %s", e)
+    except OSError as e:
+        logging.error("Failed to read session: %s", e)
+    return None
+
+
+@METRICS.stage("session_load")
 def load_session(driver: webdriver.Chrome, base_url: str) -> bool:
-    """Load cookies and localStorage if session file exists. Return True if dashboard loads."""
-    if not os.path.exists(SESSION_FILE):
-        logging.warning(f"Session file not found: {SESSION_FILE}")
+    """Restore the saved session and open ``base_url``. Return True if the dashboard loads.
+
+    All cookies go in with one ``Network.setCookies`` call and all localStorage
+    entries with one script registered for the next document, so the trade
+    page is the only page loaded.
+    """
+    data = read_session_file()
+    if data is None:
         return False
+    cookies = data["cookies"]
+    ls = data["localStorage"]
+    logging.info("Session file contains %s cookies and %s localStorage items", len(cookies), len(ls))
+    script_id = None
     try:
-        # Load on root first to match cookie domain, then go to trade
-        driver.get("https://qxbroker.com/")
-        logging.info(f"Loaded root domain. Current URL: {driver.current_url}")
-        
-        with open(SESSION_FILE, "rb") as f:
-            data = pickle.load(f)
-        
-        cookies = data.get("cookies", [])
-        ls = data.get("localStorage", {})
-        
-        logging.info(f"Session file contains {len(cookies)} cookies and {len(ls)} localStorage items")
-        
-        # Load cookies (try both domains)
-        loaded_count = 0
-        for ck in cookies:
-            try:
-                # Try original domain
-                driver.add_cookie(ck)
-                loaded_count += 1
-            except WebDriverException as e:
-                # Try without domain restriction
-                try:
-                    ck_copy = ck.copy()
-                    if "domain" in ck_copy:
-                        del ck_copy["domain"]
-                    driver.add_cookie(ck_copy)
-                    loaded_count += 1
-                except:
-                    logging.debug(f"Failed to load cookie {ck.get('name', 'unknown')}: {e}")
-        
-        logging.info(f"Successfully loaded {loaded_count}/{len(cookies)} cookies")
-        
-        # Load localStorage
-        for k, v in ls.items():
-            try:
-                driver.execute_script("localStorage.setItem(arguments[0], arguments[1]);", k, v)
-            except Exception as e:
-                logging.debug(f"Failed to set localStorage[{k}]: {e}")
-        
-        # Navigate to trade page
-        driver.get("https://qxbroker.com/fa/trade")
-        time.sleep(2)  # Give page time to load
-        driver.refresh()
-        time.sleep(2)
-        
-        logging.info(f"After refresh, URL: {driver.current_url}")
-        
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": session_store.cdp_cookies(cookies, data["origin"])})
+        if ls:
+            script_id = driver.execute_cdp_cmd(
+                "Page.addScriptToEvaluateOnNewDocument",
+                {"source": session_store.local_storage_script(ls, data["origin"])},
+            ).get("identifier")
+
+        driver.get(base_url)
+        wait_for(driver, page_ready, "page_load")
+        logging.info("Session restored, URL: %s", driver.current_url)
+
         # Check if dashboard appears
         logged_in = is_logged_in(driver)
         if logged_in:
             logging.info("Session loaded successfully - user is logged in")
         else:
-            logging.warning(f"Session loaded but login check failed. URL: {driver.current_url}")
+            logging.warning("Session loaded but login check failed. URL: %s", driver.current_url)
         return logged_in
     except Exception as e:
-        logging.error(f"Failed to load session: {e}", exc_info=True)
+        logging.error("Failed to load session: %s", e, exc_info=True)
+        return False
+    finally:
+        if script_id:
+            try:
+                # Later page loads must keep the site's own localStorage changes
+                driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": script_id})
+            except Exception:
+                pass
+
+
+@METRICS.stage("profile_resume")
+def resume_profile_session(driver: webdriver.Chrome, base_url: str) -> bool:
+    """Open the trade page with the profile's own cookies and check login once."""
+    try:
+        driver.get(base_url)
+        wait_for(driver, page_ready, "page_load")
+        return is_logged_in(driver, timeout=WAIT_TIMEOUTS["login_check"])
+    except WebDriverException as e:
+        logging.warning("Profile session check failed: %s", e)
         return False
 
 
-def is_logged_in(driver: webdriver.Chrome) -> bool:
+@METRICS.stage("is_logged_in")
+def is_logged_in(driver: webdriver.Chrome, timeout: float = 15) -> bool:
     """Heuristic: detect a dashboard element that only exists after login."""
     try:
         selectors = [
@@ -269,7 +508,7 @@ def is_logged_in(driver: webdriver.Chrome) -> bool:
             "[class*='balance']",
             "[data-qa='asset-selector']",
         ]
-        WebDriverWait(driver, 15).until(
+        WebDriverWait(driver, timeout).until(
             lambda d: any(len(d.find_elements(By.CSS_SELECTOR, s)) > 0 for s in selectors)
         )
         return "/trade" in (driver.current_url or "")
@@ -379,6 +618,9 @@ def manual_login_with_2fa(driver: webdriver.Chrome, email: str, password: str) -
 def login_with_session(driver: webdriver.Chrome, email: str, password: str) -> bool:
     """Try session login first. If fail, perform manual login and save session."""
     base_trade = "https://qxbroker.com/fa/trade"
+    if os.getenv("CHROME_PROFILE_DIR", "") and resume_profile_session(driver, base_trade):
+        logging.info("Logged in from the persistent Chrome profile")
+        return True
     logging.info("Attempting to load existing session...")
     if load_session(driver, base_trade):
         logging.info("Session login successful!")
@@ -399,6 +641,145 @@ def login_with_session(driver: webdriver.Chrome, email: str, password: str) -> b
     return ok
 
 
+# -----------------------------
+# Readiness waits
+# -----------------------------
+
+# Per-step timeouts (seconds); a wait returns as soon as its condition holds
+WAIT_TIMEOUTS: Dict[str, float] = {
+    "page_load": 15.0,
+    "asset_list": 3.0,
+    "asset_switch": 3.0,
+    "timeframe_options": 2.0,
+    "chart_timeframe": 3.0,
+    "login_check": 8.0,
+}
+WAIT_POLL = 0.05
+
+CHART_STATE_JS = """
+try {
+  let data = null;
+  const s = window.__lc_series || window.series || null;
+  if (s && s.series && s.series[0] && s.series[0].data) {
+    data = s.series[0].data;
+  } else {
+    const w = window.tvWidget || window.widget || null;
+    if (w && w.activeChart) { const c = w.activeChart(); data = c._bars || c._data || null; }
+  }
+  if (!data || data.length < 2) return null;
+  const b = data[data.length - 1];
+  if (!b) return null;
+  // Smallest recent spacing, so a bar missing from the feed does not look like another timeframe
+  let step = null;
+  for (let i = data.length - 1; i > 0 && i > data.length - 6; i--) {
+    const x = data[i - 1], y = data[i];
+    if (!x || !y) continue;
+    const d = (y.time || y.t) - (x.time || x.t);
+    if (d > 0 && (step === null || d < step)) step = d;
+  }
+  if (step === null) return null;
+  return [data.length, b.time || b.t, step];
+} catch (e) { return null; }
+"""
+
+ASSET_LABEL_JS = """
+const el = document.querySelector("[data-qa='asset-selector']");
+return el ? (el.innerText || el.textContent || '') : null;
+"""
+
+TIMEFRAME_OPTION_JS = """
+const items = document.querySelectorAll("[data-qa='timeframe-option'], button, li");
+for (const el of items) {
+  if (el.offsetParent !== null && (el.innerText || '').toUpperCase().includes(arguments[0])) return true;
+}
+return false;
+"""
+
+
+class WaitStats:
+    """Thread-safe count/total/max/timeouts of every readiness wait, per step."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, label: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            st = self._stats.setdefault(label, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0, "timeouts": 0})
+            st["count"] += 1
+            st["total"] += seconds
+            st["max"] = max(st["max"], seconds)
+            st["last"] = seconds
+            if not ok:
+                st["timeouts"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._stats.items()}
+
+
+WAIT_STATS = WaitStats()
+
+
+def wait_for(driver: webdriver.Chrome, condition, label: str, timeout: Optional[float] = None) -> bool:
+    """Poll ``condition(driver)`` until truthy or the step timeout; record how long it took."""
+    if timeout is None:
+        timeout = WAIT_TIMEOUTS.get(label, 3.0)
+    started = time.perf_counter()
+    ok = True
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(condition)
+    except TimeoutException:
+        ok = False
+    elapsed = time.perf_counter() - started
+    WAIT_STATS.record(label, elapsed, ok)
+    if not ok:
+        logging.debug("Wait '%s' timed out after %.2fs", label, elapsed)
+    return ok
+
+
+def page_ready(d: webdriver.Chrome) -> bool:
+    return d.execute_script("return document.readyState") == "complete"
+
+
+def chart_state(driver: webdriver.Chrome) -> Optional[List[Any]]:
+    """[bar count, last bar time, bar spacing] of the visible chart, or None."""
+    try:
+        return driver.execute_script(CHART_STATE_JS)
+    except WebDriverException:
+        return None
+
+
+def chart_shows_timeframe(tf_label: str):
+    """Condition: the chart's bar spacing equals ``tf_label`` (s or ms)."""
+    seconds = tf_seconds(tf_label)
+
+    def check(d: webdriver.Chrome) -> bool:
+        state = chart_state(d)
+        return bool(state) and state[2] in (seconds, seconds * 1000)
+    return check
+
+
+def asset_switched(pair_name: str, before: Optional[List[Any]]):
+    """Condition: the asset label shows ``pair_name`` or the chart series changed."""
+    target = pair_name.strip().lower()
+
+    def check(d: webdriver.Chrome) -> bool:
+        try:
+            label = d.execute_script(ASSET_LABEL_JS)
+        except WebDriverException:
+            label = None
+        if label and target in label.strip().lower():
+            return True
+        state = chart_state(d)
+        return state is not None and before is not None and state[:2] != before[:2]
+    return check
+
+
+def selector_items_present(d: webdriver.Chrome) -> bool:
+    return len(d.find_elements(By.CSS_SELECTOR, "[data-qa='asset-item'], li, div[role='option']")) > 0
+
+
 # -----------------------------
 # OTC asset handling and chart scraping
 # -----------------------------
@@ -413,15 +794,170 @@ def open_asset_selector(driver: webdriver.Chrome) -> None:
         driver.find_element(By.CSS_SELECTOR, "button[class*='asset'], [class*='asset']").click()
 
 
-def get_otc_pairs(driver: webdriver.Chrome) -> List[str]:
+FALLBACK_OTC_PAIRS = [
+    "EUR/USD OTC",
+    "GBP/USD OTC",
+    "AUD/USD OTC",
+    "USD/JPY OTC",
+    "NZD/CAD OTC",
+    "EUR/GBP OTC",
+]
+
+ASSET_ITEMS_SELECTOR = "[data-qa='asset-item'], li, div[role='option']"
+
+# Opens the asset selector if needed, waits in-page for the list and returns
+# every item as {name, pos, qa, id} in one round trip.
+ASSET_INDEX_JS = """
+const done = arguments[arguments.length - 1];
+const timeoutMs = arguments[0];
+const SEL = "[data-qa='asset-item'], li, div[role='option']";
+const started = Date.now();
+const items = () => Array.from(document.querySelectorAll(SEL));
+const hasOtc = () => items().some(el => /OTC/i.test(el.innerText || ''));
+if (!hasOtc()) {
+  const opener = document.querySelector("[data-qa='asset-selector']")
+    || document.querySelector("button[class*='asset'], [class*='asset']");
+  if (opener) opener.click();
+}
+(function poll() {
+  if (!hasOtc() && Date.now() - started < timeoutMs) { setTimeout(poll, 50); return; }
+  const out = [];
+  items().forEach((el, i) => {
+    const name = (el.innerText || '').trim();
+    if (name) out.push({name: name, pos: i, qa: el.getAttribute('data-qa') || '', id: el.id || ''});
+  });
+  try { document.activeElement && document.activeElement.blur && document.activeElement.blur(); } catch (e) {}
+  done(out);
+})();
+"""
+
+# Switches asset and waits for the asset label (or the chart series) to follow,
+# all inside the page: one WebDriver round trip per switch.
+SWITCH_ASSET_JS = """
+const done = arguments[arguments.length - 1];
+const want = String(arguments[0]).trim().toLowerCase();
+const pos = arguments[1];
+const timeoutMs = arguments[2];
+const SEL = "[data-qa='asset-item'], li, div[role='option']";
+const started = Date.now();
+const items = () => Array.from(document.querySelectorAll(SEL));
+const matches = el => !!el && (el.innerText || '').trim().toLowerCase().includes(want);
+const label = () => {
+  const el = document.querySelector("[data-qa='asset-selector']");
+  return el ? (el.innerText || el.textContent || '').trim().toLowerCase() : '';
+};
+const chartSig = () => {
+  try {
+    const s = window.__lc_series || window.series || null;
+    let data = (s && s.series && s.series[0] && s.series[0].data) || null;
+    if (!data) { const w = window.tvWidget || window.widget || null; if (w && w.activeChart) { const c = w.activeChart(); data = c._bars || c._data || null; } }
+    if (!data || !data.length) return '';
+    const b = data[data.length - 1];
+    return data.length + ':' + (b.time || b.t) + ':' + (b.open || b.o);
+  } catch (e) { return ''; }
+};
+if (label().includes(want)) { done({ok: true, found: true, already: true, ms: 0}); return; }
+const before = chartSig();
+let opened = false, clicked = false;
+(function step() {
+  if (!clicked) {
+    const list = items();
+    const el = matches(list[pos]) ? list[pos] : list.find(matches);
+    if (el) {
+      el.scrollIntoView({block: 'center'});
+      el.click();
+      clicked = true;
+    } else if (!opened) {
+      const opener = document.querySelector("[data-qa='asset-selector']")
+        || document.querySelector("button[class*='asset'], [class*='asset']");
+      if (opener) opener.click();
+      opened = true;
+    }
+  } else if (label().includes(want) || (before && chartSig() !== before)) {
+    done({ok: true, found: true, ms: Date.now() - started});
+    return;
+  }
+  if (Date.now() - started > timeoutMs) {
+    done({ok: clicked, found: clicked, timeout: true, ms: Date.now() - started});
+    return;
+  }
+  setTimeout(step, 50);
+})();
+"""
+
+
+class AssetIndex:
+    """Cached name -> locator map of the asset selector, refreshed on a TTL or when stale.
+
+    One injected script reads the whole list, so newly listed OTC assets show
+    up at the next refresh without a restart. The locator (list position,
+    data-qa, id) is a hint for ``SWITCH_ASSET_JS``; matching is by name.
+    """
+
+    def __init__(self, ttl: float = 600.0, timeout: float = 3.0) -> None:
+        self.ttl = ttl
+        self.timeout = timeout
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def expired(self) -> bool:
+        return not self.entries or time.time() - self.refreshed_at > self.ttl
+
+    def mark_stale(self) -> None:
+        self.refreshed_at = 0.0
+
+    def refresh(self, driver: webdriver.Chrome) -> Dict[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            items = driver.execute_async_script(ASSET_INDEX_JS, int(self.timeout * 1000))
+        except WebDriverException as e:
+            logging.warning("Asset index refresh failed: %s", e)
+            items = None
+        WAIT_STATS.record("asset_index", time.perf_counter() - started, bool(items))
+        entries = {it["name"]: it for it in (items or []) if it.get("name")}
+        with self._lock:
+            if entries:
+                added = set(entries) - set(self.entries)
+                if self.entries and added:
+                    logging.info("New assets listed: %s", sorted(added))
+                self.entries = entries
+            self.refreshed_at = time.time()
+        return self.entries
+
+    def get(self, driver: webdriver.Chrome) -> Dict[str, Dict[str, Any]]:
+        if self.expired():
+            return self.refresh(driver)
+        return self.entries
+
+    def otc_pairs(self, driver: webdriver.Chrome) -> List[str]:
+        return [name for name in self.get(driver) if "OTC" in name.upper()]
+
+    def locate(self, pair_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.entries.get(pair_name)
+            if entry is not None:
+                return entry
+            target = pair_name.strip().lower()
+            for name, entry in self.entries.items():
+                if target in name.lower():
+                    return entry
+        return None
+
+
+def get_otc_pairs(driver: webdriver.Chrome, index: Optional[AssetIndex] = None) -> List[str]:
     """Detect all OTC pairs visible in the asset selector.
     If detection fails, return a safe fallback list.
     """
+    if index is not None:
+        pairs = index.otc_pairs(driver)
+        return pairs or list(FALLBACK_OTC_PAIRS)
+
     pairs: List[str] = []
     try:
         open_asset_selector(driver)
-        time.sleep(1)
-        items = driver.find_elements(By.CSS_SELECTOR, "[data-qa='asset-item'], li, div[role='option']")
+        wait_for(driver, selector_items_present, "asset_list")
+        items = driver.find_elements(By.CSS_SELECTOR, ASSET_ITEMS_SELECTOR)
         for it in items:
             name = it.text.strip()
             if name and "OTC" in name.upper():
@@ -430,14 +966,7 @@ def get_otc_pairs(driver: webdriver.Chrome) -> List[str]:
         pass
 
     if not pairs:
-        pairs = [
-            "EUR/USD OTC",
-            "GBP/USD OTC",
-            "AUD/USD OTC",
-            "USD/JPY OTC",
-            "NZD/CAD OTC",
-            "EUR/GBP OTC",
-        ]
+        pairs = list(FALLBACK_OTC_PAIRS)
     try:
         driver.execute_script("document.activeElement && document.activeElement.blur && document.activeElement.blur();")
     except Exception:
@@ -445,231 +974,306 @@ def get_otc_pairs(driver: webdriver.Chrome) -> List[str]:
     return pairs
 
 
-def switch_to_pair(driver: webdriver.Chrome, pair_name: str) -> bool:
-    """Switch chart to the given pair name (OTC)."""
+@METRICS.stage("switch_to_pair")
+def switch_to_pair(driver: webdriver.Chrome, pair_name: str, index: Optional[AssetIndex] = None) -> bool:
+    """Switch chart to the given pair name (OTC).
+
+    With an ``index`` the switch is one in-page script call; if the asset is
+    not in the list the index is marked stale and the DOM walk below is used.
+    """
+    if index is not None:
+        entry = index.locate(pair_name) or {}
+        started = time.perf_counter()
+        try:
+            res = driver.execute_async_script(
+                SWITCH_ASSET_JS, pair_name, entry.get("pos", -1), int(WAIT_TIMEOUTS["asset_switch"] * 1000)
+            )
+        except WebDriverException as e:
+            logging.debug("Scripted switch to %s failed: %s", pair_name, e)
+            res = None
+        if res and res.get("ok"):
+            WAIT_STATS.record("asset_switch", time.perf_counter() - started, not res.get("timeout"))
+            return True
+        if res is not None and not res.get("found"):
+            index.mark_stale()
     try:
+        before = chart_state(driver)
         open_asset_selector(driver)
-        time.sleep(0.5)
-        items = driver.find_elements(By.CSS_SELECTOR, "[data-qa='asset-item'], li, div[role='option']")
+        wait_for(driver, selector_items_present, "asset_list")
+        items = driver.find_elements(By.CSS_SELECTOR, ASSET_ITEMS_SELECTOR)
         for it in items:
             if pair_name.strip().lower() in it.text.strip().lower():
                 driver.execute_script("arguments[0].scrollIntoView({block:'center'});", it)
                 it.click()
-                time.sleep(1.0)
+                wait_for(driver, asset_switched(pair_name, before), "asset_switch")
                 return True
     except Exception:
         return False
     return False
 
 
+@METRICS.stage("set_timeframe")
 def set_timeframe(driver: webdriver.Chrome, tf_label: str) -> None:
     """Set timeframe on the chart, e.g., '1m' or '5m'."""
     try:
         WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, "[data-qa='timeframe-selector']"))
         ).click()
-        time.sleep(0.2)
+        wait_for(
+            driver,
+            lambda d: d.execute_script(TIMEFRAME_OPTION_JS, tf_label.upper()),
+            "timeframe_options",
+        )
         options = driver.find_elements(By.CSS_SELECTOR, "[data-qa='timeframe-option'], button, li")
         for op in options:
             if tf_label.upper() in op.text.upper():
                 op.click()
-                time.sleep(0.3)
                 return
     except Exception:
         pass
 
 
-def get_candles(driver: webdriver.Chrome, tf_label: str, count: int) -> Optional[pd.DataFrame]:
+@METRICS.stage("get_candles")
+def get_candles(driver: webdriver.Chrome, tf_label: str, count: int, since: Any = None) -> Optional[CandleWindow]:
     """Extract recent candles using injected JavaScript when possible.
-    Returns a DataFrame with columns: time, open, high, low, close, color
+    Returns a CandleWindow with columns: time, open, high, low, close (and color on demand)
+
+    Bar times are epoch seconds, also on charts that count in milliseconds.
+    With ``since`` (a bar time we already hold) only bars whose time is >= since
+    are returned: the held bar again (it may have been still forming) plus
+    anything newer, capped at ``count``. Bars come back packed into one
+    base64 string (``chart_bridge.PACK_JS``) unless ``CANDLE_PAYLOAD=plain``.
     """
-    set_timeframe(driver, tf_label)
-    time.sleep(0.8)
+    if not chart_shows_timeframe(tf_label)(driver):
+        set_timeframe(driver, tf_label)
+        wait_for(driver, chart_shows_timeframe(tf_label), "chart_timeframe")
 
     js_candidates = [
-        """
+        chart_bridge.PACK_JS + """
         const out = [];
         try {
           const series = window.__lc_series || window.series || null;
           if (series && series.series && series.series[0] && series.series[0].data) {
             const data = series.series[0].data;
-            for (let i = Math.max(0, data.length - arguments[0]); i < data.length; i++) {
+            const since = arguments[1];
+            let start = Math.max(0, data.length - arguments[0]);
+            if (since !== null && since !== undefined) {
+              let i = data.length;
+              while (i > start && data[i - 1] && epochSeconds(data[i - 1].time) >= since) i--;
+              start = i;
+            }
+            for (let i = start; i < data.length; i++) {
               const c = data[i];
-              out.push({t: c.time, o: c.open, h: c.high, l: c.low, c: c.close});
+              out.push({t: epochSeconds(c.time), o: c.open, h: c.high, l: c.low, c: c.close});
             }
           }
         } catch(e) {}
-        return out;
+        return arguments[2] === 'packed' ? packBars(['t', 'o', 'h', 'l', 'c'].map(k => out.map(r => r[k]))) : out;
         """,
-        """
+        chart_bridge.PACK_JS + """
         const out = [];
         try {
           const w = window.tvWidget || window.widget || null;
           if (w && w.activeChart) {
             const c = w.activeChart();
             const bars = c._bars || c._data || [];
-            const start = Math.max(0, bars.length - arguments[0]);
+            const since = arguments[1];
+            let start = Math.max(0, bars.length - arguments[0]);
+            if (since !== null && since !== undefined) {
+              let i = bars.length;
+              while (i > start && bars[i - 1] && epochSeconds(bars[i - 1].time || bars[i - 1].t) >= since) i--;
+              start = i;
+            }
             for (let i = start; i < bars.length; i++) {
               const b = bars[i];
               if (!b) continue;
-              out.push({t: b.time || b.t, o: b.open||b.o, h: b.high||b.h, l: b.low||b.l, c: b.close||b.cl});
+              out.push({t: epochSeconds(b.time || b.t), o: b.open||b.o, h: b.high||b.h, l: b.low||b.l, c: b.close||b.cl});
             }
           }
         } catch(e) {}
-        return out;
+        return arguments[2] === 'packed' ? packBars(['t', 'o', 'h', 'l', 'c'].map(k => out.map(r => r[k]))) : out;
         """,
     ]
 
-    rows: List[Dict[str, Any]] = []
+    # A delta holds at least the still-forming bar; a full read must look like a real series
+    min_rows = 1 if since is not None else max(5, int(count/2))
+    encoding = chart_bridge.payload_encoding()
     for script in js_candidates:
         try:
-            res = driver.execute_script(script, count)
-            if isinstance(res, list) and len(res) >= max(5, int(count/2)):
-                for r in res[-count:]:
-                    if not r:
-                        continue
-                    o = float(r.get('o', 0) or 0)
-                    h = float(r.get('h', 0) or 0)
-                    l = float(r.get('l', 0) or 0)
-                    c = float(r.get('c', 0) or 0)
-                    t = r.get('t', None)
-                    color = 'green' if c >= o else 'red'
-                    rows.append({"time": t, "open": o, "high": h, "low": l, "close": c, "color": color})
-                break
+            df = candles_from_result(driver.execute_script(script, count, since, encoding), count, min_rows)
+            if df is not None:
+                return df
         except Exception:
             continue
-
-    if not rows:
-        return None
-    df = pd.DataFrame(rows)
-    return df.tail(count).reset_index(drop=True)
+    return None
 
 
-# -----------------------------
-# ICT Logic
-# -----------------------------
+def candles_from_result(res: Any, count: int, min_rows: int) -> Optional[CandleWindow]:
+    """The newest ``count`` bars of an extraction script result (packed or a list of bar objects)."""
+    if isinstance(res, dict):
+        if int(res.get("n") or 0) < min_rows:
+            return None
+        df = chart_bridge.decode_packed(res)
+        return df.tail(count) if df is not None and len(df) > count else df
+    if isinstance(res, list) and len(res) >= min_rows:
+        rows = [r for r in res[-count:] if r]
+        return CandleWindow.from_columns(
+            [r.get('t') for r in rows], [r.get('o') for r in rows], [r.get('h') for r in rows],
+            [r.get('l') for r in rows], [r.get('c') for r in rows],
+        )
+    return None
 
-def detect_order_block(df: pd.DataFrame) -> bool:
-    if df is None or len(df) < 5:
-        return False
-    last = df.iloc[-2]
-    body = abs(last["close"] - last["open"])
-    wick = (last["high"] - last["low"]) - body
-    return body > wick and body > (df["close"] - df["open"]).abs().rolling(10).mean().iloc[-2]
 
+Windows = Dict[Tuple[str, str], CandleRing]
 
-def detect_fvg(df: pd.DataFrame) -> bool:
-    if df is None or len(df) < 3:
-        return False
-    c1 = df.iloc[-3]
-    c2 = df.iloc[-2]
-    c3 = df.iloc[-1]
-    bullish_gap = c1["high"] < c3["low"]
-    bearish_gap = c1["low"] > c3["high"]
-    return bool(bullish_gap or bearish_gap)
 
+def seed_window(
+    windows: Windows,
+    pair: str,
+    tf_label: str,
+    count: int,
+    store: Optional[CandleStore] = None,
+) -> Optional[CandleWindow]:
+    """The held bars of ``(pair, tf_label)``, seeded from the candle store on first use.
 
-def detect_liquidity_sweep(df: pd.DataFrame) -> bool:
-    if df is None or len(df) < 10:
-        return False
-    recent = df.tail(10)
-    prev_high = recent["high"].iloc[:-1].max()
-    prev_low = recent["low"].iloc[:-1].min()
-    last = recent.iloc[-1]
-    swept_high = last["high"] > prev_high and last["close"] < prev_high
-    swept_low = last["low"] < prev_low and last["close"] > prev_low
-    return bool(swept_high or swept_low)
+    Each key holds a ``CandleRing`` of at least ``count`` bars, so windows are
+    views on preallocated arrays instead of a new DataFrame per read.
+    """
+    key = (pair, tf_label)
+    ring = windows.get(key)
+    if ring is None:
+        ring = windows[key] = CandleRing(count)
+        if store is not None:
+            try:
+                if store.last_time(pair, tf_label) is not None:
+                    ring.replace(CandleWindow.from_frame(store.tail(pair, tf_label, count)))
+            except Exception as e:
+                logging.warning("Failed to read stored candles for %s %s: %s", pair, tf_label, e)
+    ring.reserve(count)
+    return ring.window(count) if len(ring) else None
 
 
-def detect_engulfing_m1(df: pd.DataFrame) -> Optional[str]:
-    if df is None or len(df) < 2:
-        return None
-    prev = df.iloc[-2]
-    cur = df.iloc[-1]
-    bullish = cur["low"] <= prev["low"] and cur["high"] >= prev["high"] and cur["close"] > cur["open"]
-    bearish = cur["high"] >= prev["high"] and cur["low"] <= prev["low"] and cur["close"] < cur["open"]
-    if bullish:
-        return "CALL"
-    if bearish:
-        return "PUT"
-    return None
+def window_since(window: Optional[CandleWindow]) -> Any:
+    """Last bar time of a held window (the delta cursor), or None for a full read."""
+    return window.last_time() if window is not None else None
 
 
-def detect_bos(df: pd.DataFrame) -> bool:
-    if df is None or len(df) < 5:
-        return False
-    swing_high = df["high"].rolling(3, center=True).max().iloc[-3]
-    swing_low = df["low"].rolling(3, center=True).min().iloc[-3]
-    last = df.iloc[-1]
-    return bool(last["high"] > swing_high or last["low"] < swing_low)
-
-
-def in_kill_zone(now_tehran: datetime) -> bool:
-    t = now_tehran.time()
-    for start_str, end_str in KILL_ZONES:
-        s_h, s_m = map(int, start_str.split(":"))
-        e_h, e_m = map(int, end_str.split(":"))
-        if dtime(s_h, s_m) <= t <= dtime(e_h, e_m):
-            return True
+def apply_delta(ring: CandleRing, since: Any, fresh: Optional[CandleWindow], count: int) -> bool:
+    """Merge a chart read into the held bars; False when a full read is needed."""
+    if since is None:
+        ring.replace(fresh)
+        return True
+    if fresh is not None and len(fresh) and fresh.time[0] == since:
+        ring.merge(fresh)
+        return True
+    if fresh is not None and len(fresh) >= count:
+        # Held bars are older than the chart's last ``count`` bars; the delta is a full window
+        ring.replace(fresh)
+        return True
     return False
 
 
-def compute_confluence(ob: bool, sweep: bool, engulf_dir: Optional[str], fvg: bool, bos: bool, now_tehran: datetime) -> int:
-    score = 0
-    if ob and sweep and engulf_dir:
-        score = 70
-    if score and fvg:
-        score = 80
-    if score and bos and in_kill_zone(now_tehran):
-        score = max(score, 85)
-    if score == 0 and (fvg or bos):
-        score = 50
-    return score
-
-
-def expiry_decision(score: int, engulf_dir: Optional[str], has_ob: bool, has_fvg: bool, has_bos: bool, now_tehran: datetime) -> int:
-    expiry = 1
-    hour = now_tehran.hour
-    minute = now_tehran.minute
-    if score >= 85 and has_ob and has_fvg and has_bos and engulf_dir and (hour == 17 or hour == 18 or (hour == 19 and minute == 0)):
-        expiry = 2
-    return expiry
-
-
-def detect_ict_signal(m5: Optional[pd.DataFrame], m1: Optional[pd.DataFrame], pair: str) -> Optional[Dict[str, Any]]:
-    tz = pytz.timezone("Asia/Tehran")
-    now = datetime.now(tz)
-    if m5 is None or m1 is None:
+def keep_window(
+    windows: Windows,
+    pair: str,
+    tf_label: str,
+    count: int,
+    fresh: Optional[CandleWindow],
+    store: Optional[CandleStore] = None,
+) -> Optional[CandleWindow]:
+    key = (pair, tf_label)
+    ring = windows.get(key)
+    if ring is None or not len(ring):
+        windows.pop(key, None)
         return None
-
-    ob = detect_order_block(m5)
-    fvg = detect_fvg(m5)
-    sweep = detect_liquidity_sweep(m5)
-    engulf_dir = detect_engulfing_m1(m1)
-    bos = detect_bos(m5)
-
-    score = compute_confluence(ob, sweep, engulf_dir, fvg, bos, now)
-    if score < 70 or not engulf_dir:
+    if store is not None and fresh is not None:
+        store_candles(store, pair, tf_label, fresh)
+    return ring.window(count)
+
+
+def fetch_candles(
+    driver: webdriver.Chrome,
+    windows: Windows,
+    pair: str,
+    tf_label: str,
+    count: int,
+    store: Optional[CandleStore] = None,
+) -> Optional[CandleWindow]:
+    """Keep ``windows[(pair, tf_label)]`` current, reading only new bars from the chart.
+
+    The first call for a key is seeded from the candle store when it has bars.
+    A delta that does not start at the held last bar time (chart reloaded,
+    bars missed) falls back to a full read. Fetched bars are appended to
+    ``store``.
+    """
+    since = window_since(seed_window(windows, pair, tf_label, count, store))
+    ring = windows[(pair, tf_label)]
+    fresh = get_candles(driver, tf_label, count, since=since)
+    if not apply_delta(ring, since, fresh, count):
+        fresh = get_candles(driver, tf_label, count)
+        ring.replace(fresh)
+    return keep_window(windows, pair, tf_label, count, fresh, store)
+
+
+def fetch_pair(
+    driver: webdriver.Chrome,
+    windows: Windows,
+    pair: str,
+    counts: Dict[str, int],
+    store: Optional[CandleStore] = None,
+    assets: Optional[AssetIndex] = None,
+) -> Optional[Dict[str, Optional[CandleWindow]]]:
+    """Switch to ``pair`` and refresh every timeframe in ``counts``; None if the switch failed.
+
+    Everything happens in one ``chart_bridge`` call. Timeframes the bridge
+    could not read, or whose delta no longer lines up, are read again the
+    step-by-step way; if the bridge itself is unusable the whole pair is, and
+    the next pairs skip the bridge until ``chart_bridge.usable`` says to retry.
+    """
+    held = {tf: seed_window(windows, pair, tf, n, store) for tf, n in counts.items()}
+    reads = [(tf, n, window_since(held[tf])) for tf, n in counts.items()]
+    entry = (assets.locate(pair) if assets is not None else None) or {}
+    res = None
+    if chart_bridge.usable(driver):
+        with METRICS.timed("bridge_read"):
+            res = chart_bridge.read_pair(driver, pair, reads, entry.get("pos", -1), WAIT_TIMEOUTS["asset_switch"])
+    if res is not None and res.ok:
+        WAIT_STATS.record("bridge_pair", res.ms / 1000.0, True)
+    elif res is not None and res.error is None:
+        # The bridge ran but the asset was not in the list
+        if assets is not None:
+            assets.mark_stale()
         return None
-    expiry = expiry_decision(score, engulf_dir, ob, fvg, bos, now)
-
-    return {
-        "pair": pair,
-        "direction": engulf_dir,
-        "expiry": expiry,
-        "score": score,
-        "reason": ("OB + " if ob else "") + ("FVG + " if fvg else "") + ("Sweep + " if sweep else "") + ("BOS + " if bos else "") + "Engulfing",
-        "time": now.strftime("%H:%M تهران"),
-    }
+    elif not switch_to_pair(driver, pair, assets):
+        return None
+
+    out: Dict[str, Optional[CandleWindow]] = {}
+    for tf, n, since in reads:
+        ring = windows[(pair, tf)]
+        fresh = res.frames.get(tf) if res is not None and res.ok else None
+        if fresh is None or not apply_delta(ring, since, fresh, n):
+            fresh = get_candles(driver, tf, n, since=since)
+            if not apply_delta(ring, since, fresh, n):
+                fresh = get_candles(driver, tf, n)
+                ring.replace(fresh)
+        out[tf] = keep_window(windows, pair, tf, n, fresh, store)
+    return out
+
+
+def store_candles(store: CandleStore, pair: str, tf_label: str, df: Optional[CandleWindow]) -> None:
+    """Persist scraped bars; storage problems are logged and never stop the scan."""
+    try:
+        store.append_frame(pair, tf_label, df)
+    except Exception as e:
+        logging.warning("Failed to store candles for %s %s: %s", pair, tf_label, e)
 
 
 # -----------------------------
 # Telegram
 # -----------------------------
 
-def send_telegram_signal(token: str, chat_id: str, signal: Dict[str, Any]) -> None:
-    bot = Bot(token=token)
-    text = (
+def format_signal_text(signal: Dict[str, Any]) -> str:
+    return (
         "سیگنال قوی ICT\n"
         f"جفت: {signal['pair']}\n"
         f"جهت: {signal['direction']}\n"
@@ -679,11 +1283,555 @@ def send_telegram_signal(token: str, chat_id: str, signal: Dict[str, Any]) -> No
         f"زمان: {signal['time']}\n"
         "همین الان وارد شو!"
     )
+
+
+@METRICS.stage("telegram_send")
+def send_telegram_signal(token: str, chat_id: str, signal: Dict[str, Any]) -> None:
+    """Synchronous one-off send; the scan loop uses ``TelegramDispatcher`` instead."""
+    from telegram import Bot
+
+    bot = Bot(token=token)
+    text = format_signal_text(signal)
     try:
         bot.send_message(chat_id=chat_id, text=text)
-        logging.info(f"Sent Telegram signal: {text}")
+        logging.info("Sent Telegram signal: %s", text)
+    except Exception as e:
+        logging.error("Telegram send failed: %s", e)
+
+
+# -----------------------------
+# Pair scanning
+# -----------------------------
+
+MIN_SEND_SCORE = 85
+M5_BARS = 50
+M1_BARS = 30
+# Enough M1 history to roll up M5_BARS bars locally (read in full once, then as deltas)
+M1_HISTORY = M5_BARS * 5 + 5
+# Fewest bars the detectors need to look back on (order block: previous bar + 10-bar mean)
+MIN_M5_BARS = ict_engine.OB_BODY_WINDOW + 1
+
+
+def scan_pair(
+    driver: webdriver.Chrome,
+    pair: str,
+    windows: Windows,
+    bank: DetectorBank,
+    store: Optional[CandleStore] = None,
+    aggregators: Optional[AggregatorBank] = None,
+    assets: Optional[AssetIndex] = None,
+    cache: Optional[EvalCache] = None,
+    close: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """Refresh the candles of ``pair`` and evaluate it on the bars closed by ``close``.
+
+    With ``aggregators`` only the M1 series is read from the chart and M5 is
+    rolled up locally; when WebSocket ticks have already built enough fresh
+    bars the chart is not touched at all. Without them (or while the local M5
+    history is too short) both timeframes are read from the chart.
+
+    With a ``cache`` a pair already evaluated since the last candle close is
+    neither read nor evaluated again, and unchanged bars reuse the last result.
+    """
+    if cache is not None:
+        entry = cache.fresh(pair)
+        if entry is not None:
+            return entry.signal
+
+    if aggregators is None:
+        frames = fetch_pair(driver, windows, pair, {"5m": M5_BARS, "1m": M1_BARS}, store, assets)
+        if frames is None:
+            return None
+        return evaluate_pair(pair, frames["5m"], frames["1m"], bank, cache, close)
+
+    agg = aggregators.get(pair)
+    if not agg.ready({"5m": MIN_M5_BARS, "1m": 2}):
+        counts = {"1m": M1_HISTORY}
+        if agg.bar_count("5m") < MIN_M5_BARS:
+            # Local M5 may stay short after this read; take the chart's M5 in the same call
+            counts["5m"] = M5_BARS
+        frames = fetch_pair(driver, windows, pair, counts, store, assets)
+        if frames is None:
+            return None
+        agg.add_m1_frame(frames["1m"])
+        if agg.bar_count("5m") < MIN_M5_BARS:
+            # Chart holds too little M1 history to roll up M5; use its M5 directly
+            return evaluate_pair(pair, frames.get("5m"), agg.frame("1m", M1_BARS), bank, cache, close)
+    return evaluate_pair(pair, agg.frame("5m", M5_BARS), agg.frame("1m", M1_BARS), bank, cache, close)
+
+
+def closed_bars(window: Optional[CandleWindow], close: float) -> Optional[CandleWindow]:
+    """Bars of ``window`` opened before ``close``; None when none are left."""
+    if window is None:
+        return None
+    window = window.before(close)
+    return window if len(window) else None
+
+
+def evaluate_pair(
+    pair: str,
+    m5: Optional[CandleWindow],
+    m1: Optional[CandleWindow],
+    bank: DetectorBank,
+    cache: Optional[EvalCache] = None,
+    close: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """``detect_ict_signal`` unless the cache holds a result for the same last bars.
+
+    With ``close`` (the M1 close the scan follows) bars opened at or after it
+    are dropped first: the chart has usually opened the next bar by then, and
+    detection scores the bar that just closed, as the backtest does. On an M5
+    boundary that also drops the new M5 bar.
+
+    The cache key and the ``bar`` of a signal (which ``SentSignals`` keys on)
+    are the times of those last closed bars. Every detector run is written to the decision journal.
+    """
+    if close is not None:
+        m5, m1 = closed_bars(m5, close), closed_bars(m1, close)
+    # Closed bars only: a forming bar changes under the same open time
+    key = bar_key(m5, m1)
+    if cache is not None and key is not None:
+        entry = cache.get(pair, key)
+        if entry is not None:
+            return entry.signal
+    now = datetime.now(TEHRAN_TZ)
+    decision = evaluate_ict(m5, m1, pair, bank, now)
+    if decision is None:
+        return None
+    sig = decision.signal
+    if key is not None:
+        if sig is not None:
+            sig["bar"] = key[1]
+        if cache is not None:
+            cache.put(pair, key, sig)
+    JOURNAL.evaluation(pair, decision, m5, m1, now, key)
+    return sig
+
+
+class SignalCollector:
+    """Thread-safe holder of the strongest signal (score >= min_score) of one sweep.
+
+    Signals already in ``sent`` (same pair, direction and bar) are ignored.
+    """
+
+    def __init__(self, min_score: int = MIN_SEND_SCORE, sent: Optional[SentSignals] = None) -> None:
+        self.min_score = min_score
+        self.sent = sent
+        self._lock = threading.Lock()
+        self._best: Optional[Dict[str, Any]] = None
+        self.detected_at: Optional[float] = None
+        self.skipped = 0
+
+    def offer(self, sig: Optional[Dict[str, Any]]) -> None:
+        if not sig or sig["score"] < self.min_score:
+            return
+        if self.sent is not None and self.sent.seen(sig):
+            logging.info("Signal %s %s already sent for this bar; dropped", sig['pair'], sig['direction'])
+            JOURNAL.record("dropped", sig["pair"], reason="already_sent", signal=dict(sig))
+            return
+        with self._lock:
+            if self._best is None or sig["score"] > self._best["score"]:
+                self._best = sig
+                self.detected_at = time.time()
+
+    def skip(self, count: int) -> None:
+        with self._lock:
+            self.skipped += count
+
+    def strongest(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._best
+
+
+class ScanWorker:
+    """One logged-in Chrome and the per-pair state for the pairs it scans."""
+
+    def __init__(self, driver: webdriver.Chrome, index: int, aggregators: Optional[AggregatorBank] = None,
+                 assets: Optional[AssetIndex] = None, check_login: Optional[bool] = None,
+                 settle: float = 1.5) -> None:
+        self.driver = driver
+        self.index = index
+        # The main browser's login is checked by the main loop; other browsers check their own
+        self.check_login = index > 0 if check_login is None else check_login
+        self.aggregators = aggregators
+        self.assets = assets
+        self.settle = settle
+        self.time_fn = time.time
+        self.windows: Windows = {}
+        self.bank = DetectorBank()
+        self.store = CandleStore()
+        self.cache = EvalCache(settle=settle)
+
+    def recent_m1(self, pair: str) -> Optional[CandleWindow]:
+        if self.aggregators is not None:
+            return self.aggregators.get(pair).frame("1m", 10)
+        ring = self.windows.get((pair, "1m"))
+        return ring.window(10) if ring is not None and len(ring) else None
+
+    def scan(
+        self,
+        pairs: List[str],
+        collector: SignalCollector,
+        env: Dict[str, Any],
+        deadline: Optional[float] = None,
+        priority: Optional[PairPriority] = None,
+    ) -> None:
+        if self.check_login and not is_logged_in(self.driver):
+            if not login_with_session(self.driver, env["QUOTEX_EMAIL"], env["QUOTEX_PASSWORD"]):
+                logging.warning("Scan worker %s is logged out; skipping %s pairs", self.index, len(pairs))
+                collector.skip(len(pairs))
+                return
+        # Same close for the whole shard: every pair is scored on the bars it closed
+        close = last_close(self.time_fn(), self.settle)
+        for i, pair in enumerate(pairs):
+            if deadline is not None and time.time() > deadline:
+                collector.skip(len(pairs) - i)
+                logging.info("Scan worker %s hit the cycle deadline; skipped %s pairs", self.index, len(pairs) - i)
+                return
+            try:
+                with METRICS.pair(pair), METRICS.timed("scan_pair"):
+                    sig = scan_pair(self.driver, pair, self.windows, self.bank, self.store, self.aggregators,
+                                    self.assets, self.cache, close)
+                collector.offer(sig)
+                if priority is not None:
+                    priority.observe(pair, self.recent_m1(pair), sig)
+            except WebDriverException as e:
+                logging.warning("Scan worker %s failed on %s: %s", self.index, pair, e)
+
+
+class ScannerPool:
+    """Scan pairs in parallel over several Chrome instances sharing the saved session.
+
+    Worker 0 drives the already logged-in main browser; the others are started
+    with their own debugging port and log in from the session file. Each pair
+    always goes to the same worker so its candle windows and detectors stay warm;
+    within a worker, pairs are scanned in the order given.
+    """
+
+    def __init__(self, driver: webdriver.Chrome, env: Dict[str, Any], size: int = 1,
+                 aggregators: Optional[AggregatorBank] = None, assets: Optional[AssetIndex] = None) -> None:
+        self.env = env
+        self.aggregators = aggregators
+        settle = env.get("SCAN_SETTLE", 1.5)
+        self.workers: List[ScanWorker] = [ScanWorker(driver, 0, aggregators, assets, settle=settle)]
+        for i in range(1, size):
+            extra = None
+            try:
+                extra = init_driver(headless=env["HEADLESS"], debug_port=9222 + i, lean=env["LEAN_MODE"])
+                if login_with_session(extra, env["QUOTEX_EMAIL"], env["QUOTEX_PASSWORD"]):
+                    self.workers.append(ScanWorker(extra, i, aggregators, assets, settle=settle))
+                    continue
+                logging.warning("Scan worker %s could not log in; pool continues without it", i)
+            except Exception as e:
+                logging.warning("Scan worker %s failed to start: %s", i, e)
+            if extra is not None:
+                try:
+                    extra.quit()
+                except Exception:
+                    pass
+        self._assignment: Dict[str, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=len(self.workers), thread_name_prefix="scan")
+        logging.info("Scanner pool ready with %s browser(s)", len(self.workers))
+
+    def shard(self, pairs: List[str]) -> List[List[str]]:
+        """Split ``pairs`` per worker, keeping each pair on the worker it was first given to."""
+        shards: List[List[str]] = [[] for _ in self.workers]
+        for pair in pairs:
+            idx = self._assignment.get(pair)
+            if idx is None:
+                idx = len(self._assignment) % len(shards)
+                self._assignment[pair] = idx
+            shards[idx].append(pair)
+        return shards
+
+    def scan(
+        self,
+        pairs: List[str],
+        min_score: int = MIN_SEND_SCORE,
+        deadline: Optional[float] = None,
+        priority: Optional[PairPriority] = None,
+        sent: Optional[SentSignals] = None,
+    ) -> SignalCollector:
+        """Scan every pair once (or until ``deadline``); the collector holds the strongest signal."""
+        collector = SignalCollector(min_score, sent)
+        futures = [
+            self._executor.submit(worker.scan, shard, collector, self.env, deadline, priority)
+            for worker, shard in zip(self.workers, self.shard(pairs))
+            if shard
+        ]
+        for f in futures:
+            try:
+                f.result()
+            except Exception as e:
+                logging.error("Scan worker crashed: %s", e, exc_info=True)
+        return collector
+
+    def memory(self) -> Dict[int, Dict[str, float]]:
+        """Renderer memory per browser; call between sweeps, not while workers drive them."""
+        return {worker.index: renderer_memory(worker.driver) for worker in self.workers}
+
+    def close(self) -> None:
+        """Stop the pool and quit every browser except the main one."""
+        self._executor.shutdown(wait=True)
+        for worker in self.workers[1:]:
+            try:
+                worker.driver.quit()
+            except Exception:
+                pass
+
+
+def start_metrics_server(port: int) -> Optional[MetricsServer]:
+    """Local Prometheus endpoint; a busy port only costs the endpoint, not the bot."""
+    if not port:
+        return None
+    try:
+        return MetricsServer(METRICS, port).start()
+    except OSError as e:
+        logging.warning("Metrics endpoint on port %s unavailable: %s", port, e)
+        return None
+
+
+class BrowserSession:
+    """The logged-in browsers of the bot: main driver, scanner pool and optional WebSocket tap.
+
+    Stopped during long gaps between kill zones and started again (logged in)
+    shortly before the next one.
+    """
+
+    def __init__(self, env: Dict[str, Any], assets: AssetIndex, aggregators: Optional[AggregatorBank] = None) -> None:
+        self.env = env
+        self.assets = assets
+        self.aggregators = aggregators
+        self.driver: Optional[webdriver.Chrome] = None
+        self.scanner: Optional[ScannerPool] = None
+        self.tap: Optional[WebSocketTap] = None
+
+    @property
+    def running(self) -> bool:
+        return self.driver is not None
+
+    def start(self) -> bool:
+        """Start Chrome, log in and build the scanner pool; False (nothing left running) on failure."""
+        env = self.env
+        started = time.perf_counter()
+        driver = init_driver(headless=env["HEADLESS"], ws_tap=env["WS_TAP"], lean=env["LEAN_MODE"])
+        if not login_with_session(driver, env["QUOTEX_EMAIL"], env["QUOTEX_PASSWORD"]):
+            driver.quit()
+            return False
+        self.driver = driver
+        self.assets.mark_stale()
+        self.scanner = ScannerPool(driver, env, env["SCAN_WORKERS"], self.aggregators, self.assets)
+        if env["WS_TAP"]:
+            self.tap = WebSocketTap(driver).start()
+            if wait_for_ticks(self.tap):
+                logging.info("WebSocket tap is receiving quote ticks")
+            else:
+                logging.warning("WebSocket tap started but no quote frames seen yet")
+        METRICS.observe("startup", time.perf_counter() - started, pair="")
+        return True
+
+    def otc_pairs(self) -> List[str]:
+        """OTC pairs from the asset index; re-read from the page once the index expires."""
+        return get_otc_pairs(self.driver, self.assets)
+
+    def sweep(
+        self,
+        pairs: List[str],
+        deadline: Optional[float] = None,
+        priority: Optional[PairPriority] = None,
+        sent: Optional[SentSignals] = None,
+    ) -> Optional[SignalCollector]:
+        """Scan ``pairs`` once; None when the main browser is logged out and logging in fails."""
+        env = self.env
+        if not is_logged_in(self.driver):
+            if not login_with_session(self.driver, env["QUOTEX_EMAIL"], env["QUOTEX_PASSWORD"]):
+                return None
+        if self.tap is not None and self.aggregators is not None:
+            self.aggregators.add_ticks(self.tap.drain())
+        return self.scanner.scan(pairs, deadline=deadline, priority=priority, sent=sent)
+
+    def report_memory(self) -> None:
+        report_memory(self.scanner.memory())
+
+    def stop(self) -> None:
+        if self.tap is not None:
+            self.tap.stop()
+            self.tap = None
+        if self.scanner is not None:
+            self.scanner.close()
+            self.scanner = None
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+def report_memory(readings: Dict[int, Dict[str, float]]) -> None:
+    """Publish renderer memory of every browser as gauges and log a one-line summary."""
+    for index, values in readings.items():
+        for name, value in values.items():
+            METRICS.set_gauge(f"quotex_renderer_{name}", value, {"browser": str(index)})
+    heap = sum(v.get("JSHeapUsedSize", 0.0) for v in readings.values())
+    nodes = sum(v.get("Nodes", 0.0) for v in readings.values())
+    logging.info("Renderer memory: %.1f MiB JS heap, %.0f DOM nodes over %s browser(s)", heap / 2**20, nodes, len(readings))
+
+
+# -----------------------------
+# Worker processes
+# -----------------------------
+
+class SweepStream:
+    """Collector and priority hook of ``ScanWorker.scan`` inside a worker process.
+
+    Every scanned pair goes to the coordinator as soon as it is evaluated, with
+    its signal and the recent M1 bars the coordinator's ``PairPriority`` needs.
+    """
+
+    def __init__(self, events, index: int, sweep: int) -> None:
+        self.events = events
+        self.index = index
+        self.sweep = sweep
+
+    def offer(self, sig: Optional[Dict[str, Any]]) -> None:
+        # Sent together with its pair by ``observe``; the score threshold is applied by the coordinator
+        pass
+
+    def skip(self, count: int) -> None:
+        self.events.put(("skip", self.index, self.sweep, count))
+
+    def observe(self, pair: str, m1: Optional[CandleWindow], sig: Optional[Dict[str, Any]]) -> None:
+        # A copy: the window is a view on this process's ring buffer
+        tail = m1.tail(10).copy() if m1 is not None else None
+        self.events.put(("pair", self.index, self.sweep, pair, sig, tail))
+
+
+def scan_process(index: int, env: Dict[str, Any], log_queue, commands, events) -> None:
+    """Worker process of ``ProcessScanner``: one logged-in Chrome scanning the shards it is sent.
+
+    Log records go to the bot process over ``log_queue``; the journal is a file of its own.
+    """
+    if log_queue is not None:
+        worker_logging(log_queue, env["LOG_LEVEL"])
+    if env["JOURNAL"]:
+        JOURNAL.start(env["JOURNAL_DIR"], tag=f"w{index}")
+    KILL_ZONE_SCHEDULE.set_pair_zones(parse_pair_zones(env["PAIR_KILL_ZONES"]))
+    assets = AssetIndex(ttl=env["ASSET_INDEX_TTL"])
+    aggregators = AggregatorBank() if env["LOCAL_M5"] or env["WS_TAP"] else None
+    driver: Optional[webdriver.Chrome] = None
+    tap: Optional[WebSocketTap] = None
+    try:
+        driver = init_driver(headless=env["HEADLESS"], debug_port=9222 + index, ws_tap=env["WS_TAP"], lean=env["LEAN_MODE"])
+        if not login_with_session(driver, env["QUOTEX_EMAIL"], env["QUOTEX_PASSWORD"]):
+            events.put(("failed", index, "login failed"))
+            return
+        if env["WS_TAP"]:
+            tap = WebSocketTap(driver).start()
+        events.put(("ready", index, get_otc_pairs(driver, assets)))
+        worker = ScanWorker(driver, index, aggregators, assets, check_login=True, settle=env["SCAN_SETTLE"])
+        memory: Dict[str, float] = {}
+        measured = 0.0
+        while True:
+            cmd = commands.get()
+            if cmd[0] == "stop":
+                break
+            _, sweep, part, pairs, deadline = cmd
+            if tap is not None and aggregators is not None:
+                aggregators.add_ticks(tap.drain())
+            stream = SweepStream(events, index, sweep)
+            worker.scan(pairs, stream, env, deadline, stream)
+            if time.time() - measured > env["MEMORY_REPORT_INTERVAL"]:
+                memory, measured = renderer_memory(driver), time.time()
+            events.put(("done", index, sweep, part, {"memory": memory, "metrics": METRICS.take()}))
+            if assets.expired():
+                # After the shard, so a refresh never delays a sweep
+                events.put(("pairs", index, get_otc_pairs(driver, assets)))
     except Exception as e:
-        logging.error(f"Telegram send failed: {e}")
+        logging.error("Scan worker process %s crashed: %s", index, e, exc_info=True)
+        events.put(("failed", index, str(e)))
+    finally:
+        if tap is not None:
+            tap.stop()
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        JOURNAL.stop()
+
+
+class ProcessScanner:
+    """The bot's browsers as ``SCAN_PROCESSES`` worker processes, in place of ``BrowserSession``.
+
+    Each process runs ``scan_process`` with its own Chrome (``SCAN_WORKERS``
+    does not apply) and a shard of the pairs. This process keeps Telegram and
+    the decision: it applies the ``MIN_SEND_SCORE`` selection to the streamed
+    results, skipping signals already sent, and feeds the pair priority.
+    Stage timings recorded in the workers are merged into this process's
+    ``METRICS`` as each shard finishes.
+    """
+
+    def __init__(self, env: Dict[str, Any], log_queue=None) -> None:
+        self.env = env
+        self.coordinator = Coordinator(scan_process, env["SCAN_PROCESSES"], args=(env, log_queue),
+                                       on_done=self._worker_done)
+
+    @staticmethod
+    def _worker_done(index: int, info: Dict[str, Any]) -> None:
+        # Stage timings of the worker's shard, into the registry /metrics and snapshots export
+        METRICS.merge(info.pop("metrics", ()))
+
+    @property
+    def running(self) -> bool:
+        return bool(self.coordinator.live)
+
+    def start(self) -> bool:
+        started = time.perf_counter()
+        if not self.coordinator.start():
+            self.coordinator.stop()
+            return False
+        METRICS.observe("startup", time.perf_counter() - started, pair="")
+        return True
+
+    def stop(self) -> None:
+        self.coordinator.stop()
+
+    def otc_pairs(self) -> List[str]:
+        self.coordinator.drain()
+        return list(self.coordinator.pairs) or list(FALLBACK_OTC_PAIRS)
+
+    def sweep(
+        self,
+        pairs: List[str],
+        deadline: Optional[float] = None,
+        priority: Optional[PairPriority] = None,
+        sent: Optional[SentSignals] = None,
+    ) -> Optional[SignalCollector]:
+        collector = SignalCollector(sent=sent)
+
+        def on_pair(pair: str, sig: Optional[Dict[str, Any]], m1: Optional[CandleWindow]) -> None:
+            collector.offer(sig)
+            if priority is not None:
+                priority.observe(pair, m1, sig)
+
+        collector.skip(self.coordinator.sweep(pairs, on_pair, deadline))
+        return collector
+
+    def report_memory(self) -> None:
+        report_memory({i: info["memory"] for i, info in self.coordinator.info.items() if info.get("memory")})
+
+
+def hibernate(browser: Union[BrowserSession, ProcessScanner], wake: datetime, prewarm: float) -> None:
+    """Stop the browsers, sleep until ``prewarm`` seconds before ``wake`` and start them again."""
+    resume_at = wake.timestamp() - prewarm
+    logging.info("No kill zone until %s; browsers stopped, resuming %.0fs before", wake.isoformat(), prewarm)
+    browser.stop()
+    time.sleep(max(0.0, resume_at - time.time()))
+    while not browser.start():
+        logging.error("Login after hibernation failed; retrying in 60s")
+        time.sleep(60)
+    logging.info("Browsers warm %.0fs before the kill zone", wake.timestamp() - time.time())
 
 
 # -----------------------------
@@ -691,6 +1839,7 @@ def send_telegram_signal(token: str, chat_id: str, signal: Dict[str, Any]) -> No
 # -----------------------------
 
 def main() -> None:
+    boot = time.time()
     env = load_env()
     if not env["QUOTEX_EMAIL"] or not env["QUOTEX_PASSWORD"]:
         print("لطفاً فایل .env را با ایمیل و رمز عبور پر کن.")
@@ -699,54 +1848,124 @@ def main() -> None:
         print("لطفاً توکن و چت‌آی‌دی تلگرام را در .env تنظیم کن.")
         return
 
+    log_writer = start_logging(env)
+    try:
+        run_bot(env, log_writer, boot)
+    finally:
+        JOURNAL.stop()
+        log_writer.stop()
+
+
+def run_bot(env: Dict[str, Any], log_writer: LogWriter, boot: float) -> None:
+    """The scan loop of ``main``, once settings are checked and logging runs."""
     # If running on server without filesystem session, allow env-based session injection
     ensure_session_from_env(env.get("SESSION_B64", ""))
+    KILL_ZONE_SCHEDULE.set_pair_zones(parse_pair_zones(env["PAIR_KILL_ZONES"]))
 
-    driver = init_driver(headless=env["HEADLESS"])
-
-    logged_in = login_with_session(driver, env["QUOTEX_EMAIL"], env["QUOTEX_PASSWORD"])
-    if not logged_in:
+    assets = AssetIndex(ttl=env["ASSET_INDEX_TTL"])
+    aggregators = AggregatorBank() if env["LOCAL_M5"] or env["WS_TAP"] else None
+    if env["SCAN_PROCESSES"]:
+        browser = ProcessScanner(env, log_writer.process_queue())
+    else:
+        browser = BrowserSession(env, assets, aggregators)
+    if not browser.start():
         print("ورود ناموفق بود. دوباره تلاش کن.")
-        driver.quit()
         return
 
-    otc_pairs = get_otc_pairs(driver)
+    otc_pairs = browser.otc_pairs()
     print("جفت‌ارزهای OTC شناسایی شده:", otc_pairs)
 
-    tz = pytz.timezone("Asia/Tehran")
+    from telegram_dispatch import TelegramDispatcher, parse_chat_ids
+
+    tz = TEHRAN_TZ
+    dispatcher = TelegramDispatcher(
+        env["TELEGRAM_TOKEN"],
+        parse_chat_ids(env["TELEGRAM_CHAT_ID"]),
+        base_url=env["TELEGRAM_API_URL"] or None,
+    ).start()
+
+    scheduler = ScanScheduler(settle=env["SCAN_SETTLE"], budget=env["SCAN_DEADLINE"])
+    priority = PairPriority()
+    sent = SentSignals(ttl=env["SENT_SIGNAL_TTL"])
+    scan_metrics = ScanMetrics()
+    metrics_server = start_metrics_server(env["METRICS_PORT"])
+    snapshots = SnapshotWriter(
+        METRICS,
+        env["METRICS_SNAPSHOT"],
+        env["METRICS_INTERVAL"],
+        extra=lambda: {
+            "waits": WAIT_STATS.snapshot(),
+            "bridge_paths": chart_bridge.PATH_STATS.snapshot(),
+            "scan": scan_metrics.snapshot(),
+            "eval_cache": CACHE_STATS.snapshot(),
+            "journal": JOURNAL.stats(),
+            "telegram": dict(dispatcher.stats),
+        },
+    ).start()
+    prewarm = env["PREWARM_MINUTES"] * 60
+    not_before: Optional[float] = None
+    # Reported once, for a start inside a kill zone (else the wait for the zone would dominate)
+    first_scan_from: Optional[float] = boot
+    memory_reported = 0.0
 
     try:
         while True:
+            close = scheduler.wait_for_close(not_before)
             now = datetime.now(tz)
-            if in_kill_zone(now):
-                if not is_logged_in(driver):
-                    logged_in = login_with_session(driver, env["QUOTEX_EMAIL"], env["QUOTEX_PASSWORD"])
-                    if not logged_in:
-                        time.sleep(30)
-                        continue
-
-                strongest: Optional[Dict[str, Any]] = None
-
-                for pair in otc_pairs:
-                    if not switch_to_pair(driver, pair):
-                        continue
-                    m5 = get_candles(driver, "5m", 50)
-                    m1 = get_candles(driver, "1m", 30)
-                    sig = detect_ict_signal(m5, m1, pair)
-                    if sig and sig["score"] >= 85:
-                        if strongest is None or sig["score"] > strongest["score"]:
-                            strongest = sig
+            active = KILL_ZONE_SCHEDULE.active_pairs(otc_pairs, now)
+            if active:
+                with METRICS.timed("sweep"):
+                    result = browser.sweep(
+                        priority.order(active),
+                        deadline=scheduler.deadline(close),
+                        priority=priority,
+                        sent=sent,
+                    )
+                if result is None:
+                    time.sleep(30)
+                    continue
+                scan_metrics.record_cycle(close, time.time(), result.skipped)
+                # Picks up newly listed OTC assets without a restart
+                otc_pairs = browser.otc_pairs()
+                if time.time() - memory_reported > env["MEMORY_REPORT_INTERVAL"]:
+                    browser.report_memory()
+                    memory_reported = time.time()
+                if first_scan_from is not None:
+                    METRICS.observe("time_to_first_scan", time.time() - first_scan_from, pair="")
+                    logging.info("First scan finished %.1fs after start", time.time() - first_scan_from)
+                    first_scan_from = None
+                strongest = result.strongest()
 
                 if strongest:
-                    send_telegram_signal(env["TELEGRAM_TOKEN"], env["TELEGRAM_CHAT_ID"], strongest)
-                    time.sleep(65)
+                    scan_metrics.record_signal(close, result.detected_at)
+                    dispatcher.enqueue(format_signal_text(strongest))
+                    sent.add(strongest)
+                    JOURNAL.record("sent", strongest["pair"], signal=dict(strongest), close=close,
+                                   detected_at=result.detected_at)
+                    logging.info(
+                        "Signal %s %s detected %.2fs after candle close",
+                        strongest['pair'], strongest['direction'], result.detected_at - close,
+                    )
+                    # Cooldown as before (65 s): the candle right after a signal is not scanned
+                    not_before = close + 2 * M1_SECONDS
                 else:
-                    time.sleep(30)
+                    not_before = None
             else:
-                print("خارج از Kill Zone - صبر...")
-                time.sleep(60)
+                first_scan_from = None
+                wake = KILL_ZONE_SCHEDULE.next_wake(now, otc_pairs)
+                idle = (wake - now).total_seconds()
+                print(f"خارج از Kill Zone - صبر تا {wake.strftime('%H:%M')}...")
+                if env["HIBERNATE"] and idle > env["HIBERNATE_MIN_IDLE"] * 60 + prewarm:
+                    hibernate(browser, wake, prewarm)
+                    otc_pairs = browser.otc_pairs()
+                # Next scan at the first candle close inside the zone
+                not_before = wake.timestamp()
     finally:
-        driver.quit()
+        dispatcher.stop()
+        snapshots.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        browser.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""Per-stage latency histograms with a Prometheus-text endpoint and JSON snapshots.
+
+Every timed stage (driver init, session load, login check, asset switch,
+timeframe switch, candle read, detection, Telegram send, ...) is observed into
+a fixed-bucket histogram keyed by ``(stage, pair)``; stages not tied to a pair
+use ``pair=""``. The pair is taken from ``METRICS.pair(...)``, a thread-local
+context the scan workers set around each pair, so helpers such as
+``get_candles`` need no extra argument.
+
+Worker processes keep their own registry and send what they observed with
+every finished shard (``take``); the bot's process ``merge``s it, so the
+export covers all of them.
+
+``MetricsServer`` serves ``/metrics`` in the Prometheus text format on a local
+port. ``SnapshotWriter`` writes the same data as JSON every ``interval``
+seconds and logs a warning when a stage's mean latency over the last interval
+is well above its running baseline.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds; the implicit last bucket is +Inf
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_NAME = "quotex_stage_seconds"
+
+
+class Histogram:
+    """Cumulative count/sum/max and per-bucket counts of one (stage, pair)."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, counts: List[int], count: int, total: float, max_: float) -> None:
+        """Add the observations of another histogram with the same buckets."""
+        for i, n in enumerate(counts):
+            self.counts[i] += n
+        self.count += count
+        self.total += total
+        if max_ > self.max:
+            self.max = max_
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (``max`` for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    """Registry of stage histograms, safe to use from any thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hist: Dict[Tuple[str, str], Histogram] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._local = threading.local()
+
+    def observe(self, stage: str, seconds: float, pair: Optional[str] = None) -> None:
+        if pair is None:
+            pair = getattr(self._local, "pair", "")
+        key = (stage, pair)
+        with self._lock:
+            hist = self._hist.get(key)
+            if hist is None:
+                hist = self._hist[key] = Histogram()
+            hist.observe(seconds)
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """Latest value of a point-in-time reading, e.g. renderer memory of one browser."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._gauges[key] = float(value)
+
+    def gauges(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = sorted(self._gauges.items())
+        return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in items]
+
+    @contextmanager
+    def timed(self, stage: str, pair: Optional[str] = None) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, pair)
+
+    def stage(self, name: str) -> Callable:
+        """Decorator timing every call of a function as stage ``name``."""
+        def decorate(fn: Callable) -> Callable:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    @contextmanager
+    def pair(self, pair: str) -> Iterator[None]:
+        """Attribute stages timed on this thread to ``pair`` until the block exits."""
+        previous = getattr(self._local, "pair", "")
+        self._local.pair = pair
+        try:
+            yield
+        finally:
+            self._local.pair = previous
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{stage: {pair: histogram dict}}; pair "" holds stages not tied to a pair."""
+        with self._lock:
+            items = [(k, h.as_dict()) for k, h in self._hist.items()]
+        out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (stage, pair), data in sorted(items):
+            out.setdefault(stage, {})[pair] = data
+        return out
+
+    def take(self) -> List[Tuple[str, str, List[int], int, float, float]]:
+        """Histograms observed since the last call as plain tuples, and clear them.
+
+        A worker process sends these to the bot's process, which ``merge``s them
+        into the registry it exports.
+        """
+        with self._lock:
+            items, self._hist = self._hist, {}
+        return [(stage, pair, h.counts, h.count, h.total, h.max) for (stage, pair), h in items.items()]
+
+    def merge(self, raw: Iterable[Tuple[str, str, List[int], int, float, float]]) -> None:
+        """Add histograms from ``take`` (usually of another process)."""
+        with self._lock:
+            for stage, pair, counts, count, total, max_ in raw:
+                hist = self._hist.get((stage, pair))
+                if hist is None:
+                    hist = self._hist[(stage, pair)] = Histogram()
+                hist.merge(counts, count, total, max_)
+
+    def stage_totals(self) -> Dict[str, Tuple[int, float]]:
+        """(count, sum) per stage across all pairs."""
+        totals: Dict[str, Tuple[int, float]] = {}
+        with self._lock:
+            for (stage, _), h in self._hist.items():
+                n, s = totals.get(stage, (0, 0.0))
+                totals[stage] = (n + h.count, s + h.total)
+        return totals
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            items = sorted((k, list(h.counts), h.count, h.total) for k, h in self._hist.items())
+        lines: List[str] = [
+            f"# HELP {METRIC_NAME} Latency of bot stages in seconds.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for (stage, pair), counts, count, total in items:
+            labels = f'stage="{_escape(stage)}",pair="{_escape(pair)}"'
+            cumulative = 0
+            for bound, n in zip(list(BUCKETS) + [None], counts):
+                cumulative += n
+                le = "+Inf" if bound is None else repr(bound)
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {total!r}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {count}")
+        typed = set()
+        for gauge in self.gauges():
+            if gauge["name"] not in typed:
+                typed.add(gauge["name"])
+                lines.append(f"# TYPE {gauge['name']} gauge")
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in gauge["labels"].items())
+            lines.append(f"{gauge['name']}{{{labels}}} {gauge['value']!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics()
+
+
+class MetricsServer:
+    """Serve ``metrics.prometheus_text()`` at ``http://host:port/metrics`` from a daemon thread."""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "127.0.0.1") -> None:
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsServer":
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+        logging.info("Metrics endpoint on http://%s:%s/metrics", self.host, self.port)
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+
+class SnapshotWriter:
+    """Write ``metrics.snapshot()`` to ``path`` every ``interval`` seconds and flag regressions.
+
+    A stage regresses when its mean over the last interval (at least
+    ``min_count`` calls) exceeds ``factor`` times its running baseline, an
+    exponential average of earlier interval means.
+    """
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 60.0, factor: float = 2.0,
+                 min_count: int = 5, alpha: float = 0.2,
+                 extra: Optional[Callable[[], Dict[str, Any]]] = None) -> None:
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.factor = factor
+        self.min_count = min_count
+        self.alpha = alpha
+        self.extra = extra
+        self.baseline: Dict[str, float] = {}
+        self.regressions: Dict[str, Dict[str, float]] = {}
+        self._last: Dict[str, Tuple[int, float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_regressions(self) -> Dict[str, Dict[str, float]]:
+        """Compare each stage's latest interval with its baseline; return the regressed ones."""
+        totals = self.metrics.stage_totals()
+        regressed: Dict[str, Dict[str, float]] = {}
+        for stage, (count, total) in totals.items():
+            prev_count, prev_total = self._last.get(stage, (0, 0.0))
+            n = count - prev_count
+            if n < self.min_count:
+                continue
+            self._last[stage] = (count, total)
+            mean = (total - prev_total) / n
+            base = self.baseline.get(stage)
+            if base is not None and base > 0 and mean > self.factor * base:
+                regressed[stage] = {"mean": mean, "baseline": base}
+                logging.warning("Stage '%s' regressed: %.0fms mean vs %.0fms baseline", stage, mean * 1000, base * 1000)
+            self.baseline[stage] = mean if base is None else base + self.alpha * (mean - base)
+        self.regressions = regressed
+        return regressed
+
+    def write(self) -> None:
+        data: Dict[str, Any] = {
+            "time": time.time(),
+            "stages": self.metrics.snapshot(),
+            "gauges": self.metrics.gauges(),
+            "regressions": self.check_regressions(),
+            "baseline": dict(self.baseline),
+        }
+        if self.extra is not None:
+            try:
+                data.update(self.extra())
+            except Exception as e:
+                logging.warning("Metrics snapshot extra failed: %s", e)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, default=str)
+        os.replace(tmp, self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logging.warning("Writing metrics snapshot failed: %s", e)
+
+    def start(self) -> "SnapshotWriter":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.write()
+        except Exception as e:
+            logging.warning("Writing metrics snapshot failed: %s", e)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Scan timing aligned to candle closes, with pair prioritization and a deadline.
+
+``ScanScheduler`` wakes a moment after every M1 close (every fifth one is also
+an M5 close) instead of sleeping fixed intervals, so detection always runs on a
+freshly closed bar; ``last_close`` tells a scan which bars opened after that
+close and are still forming. Each cycle gets a deadline after the close; pairs not
+reached by then are skipped so the signal still arrives inside the entry
+window. ``PairPriority`` orders pairs so the most volatile and most signal-prone
+ones are scanned first. ``ScanMetrics`` tracks the lag from candle close to
+signal.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+M1_SECONDS = 60
+
+
+def next_close(now: float, tf_seconds: int = M1_SECONDS) -> float:
+    """Epoch time of the next ``tf_seconds`` candle boundary strictly after ``now``."""
+    return (int(now) // tf_seconds + 1) * tf_seconds
+
+
+def last_close(now: float, settle: float = 0.0, tf_seconds: int = M1_SECONDS) -> float:
+    """Epoch time of the latest ``tf_seconds`` close at least ``settle`` seconds before ``now``.
+
+    Bars opened at or after it are still forming when a scan runs at ``now``.
+    """
+    return float(next_close(now - settle, tf_seconds) - tf_seconds)
+
+
+class ScanScheduler:
+    """Wait for candle closes and hand out per-cycle deadlines."""
+
+    def __init__(
+        self,
+        settle: float = 1.5,
+        budget: float = 20.0,
+        tf_seconds: int = M1_SECONDS,
+        time_fn: Callable[[], float] = time.time,
+        sleep_fn: Callable[[float], None] = time.sleep,
+    ) -> None:
+        # ``settle``: seconds after the close for the chart to roll over to the new bar
+        self.settle = settle
+        self.budget = budget
+        self.tf_seconds = tf_seconds
+        self.time_fn = time_fn
+        self.sleep_fn = sleep_fn
+
+    def wait_for_close(self, not_before: Optional[float] = None) -> float:
+        """Sleep until just after the next close (at or after ``not_before``); return the close time."""
+        now = self.time_fn()
+        close = next_close(now - self.settle, self.tf_seconds)
+        if not_before is not None:
+            while close < not_before:
+                close += self.tf_seconds
+        wake = close + self.settle
+        if wake > now:
+            self.sleep_fn(wake - now)
+        return float(close)
+
+    def deadline(self, close: float) -> float:
+        return close + self.budget
+
+    def is_m5_close(self, close: float) -> bool:
+        return int(close) % (5 * M1_SECONDS) == 0
+
+
+class PairPriority:
+    """Order pairs by recent volatility and how often they produced a signal."""
+
+    def __init__(self, alpha: float = 0.3, decay: float = 0.98, signal_weight: float = 2.0) -> None:
+        self.alpha = alpha
+        self.decay = decay
+        self.signal_weight = signal_weight
+        self._vol: Dict[str, float] = {}
+        self._signals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, pair: str, m1: Any, signal: Optional[Dict[str, Any]]) -> None:
+        """Fold in the pair's latest M1 bars (DataFrame or CandleWindow) and whether it produced a signal."""
+        vol = None
+        if m1 is not None and len(m1):
+            tail = m1.tail(10)
+            close = np.abs(np.asarray(tail["close"])).mean()
+            if close:
+                vol = float(((np.asarray(tail["high"]) - np.asarray(tail["low"])) / close).mean())
+        with self._lock:
+            if vol is not None:
+                prev = self._vol.get(pair)
+                self._vol[pair] = vol if prev is None else prev + self.alpha * (vol - prev)
+            self._signals[pair] = self._signals.get(pair, 0.0) * self.decay + (1.0 if signal else 0.0)
+
+    def score(self, pair: str) -> float:
+        with self._lock:
+            vols = sorted(self._vol.values())
+            median = vols[len(vols) // 2] if vols else 0.0
+            vol = self._vol.get(pair, median)
+            rel_vol = vol / median if median else 1.0
+            return rel_vol + self.signal_weight * self._signals.get(pair, 0.0)
+
+    def order(self, pairs: List[str]) -> List[str]:
+        """``pairs`` sorted highest priority first (stable for ties, e.g. before any data)."""
+        scores = {p: self.score(p) for p in pairs}
+        return sorted(pairs, key=lambda p: -scores[p])
+
+
+class ScanMetrics:
+    """Close-to-signal lag and sweep timing, readable from any thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.cycles = 0
+        self.skipped_pairs = 0
+        self.signal_lag = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+        self.sweep_lag = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+
+    @staticmethod
+    def _add(bucket: Dict[str, float], value: float) -> None:
+        bucket["count"] += 1
+        bucket["total"] += value
+        bucket["max"] = max(bucket["max"], value)
+        bucket["last"] = value
+
+    def record_cycle(self, close: float, finished_at: float, skipped: int = 0) -> None:
+        with self._lock:
+            self.cycles += 1
+            self.skipped_pairs += skipped
+            self._add(self.sweep_lag, finished_at - close)
+
+    def record_signal(self, close: float, detected_at: float) -> None:
+        with self._lock:
+            self._add(self.signal_lag, detected_at - close)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cycles": self.cycles,
+                "skipped_pairs": self.skipped_pairs,
+                "signal_lag": dict(self.signal_lag),
+                "sweep_lag": dict(self.sweep_lag),
+            }
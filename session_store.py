@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""Versioned JSON session file (cookies + localStorage) and its bulk restore helpers.
+
+File layout::
+
+    {"format": "quotex-session", "version": 1, "saved_at": "...",
+     "origin": "https://qxbroker.com",
+     "cookies": [{"name": ..., "value": ..., "domain": ..., "path": ..., "secure": ...,
+                  "httpOnly": ..., "sameSite": ..., "expiry": ...}, ...],
+     "localStorage": {"key": "value", ...}}
+
+Cookies keep the shape Selenium's ``get_cookies`` returns. ``validate_session``
+checks a loaded file before it is used and drops expired cookies.
+``cdp_cookies`` turns the cookies into ``Network.setCookies`` parameters, and
+``local_storage_script`` builds one script that sets every localStorage entry
+on the session's origin before the page's own scripts run.
+
+Older pickle files holding ``{"cookies": [...], "localStorage": {...}}`` are
+read by ``load_legacy_pickle``, which only accepts plain dicts, lists and
+strings, so they can be converted once.
+"""
+import io
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+SESSION_FORMAT = "quotex-session"
+SESSION_VERSION = 1
+DEFAULT_ORIGIN = "https://qxbroker.com"
+
+COLLECT_LOCAL_STORAGE_JS = (
+    "var ls = {}; for (var i = 0; i < localStorage.length; i++)"
+    "{var k = localStorage.key(i); ls[k] = localStorage.getItem(k);} return ls;"
+)
+
+_SAME_SITE = {"strict": "Strict", "lax": "Lax", "none": "None"}
+
+
+class SessionError(ValueError):
+    """The session file is missing, malformed, of another version or unusable."""
+
+
+def make_session(cookies: List[Dict[str, Any]], local_storage: Optional[Dict[str, Any]] = None,
+                 origin: str = DEFAULT_ORIGIN) -> Dict[str, Any]:
+    return {
+        "format": SESSION_FORMAT,
+        "version": SESSION_VERSION,
+        "saved_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "origin": origin,
+        "cookies": list(cookies or []),
+        "localStorage": dict(local_storage or {}),
+    }
+
+
+def _clean_cookie(ck: Any, i: int) -> Dict[str, Any]:
+    if not isinstance(ck, dict):
+        raise SessionError(f"cookie #{i} is not an object")
+    name, value = ck.get("name"), ck.get("value")
+    if not isinstance(name, str) or not name or not isinstance(value, str):
+        raise SessionError(f"cookie #{i} needs a string name and value")
+    out: Dict[str, Any] = {"name": name, "value": value, "path": ck.get("path") or "/"}
+    if ck.get("domain"):
+        out["domain"] = str(ck["domain"])
+    out["secure"] = bool(ck.get("secure", False))
+    out["httpOnly"] = bool(ck.get("httpOnly", False))
+    same_site = _SAME_SITE.get(str(ck.get("sameSite", "")).lower())
+    if same_site:
+        out["sameSite"] = same_site
+    # Selenium calls it "expiry", the browser console / CDP "expires"/"expirationDate"
+    expiry = ck.get("expiry", ck.get("expires", ck.get("expirationDate")))
+    if isinstance(expiry, (int, float)) and expiry > 0:
+        out["expiry"] = int(expiry)
+    return out
+
+
+def validate_session(data: Any, now: Optional[float] = None) -> Dict[str, Any]:
+    """Check a loaded session and return a normalized copy without expired cookies."""
+    if not isinstance(data, dict):
+        raise SessionError("session is not a JSON object")
+    if data.get("format") != SESSION_FORMAT:
+        raise SessionError(f"unknown session format {data.get('format')!r}")
+    if data.get("version") != SESSION_VERSION:
+        raise SessionError(f"unsupported session version {data.get('version')!r} (expected {SESSION_VERSION})")
+    cookies = data.get("cookies")
+    if not isinstance(cookies, list):
+        raise SessionError("cookies must be a list")
+    ls = data.get("localStorage", {})
+    if not isinstance(ls, dict) or not all(isinstance(k, str) for k in ls):
+        raise SessionError("localStorage must be an object")
+
+    now = time.time() if now is None else now
+    cleaned = [_clean_cookie(ck, i) for i, ck in enumerate(cookies)]
+    alive = [ck for ck in cleaned if "expiry" not in ck or ck["expiry"] > now]
+    if cleaned and not alive:
+        raise SessionError("every cookie in the session has expired")
+    out = dict(data)
+    out["cookies"] = alive
+    out["localStorage"] = {k: v if isinstance(v, str) else json.dumps(v) for k, v in ls.items()}
+    out["origin"] = data.get("origin") or DEFAULT_ORIGIN
+    return out
+
+
+def parse_session(raw: bytes) -> Dict[str, Any]:
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise SessionError(f"session is not valid JSON: {e}")
+    return validate_session(data)
+
+
+def read_session(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        raise SessionError(f"session file not found: {path}")
+    with open(path, "rb") as f:
+        return parse_session(f.read())
+
+
+def write_session(path: str, data: Dict[str, Any]) -> None:
+    """Validate and write atomically, readable by the owner only."""
+    data = validate_session(data)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    try:
+        os.chmod(tmp, 0o600)
+    except OSError:
+        pass
+    os.replace(tmp, path)
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        raise SessionError(f"legacy session references {module}.{name}; only plain data is accepted")
+
+
+def load_legacy_pickle(raw: bytes) -> Dict[str, Any]:
+    """A pre-JSON pickle session as a current session dict."""
+    try:
+        data = _PlainUnpickler(io.BytesIO(raw)).load()
+    except SessionError:
+        raise
+    except Exception as e:
+        raise SessionError(f"not a legacy session pickle: {e}")
+    if not isinstance(data, dict):
+        raise SessionError("legacy session is not a dict")
+    return validate_session(make_session(data.get("cookies", []), data.get("localStorage", {})))
+
+
+def session_from_bytes(raw: bytes) -> Dict[str, Any]:
+    """JSON session, or a legacy pickle converted on the fly."""
+    if raw[:1] == b"\x80":
+        return load_legacy_pickle(raw)
+    return parse_session(raw)
+
+
+def cdp_cookies(cookies: List[Dict[str, Any]], origin: str = DEFAULT_ORIGIN) -> List[Dict[str, Any]]:
+    """Session cookies as ``Network.setCookies`` CookieParam objects."""
+    out = []
+    for ck in cookies:
+        param: Dict[str, Any] = {
+            "name": ck["name"],
+            "value": ck["value"],
+            "path": ck.get("path", "/"),
+            "secure": ck.get("secure", False),
+            "httpOnly": ck.get("httpOnly", False),
+        }
+        if ck.get("domain"):
+            param["domain"] = ck["domain"]
+        else:
+            param["url"] = origin
+        if ck.get("sameSite"):
+            param["sameSite"] = ck["sameSite"]
+        if ck.get("expiry"):
+            param["expires"] = ck["expiry"]
+        out.append(param)
+    return out
+
+
+def local_storage_script(local_storage: Dict[str, str], origin: str = DEFAULT_ORIGIN) -> str:
+    """Source that writes every entry into localStorage when a page on ``origin`` loads."""
+    return (
+        "(function () {"
+        f" if (location.origin !== {json.dumps(origin)}) return;"
+        f" const items = {json.dumps(local_storage)};"
+        " try { for (const k in items) localStorage.setItem(k, items[k]); } catch (e) {}"
+        "})();"
+    )
+
+
+def session_from_driver(driver, origin: str = DEFAULT_ORIGIN) -> Dict[str, Any]:
+    """Current cookies and localStorage of a logged-in driver (two calls)."""
+    cookies = driver.get_cookies()
+    local_storage = driver.execute_script(COLLECT_LOCAL_STORAGE_JS) or {}
+    return make_session(cookies, local_storage, origin)
@@ -53,7 +53,7 @@ echo "  لاگ:      sudo journalctl -u quotex-ict-bot.service -f"
 echo ""
 echo "⚠️  قبل از شروع، مطمئن شو:"
 echo "  1. فایل .env با مقادیر واقعی پر شده"
-echo "  2. فایل session/quotex_session.pkl موجود است"
+echo "  2. فایل session/quotex_session.json موجود است"
 echo ""
 echo "🚀 برای شروع: sudo systemctl start quotex-ict-bot.service"
 
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Per-pair evaluation cache keyed on the last bars, and the index of sent signals.
+
+``EvalCache`` remembers, per pair, the bar times the last evaluation saw (last
+M5 bar, last closed M1 bar) and its result. Keys must come from windows
+without the forming M1 bar (``main.evaluate_pair`` drops it): its OHLC keeps
+changing under the same open time. A scan that reads the same bars again
+reuses the result instead of running detection and scoring, and a scan that
+comes before the next candle close (plus the chart's settle time) does not
+read the chart at all: no new bar can be there yet.
+
+``SentSignals`` holds the ``(pair, direction, bar)`` of every signal handed to
+Telegram for ``ttl`` seconds; a signal with the same key is never sent again.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+BarKey = Tuple[Any, Any]
+
+
+class CacheStats:
+    """How often evaluations were reused, recomputed or skipped without a chart read."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"hit": 0, "miss": 0, "fresh": 0}
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+
+CACHE_STATS = CacheStats()
+
+
+class Evaluation(NamedTuple):
+    key: BarKey
+    signal: Optional[Dict[str, Any]]
+    checked_at: float
+
+
+def _last_time(df: Any) -> Any:
+    if df is None or not len(df):
+        return None
+    value = np.asarray(df["time"])[-1]
+    return value.item() if hasattr(value, "item") else value
+
+
+def bar_key(m5: Any, m1: Any) -> Optional[BarKey]:
+    """(last M5 bar time, last M1 bar time) of two candle frames; None when either is empty.
+
+    Pass the frames without their forming bars, so the key names bars that no
+    longer change.
+    """
+    m5_time, m1_time = _last_time(m5), _last_time(m1)
+    if m5_time is None or m1_time is None:
+        return None
+    return (m5_time, m1_time)
+
+
+class EvalCache:
+    """Last evaluation of each pair; not shared between threads (one per scan worker)."""
+
+    def __init__(self, settle: float = 1.5, tf_seconds: int = 60,
+                 time_fn: Callable[[], float] = time.time) -> None:
+        self.settle = settle
+        self.tf_seconds = tf_seconds
+        self.time_fn = time_fn
+        self._entries: Dict[str, Evaluation] = {}
+
+    def _bar_index(self, t: float) -> int:
+        return int((t - self.settle) // self.tf_seconds)
+
+    def fresh(self, pair: str) -> Optional[Evaluation]:
+        """The last evaluation if no candle has closed (and settled) since it ran."""
+        entry = self._entries.get(pair)
+        if entry is not None and self._bar_index(entry.checked_at) == self._bar_index(self.time_fn()):
+            CACHE_STATS.record("fresh")
+            return entry
+        return None
+
+    def get(self, pair: str, key: BarKey) -> Optional[Evaluation]:
+        """The last evaluation if it saw the same bars; refreshes its check time."""
+        entry = self._entries.get(pair)
+        if entry is None or entry.key != key:
+            CACHE_STATS.record("miss")
+            return None
+        CACHE_STATS.record("hit")
+        entry = entry._replace(checked_at=self.time_fn())
+        self._entries[pair] = entry
+        return entry
+
+    def put(self, pair: str, key: BarKey, signal: Optional[Dict[str, Any]]) -> None:
+        self._entries[pair] = Evaluation(key, signal, self.time_fn())
+
+    def forget(self, pair: str) -> None:
+        self._entries.pop(pair, None)
+
+
+class SentSignals:
+    """Keys of signals already sent, forgotten after ``ttl`` seconds; safe to use from any thread."""
+
+    def __init__(self, ttl: float = 900.0, time_fn: Callable[[], float] = time.time) -> None:
+        self.ttl = ttl
+        self.time_fn = time_fn
+        self._lock = threading.Lock()
+        self._sent: Dict[Tuple[Any, ...], float] = {}
+
+    @staticmethod
+    def key(signal: Dict[str, Any]) -> Tuple[Any, ...]:
+        return (signal["pair"], signal["direction"], signal.get("bar"))
+
+    def _expire(self, now: float) -> None:
+        for k in [k for k, t in self._sent.items() if now - t > self.ttl]:
+            del self._sent[k]
+
+    def seen(self, signal: Dict[str, Any]) -> bool:
+        with self._lock:
+            self._expire(self.time_fn())
+            return self.key(signal) in self._sent
+
+    def add(self, signal: Dict[str, Any]) -> None:
+        with self._lock:
+            self._sent[self.key(signal)] = self.time_fn()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sent)
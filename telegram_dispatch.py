@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Background Telegram delivery so the scan loop never waits on the Bot API.
+
+The scan loop calls ``TelegramDispatcher.enqueue`` and returns immediately. A
+single worker thread owns one long-lived ``telegram.Bot`` (and its pooled HTTP
+connections), fans each message out to every chat, retries network errors
+with exponential backoff, honours ``RetryAfter`` from the API and spaces
+messages to stay under Telegram's per-chat and global rate limits. A retry
+waiting for its turn does not hold up messages to other chats.
+
+``base_url`` points the bot at any server speaking the Bot API, e.g. a local
+stand-in during tests.
+"""
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError, TimedOut
+from telegram.utils.request import Request
+
+from metrics import METRICS
+
+# Telegram asks for at most ~1 message/s per chat and ~30 messages/s overall
+PER_CHAT_INTERVAL = 1.0
+GLOBAL_INTERVAL = 1.0 / 30
+
+
+class Job(NamedTuple):
+    chat_id: str
+    text: str
+    attempt: int
+    enqueued_at: float
+
+
+def parse_chat_ids(value: str) -> List[str]:
+    """'123, -100456' -> ['123', '-100456']."""
+    return [c.strip() for c in (value or "").split(",") if c.strip()]
+
+
+def make_bot(token: str, base_url: Optional[str] = None, pool_size: int = 4) -> Bot:
+    """One Bot with a pooled HTTP connection, reused for every message."""
+    request = Request(con_pool_size=pool_size, connect_timeout=5.0, read_timeout=10.0)
+    if base_url:
+        return Bot(token=token, base_url=base_url, request=request)
+    return Bot(token=token, request=request)
+
+
+class TelegramDispatcher:
+    """Bounded queue + worker thread delivering messages to one or more chats."""
+
+    def __init__(
+        self,
+        token: str,
+        chat_ids: Sequence[str],
+        base_url: Optional[str] = None,
+        maxsize: int = 100,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        max_age: float = 60.0,
+        bot_factory: Callable[[], Any] = None,
+    ) -> None:
+        self.chat_ids = list(chat_ids)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # A signal delivered after its entry window is worse than none
+        self.max_age = max_age
+        self._bot_factory = bot_factory or (lambda: make_bot(token, base_url))
+        self._bot = None
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=maxsize)
+        self._pending: List[Any] = []  # heap of (ready_at, seq, job)
+        self._seq = itertools.count()
+        self._chat_ready: Dict[str, float] = {}
+        self._global_ready = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "expired": 0, "dropped": 0}
+
+    # -- producer side -------------------------------------------------
+
+    def enqueue(self, text: str) -> bool:
+        """Queue ``text`` for every chat; False if the queue is full (message dropped)."""
+        ok = True
+        now = time.monotonic()
+        for chat_id in self.chat_ids:
+            try:
+                self._queue.put_nowait(Job(chat_id, text, 0, now))
+                self.stats["enqueued"] += 1
+            except queue.Full:
+                self.stats["dropped"] += 1
+                logging.error("Telegram queue full; dropped message for chat %s", chat_id)
+                ok = False
+        return ok
+
+    def start(self) -> "TelegramDispatcher":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telegram", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Deliver what is queued (up to ``timeout``) and stop the worker."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and (not self._queue.empty() or self._pending):
+            time.sleep(0.05)
+        self._stop.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(max(0.0, deadline - time.monotonic()) + 1.0)
+        self._thread = None
+
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._pending)
+
+    # -- worker side ---------------------------------------------------
+
+    def _push(self, job: Job, ready_at: float) -> None:
+        heapq.heappush(self._pending, (ready_at, next(self._seq), job))
+
+    def _next_wait(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        return max(0.0, self._pending[0][0] - time.monotonic())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # Pull new work; block only until the earliest pending job is due
+            try:
+                job = self._queue.get(timeout=self._next_wait() if self._pending else 0.5)
+                if job is not None:
+                    self._push(job, time.monotonic())
+                while True:
+                    job = self._queue.get_nowait()
+                    if job is not None:
+                        self._push(job, time.monotonic())
+            except queue.Empty:
+                pass
+            if not self._pending or self._pending[0][0] > time.monotonic():
+                continue
+
+            _, _, job = heapq.heappop(self._pending)
+            if time.monotonic() - job.enqueued_at > self.max_age:
+                self.stats["expired"] += 1
+                logging.error("Telegram message for %s expired after %.0fs undelivered", job.chat_id, self.max_age)
+                continue
+            # Rate limits: reschedule instead of sleeping so other chats keep moving
+            now = time.monotonic()
+            ready = max(self._chat_ready.get(job.chat_id, 0.0), self._global_ready)
+            if ready > now:
+                self._push(job, ready)
+                continue
+            self._send(job)
+
+    def _send(self, job: Job) -> None:
+        if self._bot is None:
+            self._bot = self._bot_factory()
+        now = time.monotonic()
+        self._global_ready = now + GLOBAL_INTERVAL
+        self._chat_ready[job.chat_id] = now + PER_CHAT_INTERVAL
+        try:
+            with METRICS.timed("telegram_send", pair=""):
+                self._bot.send_message(chat_id=job.chat_id, text=job.text)
+            self.stats["sent"] += 1
+            logging.info("Sent Telegram signal to %s after %.2fs: %s", job.chat_id, time.monotonic() - job.enqueued_at, job.text)
+        except RetryAfter as e:
+            # Flood control: the API says exactly how long to wait
+            delay = float(e.retry_after)
+            self._chat_ready[job.chat_id] = time.monotonic() + delay
+            self._retry(job, delay, f"rate limited ({delay:.0f}s)")
+        except BadRequest as e:
+            self.stats["failed"] += 1
+            logging.error("Telegram rejected message for %s: %s", job.chat_id, e)
+        except (TimedOut, NetworkError) as e:
+            delay = min(self.max_backoff, self.backoff * (2 ** job.attempt))
+            self._retry(job, delay, str(e))
+        except TelegramError as e:
+            self.stats["failed"] += 1
+            logging.error("Telegram send failed permanently for %s: %s", job.chat_id, e)
+        except Exception as e:
+            delay = min(self.max_backoff, self.backoff * (2 ** job.attempt))
+            self._retry(job, delay, str(e))
+
+    def _retry(self, job: Job, delay: float, reason: str) -> None:
+        if job.attempt + 1 > self.max_retries:
+            self.stats["failed"] += 1
+            logging.error("Telegram send to %s gave up after %s attempts: %s", job.chat_id, job.attempt + 1, reason)
+            return
+        self.stats["retried"] += 1
+        logging.warning("Telegram send to %s failed (%s); retry in %.1fs", job.chat_id, reason, delay)
+        self._push(job._replace(attempt=job.attempt + 1), time.monotonic() + delay)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Offline check of the WebSocket tap decoder against recorded frames.
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import queue
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cdp_feed  # noqa: E402
+from cdp_feed import Tick  # noqa: E402
+
+RECORDING = os.path.join(ROOT, "fixtures", "ws_frames.jsonl")
+
+# Ticks in fixtures/ws_frames.jsonl: binary socket.io frames (0x04 + JSON rows),
+# one text '42["quotes/stream", rows]' frame; handshakes, pings, placeholders,
+# sent frames and other DevTools events carry none.
+EXPECTED = [
+    Tick("EUR/USD OTC", 1718000000.113, 1.07651),
+    Tick("GBP/USD OTC", 1718000000.402, 1.27398),
+    Tick("EUR/USD OTC", 1718000000.405, 1.07655),
+    Tick("AUD/USD OTC", 1718000001.021, 0.66112),
+    Tick("EUR/USD OTC", 1718000001.73, 1.07649),
+    Tick("USD/JPY OTC", 1718000001.733, 157.218),
+]
+
+
+class ReplayRecordingTest(unittest.TestCase):
+    def test_recorded_frames_decode_to_expected_ticks(self):
+        self.assertEqual(cdp_feed.replay_recording(RECORDING), EXPECTED)
+
+    def test_ticks_are_also_put_on_the_queue(self):
+        out: "queue.Queue[Tick]" = queue.Queue()
+        ticks = cdp_feed.replay_recording(RECORDING, out)
+        queued = [out.get_nowait() for _ in range(out.qsize())]
+        self.assertEqual(queued, ticks)
+
+    def test_only_received_frames_are_decoded(self):
+        messages = list(cdp_feed.iter_recorded_messages(RECORDING))
+        decoded = [m["method"] for m in messages if cdp_feed.decode_message(m)]
+        self.assertTrue(decoded)
+        self.assertEqual(set(decoded), {cdp_feed.FRAME_EVENT})
+
+
+class AssetToPairTest(unittest.TestCase):
+    def test_platform_codes(self):
+        self.assertEqual(cdp_feed.asset_to_pair("EURUSD_otc"), "EUR/USD OTC")
+        self.assertEqual(cdp_feed.asset_to_pair("EURUSD"), "EUR/USD")
+        self.assertEqual(cdp_feed.asset_to_pair("BTCUSD_otc"), "BTC/USD OTC")
+
+
+if __name__ == "__main__":
+    unittest.main()
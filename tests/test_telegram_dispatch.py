@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""TelegramDispatcher against a local stand-in of the Bot API (no network).
+
+Run from the repository root: python -m unittest discover tests
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import unittest
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+with warnings.catch_warnings():
+    # python-telegram-bot 13 warns when it runs on the upstream urllib3
+    warnings.simplefilter("ignore")
+    from telegram_dispatch import TelegramDispatcher  # noqa: E402
+
+TOKEN = "123456:TEST"
+
+
+class StandInBotAPI:
+    """Answers sendMessage like the Bot API; ``script`` holds (status, body) replies to use first."""
+
+    def __init__(self) -> None:
+        self.requests: List[Tuple[float, Dict[str, Any]]] = []
+        self.script: List[Tuple[int, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                status, reply = api.reply(self.path, body)
+                data = json.dumps(reply).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/bot"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def reply(self, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            self.requests.append((time.monotonic(), body))
+            if not path.endswith(f"/bot{TOKEN}/sendMessage"):
+                return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+            if self.script:
+                return self.script.pop(0)
+        message = {
+            "message_id": len(self.requests),
+            "date": int(time.time()),
+            "chat": {"id": int(body["chat_id"]), "type": "private"},
+            "text": body.get("text", ""),
+        }
+        return 200, {"ok": True, "result": message}
+
+    def chats(self) -> List[str]:
+        with self._lock:
+            return [str(body["chat_id"]) for _, body in self.requests]
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def server_error() -> Tuple[int, Dict[str, Any]]:
+    return 500, {"ok": False, "error_code": 500, "description": "Internal Server Error"}
+
+
+def retry_after(seconds: int) -> Tuple[int, Dict[str, Any]]:
+    return 429, {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {seconds}",
+                 "parameters": {"retry_after": seconds}}
+
+
+class TelegramDispatcherTest(unittest.TestCase):
+    def setUp(self) -> None:
+        logging.disable(logging.CRITICAL)
+        self.api = StandInBotAPI()
+
+    def tearDown(self) -> None:
+        self.api.close()
+        logging.disable(logging.NOTSET)
+
+    def dispatcher(self, chat_ids: List[str], **kwargs: Any) -> TelegramDispatcher:
+        return TelegramDispatcher(TOKEN, chat_ids, base_url=self.api.base_url, **kwargs).start()
+
+    def test_message_goes_to_every_chat(self):
+        d = self.dispatcher(["11", "22", "-1003"])
+        self.assertTrue(d.enqueue("EUR/USD OTC CALL"))
+        d.stop(timeout=5.0)
+        self.assertEqual(sorted(self.api.chats()), ["-1003", "11", "22"])
+        self.assertEqual({body["text"] for _, body in self.api.requests}, {"EUR/USD OTC CALL"})
+        self.assertEqual(d.stats["sent"], 3)
+        self.assertEqual(d.pending(), 0)
+
+    def test_server_errors_are_retried_with_backoff(self):
+        self.api.script = [server_error(), server_error()]
+        d = self.dispatcher(["11"], backoff=0.8)
+        d.enqueue("signal")
+        d.stop(timeout=6.0)
+        self.assertEqual(self.api.chats(), ["11", "11", "11"])
+        self.assertEqual((d.stats["sent"], d.stats["retried"], d.stats["failed"]), (1, 2, 0))
+        times = [t for t, _ in self.api.requests]
+        # Backoff 0.8 s then 1.6 s; the first is stretched to the 1 s per-chat spacing
+        self.assertGreaterEqual(times[1] - times[0], 0.8)
+        self.assertGreaterEqual(times[2] - times[1], 1.6)
+
+    def test_gives_up_after_max_retries(self):
+        self.api.script = [server_error()] * 3
+        d = self.dispatcher(["11"], backoff=0.01, max_retries=2)
+        d.enqueue("signal")
+        d.stop(timeout=5.0)
+        self.assertEqual(len(self.api.requests), 3)
+        self.assertEqual((d.stats["sent"], d.stats["retried"], d.stats["failed"]), (0, 2, 1))
+
+    def test_retry_after_is_honoured_without_holding_up_other_chats(self):
+        self.api.script = [retry_after(2)]
+        d = self.dispatcher(["11", "22"], backoff=0.01)
+        d.enqueue("signal")
+        d.stop(timeout=6.0)
+        self.assertEqual(self.api.chats(), ["11", "22", "11"])
+        self.assertEqual((d.stats["sent"], d.stats["retried"]), (2, 1))
+        (first, _), (other, _), (again, _) = self.api.requests
+        self.assertLess(other - first, 1.0)
+        self.assertGreaterEqual(again - first, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
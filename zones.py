@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Kill-zone schedule compiled once, with per-pair zones and next wake-up times.
+
+Zones are ``("HH:MM", "HH:MM")`` pairs in the schedule's timezone, inclusive at
+both ends like the original ``in_kill_zone`` check. A zone whose end is before
+its start runs over midnight. Pairs without their own zones use the default
+ones.
+
+``parse_pair_zones`` reads the ``PAIR_KILL_ZONES`` setting, e.g.
+``EUR/USD OTC=11:30-14:30,16:30-19:30; GBP/USD OTC=04:30-07:30``.
+"""
+from datetime import datetime, timedelta, time as dtime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DAY_SECONDS = 86400
+
+Zone = Tuple[str, str]
+
+
+def parse_hhmm(text: str) -> int:
+    """'04:30' -> seconds after midnight."""
+    h, m = map(int, text.strip().split(":"))
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError(f"invalid time of day: {text!r}")
+    return h * 3600 + m * 60
+
+
+def compile_zones(zones: Iterable[Zone]) -> List[Tuple[int, int]]:
+    """Zones as sorted inclusive (start, end) seconds-of-day, split at midnight when they wrap."""
+    out: List[Tuple[int, int]] = []
+    for start_str, end_str in zones:
+        start, end = parse_hhmm(start_str), parse_hhmm(end_str)
+        if start <= end:
+            out.append((start, end))
+        else:
+            out.append((start, DAY_SECONDS))
+            out.append((0, end))
+    return sorted(out)
+
+
+def parse_pair_zones(value: str) -> Dict[str, List[Zone]]:
+    """'EUR/USD OTC=11:30-14:30,16:30-19:30; GBP/USD OTC=04:30-07:30' -> {pair: [(start, end), ...]}."""
+    out: Dict[str, List[Zone]] = {}
+    for item in (value or "").split(";"):
+        if "=" not in item:
+            continue
+        pair, spans = item.split("=", 1)
+        zones = []
+        for span in spans.split(","):
+            if "-" in span:
+                start, end = span.split("-", 1)
+                parse_hhmm(start)
+                parse_hhmm(end)
+                zones.append((start.strip(), end.strip()))
+        if pair.strip() and zones:
+            out[pair.strip()] = zones
+    return out
+
+
+def _seconds_of_day(t: dtime) -> float:
+    return t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+
+
+class ZoneSchedule:
+    """Default and per-pair kill zones, answering "active now?" and "when next?"."""
+
+    def __init__(self, zones: Sequence[Zone], tz, pair_zones: Optional[Dict[str, Sequence[Zone]]] = None) -> None:
+        self.tz = tz
+        self.default = compile_zones(zones)
+        self.per_pair: Dict[str, List[Tuple[int, int]]] = {}
+        self.set_pair_zones(pair_zones or {})
+
+    def set_pair_zones(self, pair_zones: Dict[str, Sequence[Zone]]) -> None:
+        self.per_pair = {pair: compile_zones(z) for pair, z in pair_zones.items()}
+
+    def zones_for(self, pair: Optional[str] = None) -> List[Tuple[int, int]]:
+        if pair is not None:
+            return self.per_pair.get(pair, self.default)
+        return self.default
+
+    def minute_zones(self, pair: Optional[str] = None) -> List[Tuple[int, int]]:
+        """Inclusive minute-of-day pairs, as ``ict_engine.kill_zone_mask`` takes them."""
+        return [(start // 60, min(end, DAY_SECONDS - 60) // 60) for start, end in self.zones_for(pair)]
+
+    def _local(self, now: datetime) -> datetime:
+        return now.astimezone(self.tz) if now.tzinfo is not None else self.tz.localize(now)
+
+    def active(self, now: datetime, pair: Optional[str] = None) -> bool:
+        s = _seconds_of_day(self._local(now).time())
+        return any(start <= s <= end for start, end in self.zones_for(pair))
+
+    def active_pairs(self, pairs: Iterable[str], now: datetime) -> List[str]:
+        return [p for p in pairs if self.active(now, p)]
+
+    def next_start(self, now: datetime, pair: Optional[str] = None) -> datetime:
+        """``now`` if a zone is open, else the start of the next zone for ``pair``."""
+        local = self._local(now)
+        if self.active(local, pair):
+            return local
+        best: Optional[datetime] = None
+        for offset in range(3):
+            day = local.date() + timedelta(days=offset)
+            for start, _ in self.zones_for(pair):
+                if start >= DAY_SECONDS:
+                    continue
+                naive = datetime.combine(day, dtime(start // 3600, start % 3600 // 60))
+                candidate = self.tz.localize(naive) if hasattr(self.tz, "localize") else naive.replace(tzinfo=self.tz)
+                if candidate > local and (best is None or candidate < best):
+                    best = candidate
+            if best is not None:
+                return best
+        raise ValueError("schedule has no kill zones")
+
+    def next_wake(self, now: datetime, pairs: Optional[Iterable[str]] = None) -> datetime:
+        """Earliest zone start (or ``now``) over ``pairs``; over the default zones without pairs."""
+        pairs = list(pairs or [])
+        if not pairs:
+            return self.next_start(now)
+        return min(self.next_start(now, p) for p in pairs)